@@ -3,6 +3,49 @@ from typing import Tuple, Dict, Any, List
 import numpy as np
 from battleship.plate_state_processor import WellState
 
+_STATES = tuple(WellState)   # indexed by WellState value
+
+
+def _code(other: Any) -> Any:
+    return other.value if isinstance(other, WellState) else other
+
+
+class WellStateBoard(np.ndarray):
+    """
+    Read-only view of an int8 board that behaves like an array of WellState.
+
+    Indexing a single cell (or iterating) returns a WellState member, and
+    comparisons with WellState members run on the int8 codes, so existing AIs
+    work unchanged. Slices are WellStateBoard views of the same board.
+    """
+
+    def __getitem__(self, key):
+        if type(key) is tuple and len(key) == self.ndim:
+            try:
+                return _STATES[self.item(key)]
+            except TypeError:   # the key holds slices or index arrays
+                pass
+        out = super().__getitem__(key)
+        return out if isinstance(out, np.ndarray) else _STATES[out]
+
+    def __iter__(self):
+        if self.ndim == 1:
+            return map(_STATES.__getitem__, self.view(np.ndarray).tolist())
+        return super().__iter__()
+
+    def __repr__(self):
+        return repr(self.view(np.ndarray))
+
+    def __str__(self):
+        return str(self.view(np.ndarray))
+
+    def __eq__(self, other):
+        return np.ndarray.__eq__(self.view(np.ndarray), _code(other))
+
+    def __ne__(self, other):
+        return np.ndarray.__ne__(self.view(np.ndarray), _code(other))
+
+
 class BattleshipAI(ABC):
     """
     Abstract Base Class for a Battleship AI.
@@ -25,7 +68,18 @@ class BattleshipAI(ABC):
         self.player_id = player_id
         self.board_shape = board_shape
         self.ship_schema = ship_schema
-        self.board_state = np.full(board_shape, WellState.UNKNOWN, dtype=WellState)
+        self.total_ship_segments = sum(ship['length'] * ship['count'] for ship in ship_schema.values())
+        # Board knowledge as WellState values; board_state is a read-only view of it
+        self.board = np.full(board_shape, WellState.UNKNOWN.value, dtype=np.int8)
+        self._board_state = self.board.view(WellStateBoard)
+        self._board_state.flags.writeable = False
+
+    @property
+    def board_state(self) -> WellStateBoard:
+        """
+        The board as WellState members (read-only; results are written to ``board``).
+        """
+        return self._board_state
 
     @abstractmethod
     def select_next_move(self) -> Tuple[int, int]:
@@ -54,8 +108,8 @@ class BattleshipAI(ABC):
             The result of the shot (HIT or MISS).
         """
         row, col = move
-        if self.board_state[row, col] == WellState.UNKNOWN:
-            self.board_state[row, col] = result
+        if self.board[row, col] == WellState.UNKNOWN.value:
+            self.board[row, col] = result.value
         else:
             print(f"Warning ({self.player_id}): Attempted to record a result for an already targeted well {move}.")
 
@@ -68,7 +122,6 @@ class BattleshipAI(ABC):
         bool
             True if all opponent ships are sunk, False otherwise.
         """
-        total_ship_segments = sum(ship['length'] * ship['count'] for ship in self.ship_schema.values())
-        current_hits = np.sum(self.board_state == WellState.HIT)
-        #print(f"Player {self.player_id} has {current_hits} hits out of {total_ship_segments} total ship segments.")
-        return current_hits >= total_ship_segments
\ No newline at end of file
+        current_hits = np.count_nonzero(self.board == WellState.HIT.value)
+        #print(f"Player {self.player_id} has {current_hits} hits out of {self.total_ship_segments} total ship segments.")
+        return current_hits >= self.total_ship_segments
\ No newline at end of file
@@ -30,7 +30,7 @@ class GoWrapperAI(BattleshipAI):
         self.go_executable = go_executable
 
     def select_next_move(self) -> Tuple[int, int]:
-        board = [[cell.value for cell in row] for row in self.board_state]
+        board = self.board_state.tolist()
         with tempfile.NamedTemporaryFile("w", delete=False) as tmp:
             json.dump(board, tmp)
             tmp_path = tmp.name
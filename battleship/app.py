@@ -148,7 +148,7 @@ def plot_board(board: np.ndarray, title: str) -> plt.Figure:
         WellState.HIT: "#e06666",
     }
     rows, cols = board.shape
-    data = np.array([[state.value for state in row] for row in board])
+    data = np.asarray(board, dtype=int)
     
     fig, ax = plt.subplots(figsize=(8, 6))
     ax.imshow(data, cmap=plt.matplotlib.colors.ListedColormap(list(cmap.values())), vmin=0, vmax=2)
@@ -230,7 +230,12 @@ if "robot" not in st.session_state:
         )
     st.session_state.robot.add_turn_on_lights_action()
     st.session_state.robot.execute_actions_on_remote()
-    st.session_state.processor = DualPlateStateProcessor(config.get("plate_schema", {}), ot_number=OT_NUMBER, cam_index=CAM_INDEX, virtual_mode=VIRTUAL_MODE)
+    # "plate_service_rate" (reads per second) reads the plates in the background;
+    # with the service running, every full reading is kept in "well_history_dir";
+    # targeted reads alone record nothing
+    st.session_state.processor = DualPlateStateProcessor(config.get("plate_schema", {}), ot_number=OT_NUMBER, cam_index=CAM_INDEX, virtual_mode=VIRTUAL_MODE,
+                                                         service_rate=config.get("plate_service_rate"),
+                                                         history_dir=config.get("well_history_dir"))
     st.session_state.placement = {1: None, 2: None}
     st.session_state.liquids_placed = {1: False, 2: False}
     st.session_state.game_ai_choice = {1: None, 2: None}
@@ -385,32 +390,36 @@ if start_button:
     time.sleep(2) # Pause to show initial empty boards
 
     winner = None
-    for state in game.run_game_live():
-        # Update status message
-        status_text = f"**Turn {state['turn']}**: {state['active_player']} fires at **{state['move']}**... It's a **{state['result']}**!"
-        status_placeholder.markdown(status_text, unsafe_allow_html=True)
+    try:
+        for state in game.run_game_live():
+            # Update status message
+            status_text = f"**Turn {state['turn']}**: {state['active_player']} fires at **{state['move']}**... It's a **{state['result']}**!"
+            status_placeholder.markdown(status_text, unsafe_allow_html=True)
         
-        # Update boards
-        board_placeholder_1.pyplot(plot_board(state['board_p1'], f"Player 1: {p1_ai_choice}"))
-        board_placeholder_2.pyplot(plot_board(state['board_p2'], f"Player 2: {p2_ai_choice}"))
-        invalid_placeholder_1.markdown(
-            "Invalid Moves: " + "❌" * state['invalid_move_counts']['player_1']
-        )
-        invalid_placeholder_2.markdown(
-            "Invalid Moves: " + "❌" * state['invalid_move_counts']['player_2']
-        )
+            # Update boards
+            board_placeholder_1.pyplot(plot_board(state['board_p1'], f"Player 1: {p1_ai_choice}"))
+            board_placeholder_2.pyplot(plot_board(state['board_p2'], f"Player 2: {p2_ai_choice}"))
+            invalid_placeholder_1.markdown(
+                "Invalid Moves: " + "❌" * state['invalid_move_counts']['player_1']
+            )
+            invalid_placeholder_2.markdown(
+                "Invalid Moves: " + "❌" * state['invalid_move_counts']['player_2']
+            )
         
-        # Update history log
-        history_df = pd.DataFrame(state['history']).set_index('turn')
-        with log_placeholder.container():
-            st.write("--- Game Log ---")
-            st.dataframe(history_df, use_container_width=True)
+            # Update history log
+            history_df = pd.DataFrame(state['history']).set_index('turn')
+            with log_placeholder.container():
+                st.write("--- Game Log ---")
+                st.dataframe(history_df, use_container_width=True)
         
-        if state['winner']:
-            winner = state['winner']
-            break # Exit the loop once a winner is found
+            if state['winner']:
+                winner = state['winner']
+                break # Exit the loop once a winner is found
             
-        time.sleep(0.2) # Pause between moves to make it watchable
+            time.sleep(0.2) # Pause between moves to make it watchable
+    except RuntimeError as exc:
+        # A camera that is down or times out stops the game; results are never guessed
+        status_placeholder.error(f"Game stopped: could not read the plates ({exc})")
 
     if winner:
         winner_name = p1_ai_choice if winner == 'player_1' else p2_ai_choice
@@ -8,6 +8,7 @@ from battleship.plate_state_processor import DualPlateStateProcessor  # A new pr
 from typing import Any, List
 import random
 from battleship.plate_state_processor import WellState
+from camera.frame_quality import FrameQualityError
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 
 class BattleshipGame:
@@ -17,10 +18,18 @@ class BattleshipGame:
                  player_1_ai: BattleshipAI,
                  player_2_ai: BattleshipAI,
                  plate_processor: DualPlateStateProcessor,
-                 robot: OT2Manager):
+                 robot: OT2Manager,
+                 reaction_time: float = 5.0,
+                 quality_retries: int = 3):
         self.players = {'player_1': player_1_ai, 'player_2': player_2_ai}
         self.plate_processor = plate_processor
         self.robot = robot
+        # Seconds the indicator needs to react after a missile lands. Reads
+        # use the first camera frame captured after this delay.
+        self.reaction_time = reaction_time
+        # Extra reads when no frame passes the quality gate (e.g. the gantry
+        # is still over the plates) before the game stops with the error
+        self.quality_retries = quality_retries
         self.history: List[Dict[str, Any]] = []
 
         # Track how many times each player's AI attempted an invalid move
@@ -38,22 +47,48 @@ class BattleshipGame:
             return
         # Exclude the most recent entry (the current move)
         to_check = player_history[-(count + 1):-1]
+        # Wells the camera has not seen change keep their colour, so their
+        # result cannot have changed either
+        changed = self.plate_processor.pop_changed_wells(plate_id)
+        entries, wells = [], []
         for entry in to_check:
             row = ascii_uppercase.index(entry['move'][0])
             col = int(entry['move'][1:]) - 1
-            try:
-                new_state = self.plate_processor.determine_well_state(
-                    plate_id=plate_id, well=(row, col)
-                )
-            except RuntimeError:
-                continue
+            if changed is None or (row, col) in changed:
+                entries.append(entry)
+                wells.append((row, col))
+        if not wells or self.plate_processor.virtual_mode:
+            return
+        # One frame, sampling only the wells being re-checked
+        try:
+            new_states = self.plate_processor.determine_well_states(
+                plate_id=plate_id, wells=wells
+            )
+        except FrameQualityError as exc:
+            print(f"[Quality] Re-check of {player_id}'s shots skipped: {exc}")
+            return
+        for entry, (row, col), new_state in zip(entries, wells, new_states):
             current_state = ai.board_state[row, col]
             if new_state != current_state:
                 # Temporarily mark as unknown so AI update method works
-                ai.board_state[row, col] = WellState.UNKNOWN
+                ai.board[row, col] = WellState.UNKNOWN.value
                 ai.record_shot_result((row, col), new_state)
                 entry['result'] = new_state.name
 
+    def _read_result(self, plate_id: int, move: tuple, after: float) -> WellState:
+        """Read the result of a shot, retrying when no frame passes the quality gate."""
+        if self.plate_processor.virtual_mode:
+            return random.choice([WellState.MISS, WellState.HIT])
+        for attempt in range(self.quality_retries + 1):
+            try:
+                return self.plate_processor.determine_well_state(
+                    plate_id=plate_id, well=move, after=after)
+            except FrameQualityError as exc:
+                if attempt == self.quality_retries:
+                    raise
+                print(f"[Quality] {exc}; reading plate {plate_id} again")
+                after = time.time()
+
     def run_game_live(self):
         """
         Main game loop that yields the game state after each individual move.
@@ -98,16 +133,13 @@ class BattleshipGame:
                 print(f"Turn {turn}, {player_id}: Firing at {well_name}...")
                 self.robot.add_fire_missile_action(plate_idx=2 if player_id == 'player_1' else 1, plate_well=well_name)
                 self.robot.execute_actions_on_remote()
+                fired_at = time.time()
 
-                # 2.5 Wait for the chemical reaction to complete
-                time.sleep(5)  # Wait for the reaction to complete, adjust as necessary
-
-                # 3. Determine the result from the camera
-                try:
-                    result = self.plate_processor.determine_well_state(plate_id=2 if player_id == 'player_1' else 1, well=move)
-                except RuntimeError:
-                    # Probably in virtual mode, return a random result
-                    result = random.choice([WellState.MISS, WellState.HIT])
+                # 3. Determine the result from the first frame captured once
+                # the chemical reaction has had time to complete
+                # (random in virtual mode, where there is no camera)
+                result = self._read_result(2 if player_id == 'player_1' else 1, move,
+                                           fired_at + self.reaction_time)
                 print(f"Result: {result.name}!")
                 
                 # 4. Update the AI with the result and log history
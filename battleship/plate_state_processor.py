@@ -3,11 +3,16 @@ import sys
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from camera.camera_w_calibration import PlateProcessor
 from camera.dual_camera_w_calibration import DualPlateProcessor
+from camera.plate_service import PlateReadingService
 from enum import Enum
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 import numpy as np
 
 
+# Column 12 holds reference wells: rows A-D show a miss, rows E-H a hit
+CALIBRATION_WELLS = [(r, 11) for r in range(8)]
+
+
 def calibration_colors(plate: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
     """Return (miss_avg, hit_avg) using column 12 of the plate."""
     col = plate[:, 11]
@@ -15,6 +20,20 @@ def calibration_colors(plate: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
     hit_avg = col[4:8].mean(axis=0)
     return miss_avg, hit_avg
 
+
+def wells_from_plate(plate: np.ndarray, wells: List[Tuple[int, int]]) -> np.ndarray:
+    """Return the ``(len(wells) × 3)`` colours of ``wells`` in a full plate array."""
+    rows, cols = zip(*wells)
+    return np.asarray(plate)[list(rows), list(cols)]
+
+
+def classify_wells(colors: np.ndarray, reference: np.ndarray) -> List["WellState"]:
+    """Classify ``colors`` against the colours of :data:`CALIBRATION_WELLS`."""
+    miss_avg, hit_avg = reference[:4].mean(axis=0), reference[4:8].mean(axis=0)
+    dist_miss = np.linalg.norm(colors - miss_avg, axis=-1)
+    dist_hit = np.linalg.norm(colors - hit_avg, axis=-1)
+    return [WellState.MISS if m < h else WellState.HIT for m, h in zip(dist_miss, dist_hit)]
+
 class WellState(Enum):
     UNKNOWN = 0
     MISS = 1
@@ -26,35 +45,70 @@ class PlateStateProcessor:
     Primary functionality is to determine the state of a well in a plate
     as a HIT or MISS based on the color detected in the well's position.
     """
-    def __init__(self, plate_schema: Dict[str, Any], ot_number: int = 2, cam_index: int = 2, virtual_mode: bool = False) -> None:
-        """Initialize the PlateStateProcessor with a camera index."""
+    def __init__(self, plate_schema: Dict[str, Any], ot_number: int = 2, cam_index: int = 2,
+                 virtual_mode: bool = False, service_rate: Optional[float] = None,
+                 history_dir: Optional[str] = None) -> None:
+        """Initialize the PlateStateProcessor with a camera index.
+
+        With ``service_rate`` set, a :class:`PlateReadingService` reads the
+        plate that many times a second in the background and reads are
+        answered from its latest result. With ``history_dir`` set, every full
+        reading is also appended to the well history kept there; targeted
+        well reads are not full readings, so the history only fills up while
+        the service runs.
+        """
         self.cam_index = cam_index
-        self.processor = PlateProcessor(virtual_mode=virtual_mode)
+        self.virtual_mode = virtual_mode
+        self.processor = PlateProcessor(virtual_mode=virtual_mode, history_dir=history_dir)
         self.plate_schema = plate_schema
         self.ot_number = ot_number
-
-    def determine_well_state(self, well: Tuple[int, int]) -> WellState:
-        """Determine the state of a well based on its coordinates using calibration wells."""
-        i, j = well
-
+        self.service = None
+        if service_rate and not virtual_mode:
+            self.service = PlateReadingService(
+                self.processor, cam_index, f"secret/OT_{ot_number}/calibration.json",
+                rate=service_rate).start()
+
+    def determine_well_state(self, well: Tuple[int, int], after: Optional[float] = None) -> WellState:
+        """Determine the state of a well based on its coordinates using calibration wells.
+
+        If ``after`` is given, only a camera frame captured after that
+        ``time.time()`` value is used.
+        """
+        return self.determine_well_states([well], after=after)[0]
+
+    def determine_well_states(self, wells: List[Tuple[int, int]],
+                              after: Optional[float] = None) -> List[WellState]:
+        """Determine the states of several wells from a single camera frame.
+
+        Only the requested wells and the calibration wells are sampled.
+        """
         rows = int(self.plate_schema.get('rows', 0))
         cols = int(self.plate_schema.get('columns', 0))
-        if i < 0 or i >= rows or j < 0 or j >= cols:
-            raise ValueError(f"Invalid well coordinates: {well}")
-
-        plate_colors = self.process_plate()
-        miss_avg, hit_avg = calibration_colors(plate_colors)
-
-        color = plate_colors[i, j]
-        dist_miss = np.linalg.norm(color - miss_avg)
-        dist_hit = np.linalg.norm(color - hit_avg)
-        return WellState.MISS if dist_miss < dist_hit else WellState.HIT
-
-    def process_plate(self) -> np.ndarray:
+        for i, j in wells:
+            if i < 0 or i >= rows or j < 0 or j >= cols:
+                raise ValueError(f"Invalid well coordinates: {(i, j)}")
+
+        if self.service is not None:
+            plate = self.service.latest(after=after).colors["plate"]
+            colors = wells_from_plate(plate, list(wells) + CALIBRATION_WELLS)
+        else:
+            colors = self.processor.read_wells(
+                list(wells) + CALIBRATION_WELLS,
+                cam_index=self.cam_index,
+                calib=f"secret/OT_{self.ot_number}/calibration.json",
+                after=after,
+            )
+        return classify_wells(colors[:len(wells)], colors[len(wells):])
+
+    def process_plate(self, after: Optional[float] = None) -> np.ndarray:
         """Return the measured plate colors."""
+        if self.service is not None:
+            return self.service.latest(after=after).colors["plate"]
         return self.processor.process_image(
             cam_index=self.cam_index,
+            snap=None,
             calib=f"secret/OT_{self.ot_number}/calibration.json",
+            after=after,
         )
 
 
@@ -64,38 +118,104 @@ class DualPlateStateProcessor:
     Primary functionality is to determine the state of a well in a plate
     as a HIT or MISS based on the color detected in the well's position.
     """
-    def __init__(self, plate_schema: Dict[str, Any], ot_number: int = 2, cam_index: int = 2, virtual_mode: bool = False) -> None:
-        """Initialize the PlateStateProcessor with a camera index."""
+    def __init__(self, plate_schema: Dict[str, Any], ot_number: int = 2, cam_index: int = 2,
+                 virtual_mode: bool = False, service_rate: Optional[float] = None,
+                 history_dir: Optional[str] = None) -> None:
+        """Initialize the PlateStateProcessor with a camera index.
+
+        With ``service_rate`` set, a :class:`PlateReadingService` reads both
+        plates that many times a second in the background and reads are
+        answered from its latest result. With ``history_dir`` set, every full
+        reading is also appended to the well history kept there; targeted
+        well reads are not full readings, so the history only fills up while
+        the service runs.
+        """
         self.cam_index = cam_index
-        self.processor = DualPlateProcessor(virtual_mode=virtual_mode)
+        self.virtual_mode = virtual_mode
+        self.processor = DualPlateProcessor(virtual_mode=virtual_mode, history_dir=history_dir)
         self.plate_schema = plate_schema
         self.ot_number = ot_number
-
-    def determine_well_state(self, plate_id: int, well: Tuple[int, int]) -> WellState:
-        """Determine the state of a well using calibration wells."""
-        i, j = well
-
+        self.service = None
+        if service_rate and not virtual_mode:
+            self.service = PlateReadingService(
+                self.processor, cam_index, f"secret/OT_{ot_number}/dual_calibration.json",
+                rate=service_rate).start()
+        # wells seen changing since the last pop_changed_wells(), per plate
+        self._pending_changes: Dict[str, np.ndarray] = {}
+
+    def determine_well_state(self, plate_id: int, well: Tuple[int, int], after: Optional[float] = None) -> WellState:
+        """Determine the state of a well using calibration wells.
+
+        If ``after`` is given, only a camera frame captured after that
+        ``time.time()`` value is used.
+        """
+        return self.determine_well_states(plate_id, [well], after=after)[0]
+
+    def determine_well_states(self, plate_id: int, wells: List[Tuple[int, int]],
+                              after: Optional[float] = None) -> List[WellState]:
+        """Determine the states of several wells on a plate from a single camera frame.
+
+        Only the requested wells and the calibration wells are sampled.
+        """
         rows = int(self.plate_schema.get("rows", 0))
         cols = int(self.plate_schema.get("columns", 0))
-        if i < 0 or i >= rows or j < 0 or j >= cols:
-            raise ValueError(f"Invalid well coordinates: {well}")
-
-        plate_colors = self.process_plate(plate_id=plate_id)
-        miss_avg, hit_avg = calibration_colors(plate_colors)
-
-        color = plate_colors[i, j]
-        dist_miss = np.linalg.norm(color - miss_avg)
-        dist_hit = np.linalg.norm(color - hit_avg)
-        return WellState.MISS if dist_miss < dist_hit else WellState.HIT
-
-    def process_plate(self, plate_id: int) -> np.ndarray:
+        for i, j in wells:
+            if i < 0 or i >= rows or j < 0 or j >= cols:
+                raise ValueError(f"Invalid well coordinates: {(i, j)}")
+
+        if self.service is not None:
+            plate = self.service.latest(after=after).colors[f"plate_{plate_id}"]
+            colors = wells_from_plate(plate, list(wells) + CALIBRATION_WELLS)
+        else:
+            colors = self.processor.read_wells(
+                plate_id,
+                list(wells) + CALIBRATION_WELLS,
+                cam_index=self.cam_index,
+                calib=f"secret/OT_{self.ot_number}/dual_calibration.json",
+                after=after,
+            )
+        self._collect_changes([f"plate_{plate_id}"])
+        return classify_wells(colors[:len(wells)], colors[len(wells):])
+
+    def process_plate(self, plate_id: int, after: Optional[float] = None) -> np.ndarray:
         """Return the measured plate colors for a given plate."""
-        raw_plates = self.processor.process_image(
-            cam_index=self.cam_index,
-            calib=f"secret/OT_{self.ot_number}/dual_calibration.json",
-        )
+        if self.service is not None:
+            raw_plates = self.service.latest(after=after).colors
+        else:
+            raw_plates = self.processor.process_image(
+                cam_index=self.cam_index,
+                snap=None,
+                calib=f"secret/OT_{self.ot_number}/dual_calibration.json",
+                after=after,
+            )
+        self._collect_changes()
         raw_plate = raw_plates[f"plate_{plate_id}"]
         if raw_plate is None:
             raise ValueError(f"No plate data found for plate ID {plate_id}")
         return raw_plate
+
+    def _collect_changes(self, keys: Optional[List[str]] = None) -> None:
+        """Add the processor's last changed-well masks to the pending changes."""
+        if self.service is not None:
+            latest = {key: self.service.pop_changes(key) for key in keys or ("plate_1", "plate_2")}
+        else:
+            latest = self.processor.changed
+        for key, changed in latest.items():
+            if changed is None or (keys is not None and key not in keys):
+                continue
+            pending = self._pending_changes.get(key)
+            self._pending_changes[key] = changed if pending is None else pending | changed
+
+    def pop_changed_wells(self, plate_id: int) -> Optional[set]:
+        """Return and reset the wells of a plate that changed since the last call.
+
+        Every read of the camera covers both plates, so changes are collected
+        across all reads. Returns ``None`` if change tracking is unavailable
+        (in virtual mode, or without a ``change_threshold``), meaning any
+        well may have changed.
+        """
+        changed = self._pending_changes.pop(f"plate_{plate_id}", None)
+        if changed is None or not self.processor.change_threshold:
+            return None
+        return {(int(r), int(c)) for r, c in zip(*np.nonzero(changed))}
     
@@ -0,0 +1,96 @@
+"""
+artifact_writer.py — Background writer for diagnostic artifacts
+================================================================
+* Takes snapshot JPEGs, annotated read images and raw colour matrices off the
+  plate-read critical path.
+* Jobs are keyed by output path. A newer job for a path that is still pending
+  replaces the older one (coalesce), and when too many distinct paths are
+  pending the oldest job is dropped.
+* :meth:`ArtifactWriter.flush` blocks until everything queued so far is on
+  disk. The shared writer is flushed automatically at interpreter exit.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable
+
+
+class ArtifactWriter:
+    """Bounded, coalescing background file writer."""
+
+    def __init__(self, max_pending: int = 8) -> None:
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._jobs: OrderedDict[str, Callable[[str], None]] = OrderedDict()
+        self._busy = False
+        self._cond = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, path: str, write: Callable[[str], None]) -> None:
+        """Queue ``write(path)`` to run on the writer thread."""
+        with self._cond:
+            if path in self._jobs:
+                self._jobs[path] = write
+            else:
+                if len(self._jobs) >= self.max_pending:
+                    dropped, _ = self._jobs.popitem(last=False)
+                    self.dropped += 1
+                    print(f"[Writer] Dropped pending write to {dropped}")
+                self._jobs[path] = write
+            self._cond.notify_all()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while self.running and not self._jobs:
+                    self._cond.wait()
+                if not self._jobs:
+                    return
+                path, write = self._jobs.popitem(last=False)
+                self._busy = True
+            try:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                write(path)
+            except Exception as e:
+                print(f"[Writer] Failed to write {path}: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until all queued writes finish; return False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._jobs and not self._busy,
+                                       timeout)
+
+    def stop(self) -> None:
+        """Finish the queued writes and stop the writer thread."""
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        self.thread.join()
+
+
+def write_json(path: str, obj: Any) -> None:
+    """Write ``obj`` to ``path`` as indented JSON."""
+    with open(path, "w") as f:
+        json.dump(obj, f, indent=2)
+
+
+_writer: ArtifactWriter | None = None
+
+
+def get_writer() -> ArtifactWriter:
+    """Return the shared background artifact writer."""
+    global _writer
+    if _writer is None:
+        _writer = ArtifactWriter()
+        atexit.register(_writer.stop)
+    return _writer
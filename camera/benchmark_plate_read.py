@@ -0,0 +1,115 @@
+"""
+Benchmark the per-plate colour read on a synthetic 1080p frame.
+
+Compares the original per-well leader-clustering loop with the batched
+sampling engine in ``camera/well_sampling.py``, with and without the
+calibration-keyed sample pattern cache, and with the rectified block-median
+reader. No camera is needed.
+
+    python camera/benchmark_plate_read.py --repeats 20
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from camera.camera_w_calibration import PlateProcessor
+from camera.well_sampling import get_rectified_pattern, get_sample_pattern
+
+QUAD = [(420, 210), (1500, 230), (1480, 920), (440, 900)]
+
+
+def synthetic_plate(plate: str = "96", seed: int = 0) -> np.ndarray:
+    """Return a noisy 1920×1080 BGR frame with one coloured disc per well."""
+    rng = np.random.default_rng(seed)
+    img = np.full((1080, 1920, 3), 235, np.uint8)
+    centers = PlateProcessor.well_centers(0, 0, 0, 0, plate, quad=QUAD)
+    for cx, cy in centers.reshape(-1, 2):
+        color = tuple(int(v) for v in rng.integers(0, 256, 3))
+        cv2.circle(img, (int(cx), int(cy)), 30, color, -1)
+    noise = rng.normal(0, 3, img.shape)
+    return np.clip(img + noise, 0, 255).astype(np.uint8)
+
+
+def legacy_gaussian_cluster_rgb(img: np.ndarray, centers: np.ndarray,
+                                n: int = 80, sigma: float = 4.0,
+                                cluster_thresh: float = 10.0) -> list:
+    """The per-well Python implementation this benchmark is measured against."""
+    h, w = img.shape[:2]
+    out = []
+
+    def largest_cluster(points: np.ndarray) -> np.ndarray:
+        clusters: list[tuple[list[np.ndarray], np.ndarray]] = []
+        for p in points:
+            assigned = False
+            for cl in clusters:
+                if np.linalg.norm(p - cl[1]) <= cluster_thresh:
+                    cl[0].append(p)
+                    cl[1][:] = np.mean(cl[0], axis=0)
+                    assigned = True
+                    break
+            if not assigned:
+                clusters.append(([p], p.astype(float)))
+        if not clusters:
+            return np.array([0.0, 0.0, 0.0])
+        return max(clusters, key=lambda c: len(c[0]))[1]
+
+    for row in centers:
+        rrow = []
+        for cx, cy in row:
+            xs = np.clip(np.random.normal(cx, sigma, n).round().astype(int), 0, w - 1)
+            ys = np.clip(np.random.normal(cy, sigma, n).round().astype(int), 0, h - 1)
+            rrow.append(largest_cluster(img[ys, xs, ::-1].astype(np.float32)).tolist())
+        out.append(rrow)
+    return out
+
+
+def time_call(fn, repeats: int) -> float:
+    """Return the median wall time of ``fn()`` in milliseconds."""
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return float(np.median(times))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark per-plate colour reads.")
+    parser.add_argument("--plate-type", choices=["24", "48", "96"], default="96")
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    img = synthetic_plate(args.plate_type)
+    centers = PlateProcessor.well_centers(0, 0, 0, 0, args.plate_type, quad=QUAD)
+
+    cases = {
+        "legacy leader clustering": lambda: legacy_gaussian_cluster_rgb(img, centers),
+        "batched sampling engine": lambda: PlateProcessor.gaussian_cluster_rgb(img, centers),
+        "cached sample pattern": lambda: get_sample_pattern(QUAD, args.plate_type, img.shape).read(img),
+        "rectified block median": lambda: get_rectified_pattern(QUAD, args.plate_type, img.shape).read(img),
+    }
+    results = {name: time_call(fn, args.repeats) for name, fn in cases.items()}
+
+    base = results["legacy leader clustering"]
+    print(f"Per-plate read, {args.plate_type}-well plate, median of {args.repeats}:")
+    for name, ms in results.items():
+        print(f"  {name:<28} {ms:9.2f} ms   ({base / ms:6.1f}x)")
+
+    old = np.array(legacy_gaussian_cluster_rgb(img, centers))
+    new = np.array(PlateProcessor.gaussian_cluster_rgb(img, centers))
+    err = np.abs(old - new).max(axis=-1)
+    print(f"Max per-well deviation from legacy: {err.max():.2f} (median {np.median(err):.2f})")
+    rect = get_rectified_pattern(QUAD, args.plate_type, img.shape).read(img)
+    err = np.abs(old - rect).max(axis=-1)
+    print(f"Rectified reader deviation from legacy: {err.max():.2f} (median {np.median(err):.2f})")
+
+
+if __name__ == "__main__":
+    main()
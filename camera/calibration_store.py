@@ -0,0 +1,125 @@
+"""
+calibration_store.py — Cached calibration files
+================================================
+* Parses a calibration JSON file once and serves it from memory until the
+  file's mtime or size changes.
+* Holds the baseline colour correction of each plate as a ready float32
+  offset array, so correcting a read is a single subtraction.
+* Loads the colour LUT fitted from the calibration sheet
+  (``<calibration>_lut.npy``, see ``color_lut.py``) when one exists.
+* Finds the robot's lens calibration (``lens.json`` in the same directory,
+  see ``lens.py``).
+* Used by the plate processors and by ``get_plate_type`` in the robot
+  helpers. numpy is only imported when baseline offsets are requested, so the
+  robot helpers can read the plate type without it.
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+
+class Calibration:
+    """A parsed calibration file with lazily precomputed baseline offsets."""
+
+    def __init__(self, path: str, cfg: dict[str, Any]) -> None:
+        self.path = path
+        self.cfg = cfg
+        self._offsets: dict[str | None, Any] = {}
+        self._lut: tuple[tuple[int, int], Any] | None = None
+
+    @property
+    def plate_type(self) -> str:
+        return str(self.cfg.get("plate_type", "96"))
+
+    def baseline_offsets(self, plate: str | None = None):
+        """Return the ``(rows × cols × 3)`` float32 baseline offsets.
+
+        Parameters
+        ----------
+        plate:
+            Key of the plate section (e.g. ``"plate_1"``) for multi-plate
+            calibrations, or ``None`` for a single-plate file.
+
+        Returns
+        -------
+        np.ndarray | None
+            Each well's baseline minus the mean baseline colour, or ``None``
+            when the file has no baseline colours.
+        """
+        if plate not in self._offsets:
+            section = self.cfg if plate is None else self.cfg.get(plate) or {}
+            baseline = section.get("baseline_colors")
+            offsets = None
+            if baseline is not None:
+                import numpy as np
+                baseline_arr = np.array(baseline, np.float32)
+                offsets = baseline_arr - baseline_arr.mean(axis=(0, 1), keepdims=True)
+                offsets.setflags(write=False)
+            self._offsets[plate] = offsets
+        return self._offsets[plate]
+
+    def color_lut(self):
+        """Return the :class:`~camera.color_lut.ColorLUT` stored next to this
+        file, or ``None``. The table is reloaded when its file changes."""
+        from camera.color_lut import ColorLUT, lut_path
+        path = lut_path(self.path)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self._lut = None
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        if self._lut is None or self._lut[0] != stamp:
+            self._lut = (stamp, ColorLUT.load(path))
+        return self._lut[1]
+
+    def lens(self):
+        """Return the :class:`~camera.lens.Lens` of this file's robot, or ``None``."""
+        from camera.lens import lens_for_calibration
+        return lens_for_calibration(self.path)
+
+    def correct(self, raw, plate: str | None = None):
+        """Return ``raw`` colours with the baseline offsets subtracted."""
+        import numpy as np
+        raw = np.asarray(raw, np.float32)
+        offsets = self.baseline_offsets(plate)
+        if offsets is None:
+            return raw.copy()
+        return np.clip(raw - offsets, 0, None)
+
+
+_cache: dict[str, tuple[tuple[int, int], Calibration]] = {}
+
+
+def load_calibration(path: str) -> Calibration | None:
+    """Return the calibration stored at ``path``, or ``None`` if missing.
+
+    The parsed file is cached and reloaded only when its mtime or size
+    changes. Raises ``json.JSONDecodeError`` for malformed files.
+    """
+    key = os.path.abspath(path)
+    try:
+        st = os.stat(key)
+    except FileNotFoundError:
+        _cache.pop(key, None)
+        return None
+
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    with open(key) as f:
+        calibration = Calibration(path, json.load(f))
+    _cache[key] = (stamp, calibration)
+    return calibration
+
+
+def save_calibration(path: str, cfg: dict[str, Any]) -> Calibration:
+    """Write ``cfg`` to ``path`` and return the freshly cached calibration."""
+    with open(path, "w") as f:
+        json.dump(cfg, f, indent=2)
+    _cache.pop(os.path.abspath(path), None)
+    return load_calibration(path)
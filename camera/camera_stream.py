@@ -1,80 +1,517 @@
 import cv2
 import time
 import threading
+from typing import NamedTuple
+
+import numpy as np
+
+from camera.capture_backends import default_backend, lock_exposure, open_capture, unlock_exposure
+
+
+class Frame(NamedTuple):
+    """A captured frame with its sequence number and capture timestamp."""
+    image: np.ndarray
+    seq: int
+    timestamp: float
+    health: float = 1.0
+
 
 class CameraStream:
-    """Background camera capture."""
-    def __init__(self, cam_index: int = 0,
+    """Background camera capture.
+
+    Frames are captured into a fixed ring of preallocated buffers, so memory
+    use stays flat however long the stream runs. The capture thread always
+    fills the oldest slot that no reader is holding. Every stored frame gets
+    a monotonically increasing sequence number and the ``time.time()`` at
+    which its grab started, so callers can wait for a frame that was
+    captured after some event (see :meth:`read_after`) or denoise over the
+    latest few frames (see :meth:`read_stack`).
+
+    The capture thread also scores each frame's health (the fraction of
+    non-black pixels on a strided subsample), so readers never scan full
+    frames. Readers only get healthy frames and give up with a
+    ``RuntimeError`` after their timeout. When reads fail or frames stay
+    black for ``max_bad_frames`` in a row, the capture thread reopens the
+    device with exponential backoff; after ``restart_timeout`` seconds
+    without success the stream reports ``status == "down"`` and readers fail
+    immediately while reconnection continues in the background.
+
+    Opening is asynchronous: the constructor returns at once with
+    ``status == "connecting"`` and the capture thread opens the device with
+    the same bounded backoff, so a missing camera never blocks start-up.
+    After (re)opening, the thread reads up to ``warm`` frames and stops as
+    soon as ``stable_frames`` consecutive frames have the same mean level,
+    i.e. auto-exposure and white balance have settled. With
+    ``lock_settings`` it then fixes exposure and white balance at those
+    values so they do not drift between reads. The stream often opens
+    before the scene is lit, so locking is off by default; call
+    :meth:`lock_exposure` once the lighting is final to settle and lock
+    then (and again after every reconnect). Readers waiting for a frame
+    while the camera is connecting get their full timeout once it is up.
+    ``connected_at`` is when the latest (re)open finished warming up; frames
+    from a session that failed are dropped rather than served after it.
+
+    By default the stream is *idle*: the capture thread only ``grab()``s to
+    keep the driver's buffer current and decodes (``retrieve()``) only
+    while a reader is waiting, so plate reads every few seconds don't cost a
+    core of MJPEG decoding; one frame every ``IDLE_HEALTH_INTERVAL`` seconds
+    is decoded just to keep ``health`` current. Idle reads always wait for a
+    frame grabbed after the request. Pass ``live=True`` (or call
+    :meth:`set_live`) to decode every frame, e.g. for a preview window;
+    ``display_feed`` implies live.
+    """
+
+    #: every n-th row and column is inspected for the health score
+    HEALTH_STRIDE = 16
+    #: frames scoring below this are treated as a broken (black) camera
+    MIN_HEALTH = 0.1
+    #: largest change of the mean level (0–255) between two settled frames
+    STABLE_TOLERANCE = 2.0
+    #: seconds between the frames an idle stream decodes just to score health
+    IDLE_HEALTH_INTERVAL = 1.0
+
+    def __init__(self, cam_index: int | str = 0,
                  res: tuple[int, int] | None = (1920, 1080),
                  warm: int = 10,
-                 display_feed: bool = False) -> None:
-        display_feed = True
+                 display_feed: bool = False,
+                 live: bool = False,
+                 buffers: int = 6,
+                 backend: str | None = None,
+                 fps: float | None = None,
+                 max_bad_frames: int = 30,
+                 restart_timeout: float = 30.0,
+                 max_backoff: float = 8.0,
+                 stable_frames: int = 3,
+                 lock_settings: bool = False) -> None:
         self.cam_index = cam_index
-        self.cap = cv2.VideoCapture(cam_index, cv2.CAP_DSHOW)
-        while not self.cap.isOpened():
-            time.sleep(0.2)
-            self.cap = cv2.VideoCapture(cam_index, cv2.CAP_DSHOW)
-            print(f"Waiting for camera {cam_index} to open...")
-        if res:
-            w, h = res
-            self.cap.set(3, w)
-            self.cap.set(4, h)
-            time.sleep(0.2)
-        for _ in range(warm):
-            self.cap.read()
-            time.sleep(0.04)
-        self.frame = None
+        self.res = res
+        self.backend = backend
+        self.fps = fps
+        self.buffers = max(2, buffers)
+        self.max_bad_frames = max_bad_frames
+        self.restart_timeout = restart_timeout
+        self.max_backoff = max_backoff
+        self.warm = warm
+        self.stable_frames = stable_frames
+        self.lock_settings = lock_settings
+        self.locked = False
+        self._relock = threading.Event()          # lock_exposure() request
+        self._relocked = threading.Event()
+        self.cap = None
+
+        # ring state, guarded by _cond; a slot seq of -1 means "being written"
+        self._ring: np.ndarray | None = None
+        self._seqs = np.zeros(self.buffers, np.int64)
+        self._stamps = np.zeros(self.buffers, np.float64)
+        self._held = np.zeros(self.buffers, np.int32)
+        self._health = np.zeros(self.buffers, np.float32)
+        self._acc: np.ndarray | None = None       # read_stack scratch
+        self._stack: np.ndarray | None = None
+        self._reduce_lock = threading.Lock()      # one read_stack on the scratch at a time
+        self.seq = 0
+        self.timestamp = 0.0
+        self.health = 0.0
+        self._scored_at = 0.0                     # when health was last measured
+        self.status = "connecting"
+        self.connected_at = 0.0                   # end of the latest (re)open and warm-up
+        self._opened_at = 0.0                     # end of the first one
+        self.restarts = 0
+        self._bad_streak = 0
+        self._wanted = 0                          # readers waiting for a frame
+        self._cond = threading.Condition()
+
         self.running = True
         self.display_feed = display_feed
+        self.live = live or display_feed
         self.thread = threading.Thread(target=self._loop, daemon=True)
         self.thread.start()
 
+    # ───────────────────────────── capture thread ─────────────────────────
+    def _next_slot(self) -> int:
+        """Return the oldest slot no reader holds, or -1 if all are held (caller holds the lock)."""
+        free = np.flatnonzero(self._held == 0)
+        if free.size == 0:
+            return -1
+        return int(free[np.argmin(self._seqs[free])])
+
+    def _store(self, slot: int, frm: np.ndarray) -> None:
+        """Make sure ``frm`` ends up in ``slot``, reallocating on a size change."""
+        if self._ring is None or self._ring.shape[1:] != frm.shape:
+            with self._cond:
+                self._ring = np.empty((self.buffers, *frm.shape), frm.dtype)
+                self._seqs[:] = 0
+                self._acc = self._stack = None
+        if frm.ctypes.data != self._ring[slot].ctypes.data:
+            self._ring[slot] = frm
+
+    def _score(self, frm: np.ndarray) -> float:
+        """Fraction of non-black pixels on a strided subsample of ``frm``."""
+        step = self.HEALTH_STRIDE
+        return float(np.count_nonzero(frm[::step, ::step])) / frm[::step, ::step].size
+
+    def _connect(self, delay: float = 0.0) -> bool:
+        """Open the device with exponential backoff, then warm it up (capture thread only).
+
+        Returns ``False`` if the stream was stopped first.
+        """
+        started = time.time()
+        while self.running:
+            if self.cap is not None:
+                self.cap.release()
+                self.cap = None
+            time.sleep(delay)
+            try:
+                cap = open_capture(self.cam_index, self.backend, res=self.res, fps=self.fps)
+            except Exception as e:
+                print(f"Camera {self.cam_index} open failed: {e}")
+                cap = None
+            if cap is not None and cap.isOpened():
+                self.cap = cap
+                self._bad_streak = 0
+                self._warm_up()
+                self._scored_at = time.time()
+                with self._cond:
+                    self.connected_at = time.time()
+                    if self.status == "connecting":
+                        self._opened_at = self.connected_at
+                    self.status = "ok"
+                    self._cond.notify_all()
+                return True
+            if cap is not None:
+                cap.release()
+            if self.status != "down" and time.time() - started > self.restart_timeout:
+                print(f"Camera {self.cam_index} is down; still retrying every {self.max_backoff:.0f}s")
+                with self._cond:
+                    self.status = "down"
+                    self._cond.notify_all()
+            elif self.status == "connecting":
+                print(f"Waiting for camera {self.cam_index} to open...")
+            delay = min(max(delay * 2, 0.2), self.max_backoff)
+        return False
+
+    def _warm_up(self) -> None:
+        """Read frames until their mean level settles, then lock exposure and white balance."""
+        step = self.HEALTH_STRIDE
+        prev, steady = None, 0
+        for _ in range(self.warm):
+            ok, frm = self.cap.read()
+            if not ok or frm is None:
+                time.sleep(0.04)
+                continue
+            level = frm[::step, ::step].reshape(-1, frm.shape[-1] if frm.ndim == 3 else 1).mean(axis=0)
+            steady = steady + 1 if prev is not None and np.abs(level - prev).max() <= self.STABLE_TOLERANCE else 0
+            prev = level
+            if steady >= self.stable_frames:
+                break
+        if self.lock_settings:
+            self.locked = lock_exposure(self.cap, self.backend or default_backend(self.cam_index))
+
+    def _reopen(self, reason: str) -> None:
+        """Reopen the device with exponential backoff (capture thread only)."""
+        print(f"Camera {self.cam_index} {reason}, restarting...")
+        with self._cond:
+            self.status = "restarting"
+            # frames of the old session are not served once it has failed
+            self._seqs[:] = 0
+        self.restarts += 1
+        if self._connect(delay=0.5):
+            print(f"Camera {self.cam_index} reopened")
+
+    def _settle_and_lock(self) -> None:
+        """Let the automatics adapt to the current scene, then lock (capture thread only)."""
+        self._relock.clear()
+        unlock_exposure(self.cap, self.backend or default_backend(self.cam_index))
+        self._warm_up()
+        self._relocked.set()
+
+    def lock_exposure(self, timeout: float = 10.0) -> bool:
+        """Settle exposure and white balance on the current scene and fix them.
+
+        Call this once the lighting is final (e.g. after the OT-2 lights
+        have come on). The stream keeps them locked across reconnects from
+        then on. Returns whether the camera accepted the settings within
+        ``timeout``; replayed recordings and some drivers ignore them. The
+        capture thread finishes the request even after ``timeout``, and
+        captures no new frames until it has.
+        """
+        self.lock_settings = True
+        self._relocked.clear()
+        self._relock.set()
+        return self._relocked.wait(timeout) and self.locked
+
+    def _score_idle(self) -> None:
+        """Decode the grabbed frame only to refresh ``health`` (capture thread only)."""
+        self._scored_at = time.time()
+        ok, frm = self.cap.retrieve()
+        if ok and frm is not None:
+            with self._cond:
+                self.health = self._score(frm)
+
+    def set_live(self, live: bool = True) -> None:
+        """Switch between continuous decode (live) and decode-on-demand (idle)."""
+        self.live = live or self.display_feed
+
     def _loop(self) -> None:
+        if not self._connect():
+            return
         while self.running:
-            ret, frm = self.cap.read()
+            if self._relock.is_set():
+                self._settle_and_lock()
+            if not (self.live or self._wanted):
+                # idle: keep the driver buffer fresh without decoding
+                if self.cap.grab():
+                    self._bad_streak = 0
+                    if time.time() - self._scored_at > self.IDLE_HEALTH_INTERVAL:
+                        self._score_idle()
+                else:
+                    self._bad_streak += 1
+                    if self._bad_streak >= self.max_bad_frames:
+                        self._reopen("stopped delivering frames")
+                        continue
+                time.sleep(0.01)
+                continue
+            with self._cond:
+                slot = self._next_slot()
+                if slot >= 0:
+                    self._seqs[slot] = -1
+            if slot < 0:
+                # readers hold every slot: drop this frame, keep the driver buffer fresh
+                self.cap.grab()
+                time.sleep(0.01)
+                continue
+            buf = self._ring[slot] if self._ring is not None else None
+            t = time.time()
+            ret, frm = self.cap.read(buf) if buf is not None else self.cap.read()
+            health = 0.0
             if ret:
-                self.frame = frm
-                if self.display_feed:
-                    cv2.imshow(f"Camera {self.cam_index}", frm)
-                    if cv2.waitKey(1) & 0xFF == ord('q'):
-                        break
+                self._store(slot, frm)
+                health = self._score(self._ring[slot])
+            with self._cond:
+                if ret:
+                    self.seq += 1
+                    self.timestamp = t
+                    self.health = health
+                    self._scored_at = t
+                    self._seqs[slot] = self.seq
+                    self._stamps[slot] = t
+                    self._health[slot] = health
+                    self._cond.notify_all()
+                else:
+                    self._seqs[slot] = 0
+            self._bad_streak = 0 if health >= self.MIN_HEALTH else self._bad_streak + 1
+            if self._bad_streak >= self.max_bad_frames:
+                self._reopen("is returning black frames" if ret else "stopped delivering frames")
+                continue
+            if ret and self.display_feed:
+                cv2.imshow(f"Camera {self.cam_index}", self._ring[slot])
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
             time.sleep(0.01)
 
-    def read(self):
-        # Sometimes, this camera breaks and returns all black.
-        # If 90% of the pixels are pure black, we assume it's broken.
-        # Kill the thread and restart it.
-        while self.frame is None or (self.frame == 0).mean() > 0.9:
-            print(f"Camera {self.cam_index} appears to be broken, restarting...")
-            self.stop()
-            self.__init__(self.cam_index)
-            time.sleep(1)
+    # ──────────────────────────────── readers ─────────────────────────────
+    @property
+    def frame(self) -> np.ndarray | None:
+        """View of the most recent frame (may be overwritten; prefer read())."""
+        with self._cond:
+            if self.seq == 0:
+                return None
+            return self._ring[int(np.argmax(self._seqs))]
+
+    @property
+    def healthy(self) -> bool:
+        """True if the latest frame passed the health check."""
+        return self.status == "ok" and self.health >= self.MIN_HEALTH
+
+    def _usable(self, since: float) -> np.ndarray:
+        """Mask of healthy slots captured after ``since`` (caller holds the lock)."""
+        return ((self._seqs > 0) & (self._stamps > since)
+                & (self._health >= self.MIN_HEALTH))
+
+    def _wait_for(self, n: int, after: float | None, timeout: float) -> np.ndarray:
+        """Block until ``n`` healthy frames captured after ``after`` are in the ring.
+
+        In idle mode ``after=None`` means "after now", since the ring only
+        holds frames decoded for earlier requests.
+        """
+        if after is None and not self.live:
+            after = time.time()
+        since = -np.inf if after is None else after
+        deadline = max(time.time(), since) + timeout
+        self._wanted += 1
+        try:
+            while np.count_nonzero(usable := self._usable(since)) < n:
+                connecting = self.status == "connecting"
+                # time spent connecting does not count against the timeout
+                remaining = max(deadline, self._opened_at + timeout) - time.time()
+                if (remaining <= 0 and not connecting) or not self.running or self.status == "down":
+                    what = "no healthy frame" if after is None else f"no healthy frame captured after {after:.3f}"
+                    raise RuntimeError(f"Camera {self.cam_index} ({self.status}): {what}")
+                self._cond.wait(0.1 if connecting else remaining)
+        finally:
+            self._wanted -= 1
+        return usable
+
+    def _hold_latest(self, n: int, after: float | None, timeout: float) -> np.ndarray:
+        """Wait for the ``n`` newest usable slots and pin them against overwriting.
+
+        At least one slot always stays unpinned for the capture thread; a
+        reader that would pin the last one waits for others to release
+        theirs. The caller holds the lock.
+        """
+        if after is None and not self.live:
+            after = time.time()                   # the same "now" on every retry
+        deadline = time.time() + timeout
+        while True:
+            slots = np.flatnonzero(self._wait_for(n, after, timeout))
+            slots = slots[np.argsort(self._seqs[slots])[::-1][:n]]
+            if np.count_nonzero(self._held) + np.count_nonzero(self._held[slots] == 0) < self.buffers:
+                self._held[slots] += 1
+                return slots
+            if time.time() >= deadline:
+                raise RuntimeError(f"Camera {self.cam_index}: every frame buffer is held by a reader")
+            self._cond.wait(deadline - time.time())
 
-        return self.frame
+    def _release(self, slots: np.ndarray) -> None:
+        with self._cond:
+            self._held[slots] -= 1
+            self._cond.notify_all()
+
+    def _copy_latest(self, after: float | None = None,
+                     timeout: float = 5.0) -> Frame:
+        with self._cond:
+            slot = self._hold_latest(1, after, timeout)
+            i = slot[0]
+            meta = int(self._seqs[i]), float(self._stamps[i]), float(self._health[i])
+        try:
+            return Frame(self._ring[i].copy(), *meta)
+        finally:
+            self._release(slot)
+
+    def read(self, timeout: float = 10.0) -> np.ndarray:
+        """Return a copy of the latest healthy frame.
+
+        Sometimes this camera breaks and returns all black; the capture
+        thread restarts it, and this waits up to ``timeout`` seconds for it
+        to recover before raising ``RuntimeError``.
+        """
+        return self._copy_latest(timeout=timeout).image
+
+    def read_frame(self, after: float | None = None,
+                   timeout: float = 5.0) -> Frame:
+        """Return a copy of the latest frame with its sequence number and timestamp.
+
+        Parameters
+        ----------
+        after:
+            If given, block until a frame whose grab started after this
+            ``time.time()`` value is available.
+        timeout:
+            Seconds to wait beyond ``after`` (or now, whichever is later)
+            before raising ``RuntimeError``.
+        """
+        return self._copy_latest(after, timeout)
+
+    def read_after(self, t: float, timeout: float = 5.0) -> np.ndarray:
+        """Return the first available frame captured after time ``t``."""
+        return self.read_frame(after=t, timeout=timeout).image
+
+    def read_stack(self, n: int = 5, reducer: str = "median",
+                   after: float | None = None,
+                   timeout: float = 5.0) -> np.ndarray:
+        """Return a temporally denoised frame from the ``n`` newest frames.
+
+        Parameters
+        ----------
+        n:
+            Number of frames to combine; at most ``buffers - 1``.
+        reducer:
+            ``"median"`` (robust to flicker) or ``"mean"``.
+        after:
+            If given, only frames captured after this time are combined.
+        timeout:
+            Seconds to wait for enough frames before raising ``RuntimeError``.
+
+        The reduction runs in scratch buffers allocated once per stream;
+        only the returned frame is allocated per call. Concurrent calls take
+        turns on the scratch buffers.
+        """
+        if reducer not in ("median", "mean"):
+            raise ValueError(f"Unknown reducer: {reducer}")
+        if not 1 <= n < self.buffers:
+            raise ValueError(f"n must be between 1 and {self.buffers - 1}")
+        with self._reduce_lock:
+            with self._cond:
+                slots = self._hold_latest(n, after, timeout)
+                ring = self._ring
+                if self._acc is None:
+                    self._acc = np.empty(ring.shape[1:], np.float32)
+                    self._stack = np.empty((self.buffers - 1, *ring.shape[1:]), ring.dtype)
+                acc, stack = self._acc, self._stack
+            try:
+                if reducer == "mean":
+                    acc.fill(0)
+                    for slot in slots:
+                        np.add(acc, ring[slot], out=acc)
+                    acc *= 1.0 / n
+                else:
+                    np.take(ring, slots, axis=0, out=stack[:n])
+                    np.median(stack[:n], axis=0, out=acc, overwrite_input=True)
+            finally:
+                self._release(slots)
+            return np.rint(acc).astype(ring.dtype)
 
     def stop(self) -> None:
         self.running = False
+        with self._cond:
+            self._cond.notify_all()
         self.thread.join()
-        self.cap.release()
+        if self.cap is not None:
+            self.cap.release()
 
-_streams: dict[int, CameraStream] = {}
+_streams: dict[int | str, CameraStream] = {}
 
 
-def get_stream(cam_index: int = 0,
+def get_stream(cam_index: int | str = 0,
                res: tuple[int, int] | None = (1600, 1200),
                warm: int = 10,
-               display_feed: bool = False) -> CameraStream:
-    """Return a running CameraStream for the given index."""
+               display_feed: bool = False,
+               live: bool = False,
+               backend: str | None = None,
+               fps: float | None = None,
+               shared: bool = True) -> CameraStream:
+    """Return a running CameraStream for the given index.
+
+    ``cam_index`` may also be the path of a recording, which is replayed
+    through the ``"replay"`` backend (see :mod:`camera.capture_backends`).
+    With ``shared`` set and a :class:`~camera.frame_bus.FrameServer` for the
+    camera running in another process, a reader on its shared-memory ring
+    is returned instead of opening the device again. A cached stream that
+    has stopped, e.g. a reader whose server has exited, is replaced.
+    """
     stream = _streams.get(cam_index)
+    if stream is not None and not stream.running:
+        print(f"Camera {cam_index}: stream stopped, reconnecting")
+        stream.stop()
+        del _streams[cam_index]
+        stream = None
+    if stream is None and shared:
+        from camera.frame_bus import attach
+        stream = attach(cam_index)
+        if stream is not None:
+            print(f"Camera {cam_index}: using frame server")
+            _streams[cam_index] = stream
     if stream is None:
-        stream = CameraStream(cam_index, res=res, warm=warm, display_feed=display_feed)
+        stream = CameraStream(cam_index, res=res, warm=warm, display_feed=display_feed,
+                              live=live, backend=backend, fps=fps)
         _streams[cam_index] = stream
+    elif live:
+        stream.set_live()
     return stream
 
 
 if __name__ == "__main__":
     # Example usage
-    stream = get_stream(cam_index=0, res=(640, 480), warm=5, display_feed=True)
+    stream = get_stream(cam_index=0, res=(640, 480), warm=5, live=True)
     try:
         while True:
             frame = stream.read()
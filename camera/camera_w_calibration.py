@@ -3,7 +3,8 @@
 """
 camera_color_baseline.py  —  Baseline Color Calibration Pipeline
 ================================================================
-* UI shows 4 draggable dots to define the plate's homography.
+* UI shows 4 draggable dots to define the plate's homography, on a
+  downscaled preview that is only redrawn when something changes.
 * Supports 12 / 24 / 48 / 96 well plates.
 * Saves / loads plate corners, plate type, and baseline colors for consistent
   lighting reads.
@@ -20,12 +21,17 @@ import sys
 import random
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
-from camera.camera_stream import get_stream
+from camera.calibration_store import load_calibration, save_calibration
+from camera.lens import lens_for_calibration
+from camera.multi_plate_processor import MultiPlateProcessor, PlateLayout
+from camera.preview_canvas import PreviewCanvas
+from camera.well_sampling import (PLATE_SHAPES, get_plate_reader,
+                                   quad_well_centers, sample_plate_rgb)
 
 WIN = "Calibration"            # OpenCV window name
 
 # ═════════════════════════════ PlateProcessor ═════════════════════════════
-class PlateProcessor:
+class PlateProcessor(MultiPlateProcessor):
     """Camera plate processor.
 
     Handles camera snapshot, UI calibration for baseline colors, and diagnostic
@@ -34,39 +40,32 @@ class PlateProcessor:
     mirrors the ``OT2Manager``'s virtual mode for easier testing.
     """
 
-    def __init__(self, virtual_mode: bool = False, boost_saturation: bool = False) -> None:
-        self.virtual_mode = virtual_mode
-        self.boost_saturation = boost_saturation
+    RAW_MATRIX_FILE = "camera/raw_matrix.json"
+    OUTPUT_FILE = "camera/output_with_read_colors.jpg"
+
+    def __init__(self, virtual_mode: bool = False, boost_saturation: bool = False,
+                 **options) -> None:
+        # every other option (writer, reader, thresholds, ...) is documented
+        # on MultiPlateProcessor and passed on by keyword
+        super().__init__(virtual_mode=virtual_mode, boost_saturation=boost_saturation,
+                         **options)
         # four plate corners
         self.pts: list[tuple[int, int]] = []
 
         # UI state
         self.drag_idx = -1
         self.img_copy: np.ndarray | None = None
+        self.canvas: PreviewCanvas | None = None
         self.confirmed = False
         self.btnTL: tuple[int, int] | None = None
         self.BW, self.BH = 140, 30          # confirm-button size
 
-    # ───────────────────────────── camera snapshot ────────────────────────
-    @staticmethod
-    def snapshot(cam: int = 0, path: str = "camera/snapshot.jpg",
-                 warm: int = 10, burst: int = 5,
-                 res: tuple[int, int] | None = (1920, 1080)) -> str:
-        """Return the latest frame captured by a background thread."""
-        stream = get_stream(cam_index=cam, res=res, warm=warm)
-        img = stream.read()
-        if img is None:
-            raise RuntimeError("No frame captured")
-        Path(path).parent.mkdir(parents=True, exist_ok=True)
-        cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 95])
-        return path
+    @property
+    def changed(self) -> np.ndarray | None:
+        """Wells re-read by the last read (rows × cols bool)."""
+        return self.changed_by_plate.get("plate")
 
     # ─────────────────────────── misc helper methods ──────────────────────
-    @staticmethod
-    def plate_from_tb(val: int) -> str:
-        """Track-bar value → plate type."""
-        return {0: "12", 1: "24", 2: "48", 3: "96"}.get(val, "96")
-
     @staticmethod
     def well_centers(x1: int, y1: int, x2: int, y2: int,
                      plate: str = "96",
@@ -85,8 +84,7 @@ class PlateProcessor:
             bottom-right, bottom-left) defining a perspective transform.
         """
 
-        rows, cols = {"12": (8, 12), "24": (4, 6),
-                      "48": (6, 8),  "96": (8, 12)}[plate]
+        rows, cols = PLATE_SHAPES[plate]
 
         if quad is None:
             dx, dy = (x2 - x1) / cols, (y2 - y1) / rows
@@ -97,18 +95,16 @@ class PlateProcessor:
                                   y1 + (r + 0.5) * dy)
             return grid
 
-        src = np.array([[0, 0], [cols, 0], [cols, rows], [0, rows]],
-                       np.float32)
-        dst = np.array(quad, np.float32)
-        H = cv2.getPerspectiveTransform(src, dst)
+        return quad_well_centers(quad, plate)
 
-        xs = np.linspace(0.5, cols - 0.5, cols)
-        ys = np.linspace(0.5, rows - 0.5, rows)
-        grid = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2)
-        homog = np.concatenate([grid, np.ones((grid.shape[0], 1))], axis=1)
-        warped = (H @ homog.T).T
-        warped = warped[:, :2] / warped[:, 2:3]
-        return warped.reshape(rows, cols, 2)
+    @staticmethod
+    def plate_quad(cfg: dict) -> list[tuple[int, int]]:
+        """Return the calibrated plate corners, falling back to the rectangle."""
+        if cfg.get("corners"):
+            return cfg["corners"]
+        r = cfg["rectangle"]
+        return [(r["x1"], r["y1"]), (r["x2"], r["y1"]),
+                (r["x2"], r["y2"]), (r["x1"], r["y2"])]
 
     # ─────────────────────── per-well trimmed-mean colour ─────────────────
 
@@ -137,84 +133,39 @@ class PlateProcessor:
         list
             Nested Python lists (rows × cols × 3) of RGB values.
         """
-        h, w = img.shape[:2]
-        out = []
-
-        def largest_cluster(points: np.ndarray) -> np.ndarray:
-            clusters: list[tuple[list[np.ndarray], np.ndarray]] = []
-            for p in points:
-                assigned = False
-                for cl in clusters:
-                    if np.linalg.norm(p - cl[1]) <= cluster_thresh:
-                        cl[0].append(p)
-                        cl[1][:] = np.mean(cl[0], axis=0)
-                        assigned = True
-                        break
-                if not assigned:
-                    clusters.append(([p], p.astype(float)))
-            if not clusters:
-                return np.array([0.0, 0.0, 0.0])
-            largest = max(clusters, key=lambda c: len(c[0]))
-            return largest[1]
-
-        for row in centers:
-            rrow = []
-            for cx, cy in row:
-                xs = np.random.normal(cx, sigma, n).round().astype(int)
-                ys = np.random.normal(cy, sigma, n).round().astype(int)
-                xs = np.clip(xs, 0, w - 1)
-                ys = np.clip(ys, 0, h - 1)
-                samples = img[ys, xs, ::-1].astype(np.float32)  # RGB
-                centroid = largest_cluster(samples)
-                rrow.append(centroid.tolist())
-            out.append(rrow)
-        return out
-
-    # ────────────────── Brightness/Saturation Adjustment ──────────────────
-    @staticmethod
-    def adjust_brightness_saturation(rgb_colors: np.ndarray,
-                                     brightness_factor: float = 1.1,
-                                     saturation_factor: float = 1.2) -> np.ndarray:
+        return sample_plate_rgb(img, centers, n, sigma, cluster_thresh).tolist()
+
+    # ─────────────────────────────── plate reads ──────────────────────────
+    def plate_layout(self, cfg: dict) -> PlateLayout:
+        """The single plate of a calibration, once its baseline is recorded."""
+        if "baseline_colors" not in cfg or not (cfg.get("corners") or cfg.get("rectangle")):
+            return {}
+        return {"plate": (self.plate_quad(cfg), str(cfg["plate_type"]), None)}
+
+    def read_wells(self, wells: list[tuple[int, int]],
+                   frame: np.ndarray | None = None,
+                   cam_index: int | str = 2,
+                   calib: str = "camera/calibration.json",
+                   after: float | None = None) -> np.ndarray:
+        """Return the adjusted ``(len(wells) × 3)`` RGB colours of the listed wells.
+
+        Only the ``(row, col)`` wells asked for are sampled, from ``frame`` or
+        from a freshly grabbed frame, using the stored calibration. Nothing
+        is written to disk and the calibration UI is never opened.
         """
-        Adjusts the brightness and saturation of an array of RGB colors using
-        the HSV color space.
-        
-        Parameters
-        ----------
-        rgb_colors : np.ndarray
-            Input array of RGB colors with values in the 0-255 range.
-        brightness_factor : float
-            Factor to multiply the brightness (Value) by. >1 increases, <1 decreases.
-        saturation_factor : float
-            Factor to multiply the saturation by. >1 increases, <1 decreases.
-            
-        Returns
-        -------
-        np.ndarray
-            Array of adjusted RGB colors as float32.
-        """
-        # Convert to uint8 for HSV conversion, ensuring values are clipped
-        img_rgb_u8 = np.clip(rgb_colors, 0, 255).astype(np.uint8)
-        
-        # Convert RGB to HSV
-        img_hsv = cv2.cvtColor(img_rgb_u8, cv2.COLOR_RGB2HSV)
-        
-        h, s, v = cv2.split(img_hsv)
-        
-        # Apply factors to S and V channels, casting to float for multiplication
-        # to prevent overflow, then clipping and converting back to uint8.
-        s = np.clip(s.astype(np.float32) * saturation_factor, 0, 255).astype(np.uint8)
-        v = np.clip(v.astype(np.float32) * brightness_factor, 0, 255).astype(np.uint8)
-        
-        # Merge the channels and convert back to RGB
-        final_hsv = cv2.merge([h, s, v])
-        final_rgb = cv2.cvtColor(final_hsv, cv2.COLOR_HSV2RGB)
-        
-        return final_rgb.astype(np.float32)
+        if self.virtual_mode:
+            return np.random.randint(0, 256, (len(wells), 3)).astype(np.float32)
+        return self.read_plate_wells("plate", wells, frame, cam_index, calib, after)
+
+    # ─────────────────────────── diagnostic output ────────────────────────
+    @staticmethod
+    def matrix_json(colors: dict[str, np.ndarray]) -> list:
+        """The single plate's colour matrix, as ``raw_matrix.json`` has always held it."""
+        return colors["plate"].tolist()
 
     # ───────────────────────────── UI helpers ─────────────────────────────
-    def draw_ui(self, disp: np.ndarray) -> np.ndarray:
-        """Overlay instructions, rectangle, sample dots, confirm button."""
+    def draw_static(self, disp: np.ndarray) -> None:
+        """Draw the instructions and the confirm button (drawn once per UI)."""
         h, w = disp.shape[:2]
 
         # 1) instructions
@@ -225,41 +176,45 @@ class PlateProcessor:
             cv2.putText(disp, txt, (10, 30 + 30 * i),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
 
-        # 2) plate rectangle & well centres
-        for i, pt in enumerate(self.pts):
+        # 2) confirm button
+        self.btnTL = (w - self.BW - 10, h - self.BH - 10)
+        bx, by = self.btnTL
+        cv2.rectangle(disp, (bx, by), (bx + self.BW, by + self.BH),
+                      (50, 205, 50), -1)
+        cv2.putText(disp, "Confirm", (bx + 10, by + self.BH - 8),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+    def draw_ui(self, disp: np.ndarray) -> np.ndarray:
+        """Overlay plate corners, rectangle and sample dots on the preview."""
+        canvas = self.canvas
+        pts = [tuple(p) for p in canvas.to_view(self.pts)]
+        for i, pt in enumerate(pts):
             cv2.circle(disp, pt, 15, (0, 0, 255), -1)
             cv2.putText(disp, str(i + 1), (pt[0] + 5, pt[1] - 5),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 0, 0), 2)
 
-        if len(self.pts) == 4:
+        if len(pts) == 4:
             for i in range(4):
-                cv2.line(disp, self.pts[i], self.pts[(i + 1) % 4],
-                         (0, 255, 0), 2)
-            xs = [p[0] for p in self.pts]
-            ys = [p[1] for p in self.pts]
-            rx1, ry1, rx2, ry2 = min(xs), min(ys), max(xs), max(ys)
-            cv2.rectangle(disp, (rx1, ry1), (rx2, ry2), (255, 0, 0), 1)
+                cv2.line(disp, pts[i], pts[(i + 1) % 4], (0, 255, 0), 2)
+            xs = [p[0] for p in pts]
+            ys = [p[1] for p in pts]
+            cv2.rectangle(disp, (min(xs), min(ys)), (max(xs), max(ys)), (255, 0, 0), 1)
 
+            # well centres are only re-projected when the corners or type change
             plate = self.plate_from_tb(cv2.getTrackbarPos("Plate", WIN))
-            for cx, cy in self.well_centers(rx1, ry1, rx2, ry2,
-                                            plate,
-                                            quad=self.pts).reshape(-1, 2):
+            centers = canvas.cached("wells", (tuple(self.pts), plate), lambda: canvas.to_view(
+                self.projected_centers(self.pts, plate, canvas.full_shape)).reshape(-1, 2))
+            for cx, cy in centers:
                 cv2.circle(disp, (int(cx), int(cy)), 4, (0, 0, 255), -1)
-
-        # 3) confirm button
-        self.btnTL = (w - self.BW - 10, h - self.BH - 10)
-        bx, by = self.btnTL
-        cv2.rectangle(disp, (bx, by), (bx + self.BW, by + self.BH),
-                      (50, 205, 50), -1)
-        cv2.putText(disp, "Confirm", (bx + 10, by + self.BH - 8),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         return disp
 
     def update_win(self) -> None:
-        cv2.imshow(WIN, self.draw_ui(self.img_copy.copy()))
+        """Schedule a redraw; the UI loop repaints at most at the display rate."""
+        self.canvas.invalidate()
 
     # ---------------------------- mouse callback --------------------------
     def on_mouse(self, event, x, y, flags, param) -> None:
+        # x, y are preview coordinates
         if event == cv2.EVENT_LBUTTONDOWN:
             # confirm button?
             if (self.btnTL and
@@ -269,16 +224,14 @@ class PlateProcessor:
                 return
 
             # corner?
-            for i, pt in enumerate(self.pts):
-                if np.hypot(x - pt[0], y - pt[1]) < 12:
+            for i, (px, py) in enumerate(self.canvas.to_view(self.pts)):
+                if np.hypot(x - px, y - py) < 12:
                     self.drag_idx = i
                     return
 
         elif event == cv2.EVENT_MOUSEMOVE:
-            h, w = self.img_copy.shape[:2]
             if self.drag_idx != -1:
-                self.pts[self.drag_idx] = (max(0, min(x, w - 1)),
-                                           max(0, min(y, h - 1)))
+                self.pts[self.drag_idx] = self.canvas.to_full(x, y)
                 self.update_win()
 
         elif event == cv2.EVENT_LBUTTONUP:
@@ -289,7 +242,9 @@ class PlateProcessor:
                prev: dict | None,
                default_plate: str = "96") -> dict | None:
         """Open the calibration UI; return calibration dict or None if cancel."""
-        self.img_copy = img.copy()
+        self.img_copy = img
+        self.canvas = PreviewCanvas(img)
+        self.canvas.render_static(self.draw_static)
         h, w = img.shape[:2]
         mW, mH = int(w * 0.1), int(h * 0.1)
 
@@ -315,10 +270,10 @@ class PlateProcessor:
         cv2.createTrackbar("Plate", WIN, plate_idx, 3,
                            lambda v: self.update_win())
 
-        self.update_win()
         start = time.time()
         while True:
-            key = cv2.waitKey(20) & 0xFF
+            self.canvas.show(WIN, self.draw_ui)
+            key = cv2.waitKey(5) & 0xFF
             if key == 27 or time.time() - start > 180:   # ESC or timeout
                 break
             if key == ord('c'):
@@ -335,38 +290,56 @@ class PlateProcessor:
         plate_idx = cv2.getTrackbarPos("Plate", WIN)
         cv2.destroyWindow(WIN)      # now it is safe to close
 
-        xs=[p[0] for p in self.pts]; ys=[p[1] for p in self.pts]
+        return self.calibration_from_corners(img, self.pts, self.plate_from_tb(plate_idx))
+
+    def calibration_from_corners(self, img: np.ndarray,
+                                 corners: list[tuple[int, int]],
+                                 plate: str) -> dict:
+        """Return the calibration dict for ``corners``, with baseline colours read from ``img``."""
+        xs=[p[0] for p in corners]; ys=[p[1] for p in corners]
         rect={"x1":int(min(xs)),"y1":int(min(ys)),
               "x2":int(max(xs)),"y2":int(max(ys))}
-        plate = self.plate_from_tb(plate_idx)
 
-        centers = self.well_centers(rect["x1"], rect["y1"], rect["x2"], rect["y2"],
-                                    plate, quad=self.pts)
-        baseline = self.gaussian_cluster_rgb(img, centers)
+        reader = get_plate_reader(corners, plate, img.shape, self.reader, self.lens)
+        baseline = reader.read(img).tolist()
 
         return {
             "rectangle": rect,
             "plate_type": plate,
-            "corners": self.pts,
+            "corners": corners,
             "baseline_colors": baseline,
         }
 
+    def detect_calibration(self, img: np.ndarray, names: list[str] | None = None,
+                           plate_type: str | None = None) -> tuple[dict | None, float]:
+        """Propose a single-plate calibration from the plate found in ``img``."""
+        cfg, confidence = super().detect_calibration(img, ["plate"], plate_type)
+        if cfg is None:
+            return None, 0.0
+        return self.calibration_from_corners(img, cfg["plate"]["corners"],
+                                             cfg["plate_type"]), confidence
+
     # -------------------------- main processing ---------------------------
-    def process_image(self, cam_index: int = 2,
-                      snap: str = "camera/snapshot.jpg",
+    def process_image(self, cam_index: int | str = 2,
+                      snap: str | None = "camera/snapshot.jpg",
                       calib: str = "camera/calibration.json",
                       force_ui: bool = False,
-                      plate_type: str | None = None):
-        """Capture and return the adjusted plate colours."""
+                      plate_type: str | None = None,
+                      after: float | None = None):
+        """Capture and return the adjusted plate colours.
+
+        The frame from the camera stream is sampled directly. ``snap`` only
+        controls where a copy is saved as a JPEG; pass ``None`` to skip it.
+        ``after`` is a ``time.time()`` value; when given, only a frame
+        captured after it is used (e.g. the end of a robot action).
+        """
 
         if self.virtual_mode:
-            cfg = None
-            if os.path.exists(calib):
-                try:
-                    with open(calib) as f:
-                        cfg = json.load(f)
-                except json.JSONDecodeError:
-                    cfg = None
+            try:
+                calibration = load_calibration(calib)
+            except json.JSONDecodeError:
+                calibration = None
+            cfg = calibration.cfg if calibration else None
 
             plate = plate_type or (cfg.get("plate_type") if cfg else "96")
             rows, cols = {"12": (8, 12), "24": (4, 6), "48": (6, 8), "96": (8, 12)}.get(str(plate), (8, 12))
@@ -376,12 +349,8 @@ class PlateProcessor:
                     out[r, c] = [random.randint(0, 255) for _ in range(3)]
             return out
 
-        self.snapshot(cam_index, snap)
-
-        cfg = None
-        if os.path.exists(calib):
-            with open(calib) as f:
-                cfg = json.load(f)
+        calibration = load_calibration(calib)
+        cfg = dict(calibration.cfg) if calibration else None
 
         if plate_type:
             if cfg is None:
@@ -389,70 +358,37 @@ class PlateProcessor:
             else:
                 cfg["plate_type"] = plate_type
 
+        frame = self.grab_checked(cam_index, calibration, self.plate_layout(cfg or {}), after)
+        img = frame.image
+        if snap:
+            self.writer.submit(snap, lambda path: self.save_snapshot(img, path))
+
         if force_ui or cfg is None or "baseline_colors" not in cfg:
-            img_for_ui = cv2.imread(snap)
-            if img_for_ui is None:
-                raise RuntimeError(f"Failed to read snapshot for UI: {snap}")
-            cfg = self.run_ui(img_for_ui, cfg, default_plate=(cfg or {}).get("plate_type", "96"))
+            self.lens = lens_for_calibration(calib)
+            # try the detected plate first; the UI starts from it if unsure
+            proposal, confidence = (None, 0.0) if force_ui else self.detect_calibration(
+                img, plate_type=plate_type)
+            if proposal is not None and self.accept_detection(confidence):
+                cfg = proposal
+            else:
+                cfg = self.run_ui(img, proposal or cfg,
+                                  default_plate=(proposal or cfg or {}).get("plate_type", "96"))
             if cfg is None:
                 raise RuntimeError("Calibration cancelled")
-            with open(calib, "w") as f:
-                json.dump(cfg, f, indent=2)
+            calibration = save_calibration(calib, cfg)
+            self.save_reference(img, calib)
 
-        img = cv2.imread(snap)
-        if img is None:
-            raise RuntimeError(f"Failed to read snapshot for processing: {snap}")
+        # 1) Sample well colours with the cached reader for this calibration,
+        # re-reading only the wells that changed since the last call, then
+        # apply the baseline correction and the optional boost
+        centers, colors = self.read_calibrated(img, calibration, cfg)
+        adjusted_bs = colors["plate"]
 
-        # 1) Sample well colours
-        r = cfg["rectangle"]
-        centers = self.well_centers(r["x1"], r["y1"], r["x2"], r["y2"],
-                                    cfg["plate_type"],
-                                    quad=cfg.get("corners"))
-        raw = self.gaussian_cluster_rgb(img, centers)
-
-        # 2) Apply baseline color correction for consistent lighting
-        baseline = cfg.get("baseline_colors")
-        if baseline is not None:
-            baseline_arr = np.array(baseline, np.float32)
-            base_mean = baseline_arr.mean(axis=(0, 1), keepdims=True)
-            diff = baseline_arr - base_mean
-            raw_bs = np.clip(np.array(raw, np.float32) - diff, 0, None)
-        else:
-            raw_bs = np.array(raw, np.float32)
+        # 2) Hand the raw matrix and the diagnostic image (showing the final,
+        # adjusted colors) to the background writer and return immediately.
+        self.save_artifacts(img, centers, {"plate": adjusted_bs.copy()})
+        self.record(colors, frame)
 
-        # 3) Apply brightness and saturation adjustment
-        if self.boost_saturation:
-            # Adjust brightness and saturation
-            adjusted_bs = self.adjust_brightness_saturation(raw_bs)
-        else:
-            # No adjustment, just use the raw baseline colors
-            adjusted_bs = raw_bs
-
-        # Save adjusted matrix to a file
-        raw_matrix_file = "camera/raw_matrix.json"
-        with open(raw_matrix_file, "w") as f:
-            json.dump(adjusted_bs.tolist(), f, indent=2)
-        print(f"[Saved] Adjusted raw matrix to {raw_matrix_file}")
-
-        # 4) Build diagnostic image
-        # The diagnostic image will show the final, adjusted colors.
-        disp_colors = np.clip(adjusted_bs, 0, 255).astype(np.uint8)
-
-        marked = img.copy()
-        RADIUS = 10
-
-        # Draw left-half-circles for each well with the adjusted color
-        for ctr_row, color_row in zip(centers, disp_colors):
-            for (cx, cy), rgb_val in zip(ctr_row, color_row):
-                bgr_val = tuple(int(v) for v in rgb_val[::-1])
-                cv2.ellipse(marked, (int(cx), int(cy)), (RADIUS, RADIUS),
-                            0, 90, 270, bgr_val, -1)
-
-        # Save the diagnostic image
-        output_file = "camera/output_with_read_colors.jpg"
-        cv2.imwrite(output_file, marked)
-        print(f"[Saved] {output_file}")
-        
         return adjusted_bs
 
 # ═══════════════════════════════════ CLI ══════════════════════════════════
@@ -0,0 +1,246 @@
+"""
+capture_backends.py — Pluggable frame sources for CameraStream
+===============================================================
+* ``"v4l2"``   – Linux webcams via Video4Linux2, requesting MJPG so 1080p
+  runs at the camera's full frame rate.
+* ``"dshow"``  – Windows webcams via DirectShow (the original path).
+* ``"replay"`` – a recorded video file or a directory of still images,
+  served at a controlled rate. Lets the whole plate-reading pipeline run on
+  a machine without a camera.
+
+Every backend returns an object with the ``cv2.VideoCapture`` methods the
+stream uses: ``isOpened``, ``set``, ``read``, ``grab``, ``retrieve`` and
+``release``. Pick one explicitly with ``open_capture(..., backend=...)``,
+or set the ``CAMERA_BACKEND`` environment variable to override the
+platform default.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+import cv2
+import numpy as np
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+
+
+def _set_format(cap: cv2.VideoCapture, res: tuple[int, int] | None,
+                fps: float | None, fourcc: str | None) -> cv2.VideoCapture:
+    # FOURCC has to be set before the size for V4L2 to pick the MJPG mode
+    if fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    if res:
+        w, h = res
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, w)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
+    if fps:
+        cap.set(cv2.CAP_PROP_FPS, fps)
+    return cap
+
+
+#: ``CAP_PROP_AUTO_EXPOSURE`` value that selects manual exposure per backend
+MANUAL_EXPOSURE = {"v4l2": 1, "dshow": 0.25, "any": 0.25}
+AUTO_EXPOSURE = {"v4l2": 3, "dshow": 0.75, "any": 0.75}
+
+
+def lock_exposure(cap, backend: str) -> bool:
+    """Fix exposure and white balance at their current (settled) values.
+
+    Returns whether the capture accepted the settings; replayed recordings
+    and some drivers ignore them.
+    """
+    if backend not in MANUAL_EXPOSURE or not hasattr(cap, "get"):
+        return False
+    exposure = cap.get(cv2.CAP_PROP_EXPOSURE)
+    wb = cap.get(cv2.CAP_PROP_WB_TEMPERATURE)
+    locked = bool(cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, MANUAL_EXPOSURE[backend]))
+    locked = bool(cap.set(cv2.CAP_PROP_EXPOSURE, exposure)) and locked
+    if cap.set(cv2.CAP_PROP_AUTO_WB, 0) and wb > 0:
+        cap.set(cv2.CAP_PROP_WB_TEMPERATURE, wb)
+    return locked
+
+
+def unlock_exposure(cap, backend: str) -> None:
+    """Hand exposure and white balance back to the camera's automatics."""
+    if backend in AUTO_EXPOSURE and hasattr(cap, "set"):
+        cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, AUTO_EXPOSURE[backend])
+        cap.set(cv2.CAP_PROP_AUTO_WB, 1)
+
+
+def open_v4l2(source: int | str, res: tuple[int, int] | None = None,
+              fps: float | None = None,
+              fourcc: str | None = "MJPG") -> cv2.VideoCapture:
+    """Open a Video4Linux2 device, requesting MJPG by default."""
+    cap = cv2.VideoCapture(source, cv2.CAP_V4L2)
+    # keep only the newest frame in the driver queue
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return _set_format(cap, res, fps, fourcc)
+
+
+def open_dshow(source: int | str, res: tuple[int, int] | None = None,
+               fps: float | None = None,
+               fourcc: str | None = None) -> cv2.VideoCapture:
+    """Open a DirectShow device (Windows)."""
+    return _set_format(cv2.VideoCapture(source, cv2.CAP_DSHOW), res, fps, fourcc)
+
+
+def open_any(source: int | str, res: tuple[int, int] | None = None,
+             fps: float | None = None,
+             fourcc: str | None = None) -> cv2.VideoCapture:
+    """Open ``source`` with whatever backend OpenCV picks."""
+    return _set_format(cv2.VideoCapture(source), res, fps, fourcc)
+
+
+class ReplayCapture:
+    """Serve recorded frames like a live camera.
+
+    Parameters
+    ----------
+    source:
+        A video file or a directory of images (played in name order).
+    fps:
+        Playback rate. ``None`` uses the file's own rate (30 for image
+        directories); ``0`` serves frames as fast as they are asked for.
+    loop:
+        Start over at the end instead of reporting a failed read.
+    """
+
+    def __init__(self, source: str, fps: float | None = None,
+                 loop: bool = True) -> None:
+        path = Path(source)
+        if not path.exists():
+            raise FileNotFoundError(f"Replay source not found: {source}")
+        self.source = str(path)
+        self.loop = loop
+        self._video: cv2.VideoCapture | None = None
+        self._files: list[Path] = []
+        if path.is_dir():
+            self._files = sorted(p for p in path.iterdir()
+                                 if p.suffix.lower() in IMAGE_SUFFIXES)
+            native_fps = 30.0
+        else:
+            self._video = cv2.VideoCapture(self.source)
+            native_fps = self._video.get(cv2.CAP_PROP_FPS) or 30.0
+        self.fps = native_fps if fps is None else fps
+        self._pos = -1
+        self._next_due = 0.0
+
+    def isOpened(self) -> bool:
+        if self._video is not None:
+            return self._video.isOpened()
+        return bool(self._files)
+
+    def set(self, prop: int, value: float) -> bool:
+        if prop == cv2.CAP_PROP_FPS:
+            self.fps = value
+            return True
+        return False
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._pos + 1)
+        return 0.0
+
+    def _pace(self) -> None:
+        if self.fps:
+            now = time.time()
+            if now < self._next_due:
+                time.sleep(self._next_due - now)
+            self._next_due = max(now, self._next_due) + 1.0 / self.fps
+
+    def grab(self) -> bool:
+        """Advance to the next recorded frame, honouring the playback rate."""
+        self._pace()
+        if self._video is not None:
+            ok = self._video.grab()
+            if not ok and self.loop:
+                self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok = self._video.grab()
+            return ok
+        self._pos += 1
+        if self._pos >= len(self._files):
+            if not self.loop:
+                return False
+            self._pos = 0
+        return True
+
+    def retrieve(self, image: np.ndarray | None = None) -> tuple[bool, np.ndarray | None]:
+        """Decode the current frame, into ``image`` when the shape matches."""
+        if self._video is not None:
+            return self._video.retrieve(image) if image is not None else self._video.retrieve()
+        if not 0 <= self._pos < len(self._files):
+            return False, None
+        frame = cv2.imread(str(self._files[self._pos]), cv2.IMREAD_COLOR)
+        if frame is None:
+            return False, None
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def read(self, image: np.ndarray | None = None) -> tuple[bool, np.ndarray | None]:
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def release(self) -> None:
+        if self._video is not None:
+            self._video.release()
+
+
+def open_replay(source: int | str, res: tuple[int, int] | None = None,
+                fps: float | None = None,
+                fourcc: str | None = None) -> ReplayCapture:
+    """Open a recording for replay; ``res`` and ``fourcc`` are ignored."""
+    return ReplayCapture(str(source), fps=fps)
+
+
+BACKENDS: dict[str, Callable[..., object]] = {
+    "v4l2": open_v4l2,
+    "dshow": open_dshow,
+    "replay": open_replay,
+    "any": open_any,
+}
+
+
+def default_backend(source: int | str) -> str:
+    """Backend used when none is given.
+
+    Paths are replayed; device indices use ``CAMERA_BACKEND`` if set,
+    otherwise DirectShow on Windows, V4L2 on Linux and OpenCV's choice
+    elsewhere.
+    """
+    if isinstance(source, str) and not source.isdigit():
+        return "replay"
+    env = os.environ.get("CAMERA_BACKEND")
+    if env:
+        return env
+    if sys.platform.startswith("win"):
+        return "dshow"
+    if sys.platform.startswith("linux"):
+        return "v4l2"
+    return "any"
+
+
+def open_capture(source: int | str, backend: str | None = None,
+                 res: tuple[int, int] | None = None,
+                 fps: float | None = None,
+                 fourcc: str | None = None):
+    """Open ``source`` with the named backend (see :data:`BACKENDS`)."""
+    backend = backend or default_backend(source)
+    try:
+        opener = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown capture backend: {backend}") from None
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    kwargs = {"res": res, "fps": fps}
+    if fourcc is not None:
+        kwargs["fourcc"] = fourcc
+    return opener(source, **kwargs)
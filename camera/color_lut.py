@@ -0,0 +1,211 @@
+"""
+color_lut.py — Colour correction from the printed calibration sheet
+===================================================================
+* Measures the 24 patches of the Macbeth sheet printed by
+  ``generate_color_calibration_sheet.py`` in a camera frame.
+* Fits a root-polynomial colour-correction model from the measured to the
+  reference colours. Its terms scale with exposure, so the fit holds for
+  both brighter and darker wells.
+* Bakes the model into a compact ``33 × 33 × 33`` RGB lookup table, saved
+  as ``<calibration>_lut.npy`` next to the calibration file.
+* :meth:`ColorLUT.apply` corrects any array of RGB colours with a single
+  vectorized trilinear lookup. When a calibration has a LUT, the plate
+  processors use it instead of the HSV brightness/saturation boost.
+
+Fit a LUT from a photo of the sheet with::
+
+    python -m camera.color_lut --image sheet.jpg --calib camera/calibration.json
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from camera.generate_color_calibration_sheet import MACBETH_24_RGB, n_cols, n_rows
+
+LUT_SIZE = 33
+
+
+# ───────────────────────────── sheet measurement ──────────────────────────
+def sheet_patch_centers(quad: list[tuple[int, int]]) -> np.ndarray:
+    """Return the ``(24 × 2)`` image centres of the sheet patches, in chart order.
+
+    ``quad`` holds the sheet corners: top-left, top-right, bottom-right,
+    bottom-left.
+    """
+    src = np.array([[0, 0], [n_cols, 0], [n_cols, n_rows], [0, n_rows]], np.float32)
+    H = cv2.getPerspectiveTransform(src, np.array(quad, np.float32))
+    xs, ys = np.meshgrid(np.arange(n_cols) + 0.5, np.arange(n_rows) + 0.5)
+    grid = np.stack([xs, ys], axis=-1).reshape(-1, 1, 2).astype(np.float32)
+    return cv2.perspectiveTransform(grid, H).reshape(-1, 2)
+
+
+def measure_sheet(img: np.ndarray, quad: list[tuple[int, int]],
+                  inset: float = 0.5, samples: int = 9) -> np.ndarray:
+    """Return the ``(24 × 3)`` float32 RGB median of each sheet patch.
+
+    Parameters
+    ----------
+    img : np.ndarray
+        BGR frame showing the whole sheet.
+    quad : list[tuple[int, int]]
+        Sheet corners (top-left, top-right, bottom-right, bottom-left).
+    inset : float
+        Fraction of each patch's width sampled around its centre, keeping
+        clear of the patch edges.
+    samples : int
+        Sample points per patch side.
+    """
+    src = np.array([[0, 0], [n_cols, 0], [n_cols, n_rows], [0, n_rows]], np.float32)
+    H = cv2.getPerspectiveTransform(src, np.array(quad, np.float32))
+    offs = (np.arange(samples) + 0.5) / samples * inset + (1 - inset) / 2
+    ox, oy = np.meshgrid(offs, offs)
+    col, row = np.arange(n_cols * n_rows) % n_cols, np.arange(n_cols * n_rows) // n_cols
+    pts = np.stack([col[:, None] + ox.ravel(), row[:, None] + oy.ravel()], axis=-1)
+    px = cv2.perspectiveTransform(pts.reshape(-1, 1, 2).astype(np.float32), H)
+    h, w = img.shape[:2]
+    xs = np.clip(np.rint(px[:, 0, 0]).astype(np.intp), 0, w - 1)
+    ys = np.clip(np.rint(px[:, 0, 1]).astype(np.intp), 0, h - 1)
+    rgb = img[ys, xs, ::-1].astype(np.float32).reshape(n_cols * n_rows, -1, 3)
+    return np.median(rgb, axis=1)
+
+
+# ─────────────────────────────── model fitting ────────────────────────────
+def _root_poly_terms(rgb: np.ndarray) -> np.ndarray:
+    """Second-order root-polynomial terms of ``(n × 3)`` colours in 0–1."""
+    r, g, b = np.clip(rgb, 0, None).T
+    return np.stack([r, g, b, np.sqrt(r * g), np.sqrt(g * b), np.sqrt(r * b),
+                     np.ones_like(r)], axis=1)
+
+
+def fit_color_model(measured: np.ndarray, reference: np.ndarray = MACBETH_24_RGB,
+                    ridge: float = 1e-3) -> np.ndarray:
+    """Return the ``(7 × 3)`` root-polynomial matrix mapping measured → reference.
+
+    ``measured`` and ``reference`` are ``(n × 3)`` RGB colours in 0–255.
+    A small ridge term keeps the fit stable when patches are near-duplicate.
+    """
+    X = _root_poly_terms(np.asarray(measured, np.float64) / 255.0)
+    Y = np.asarray(reference, np.float64) / 255.0
+    A = X.T @ X + ridge * np.eye(X.shape[1])
+    return np.linalg.solve(A, X.T @ Y)
+
+
+def apply_color_model(model: np.ndarray, rgb: np.ndarray) -> np.ndarray:
+    """Apply a fitted model to ``(… × 3)`` RGB colours in 0–255."""
+    rgb = np.asarray(rgb, np.float64)
+    out = _root_poly_terms(rgb.reshape(-1, 3) / 255.0) @ model
+    return np.clip(out * 255.0, 0, 255).reshape(rgb.shape)
+
+
+# ──────────────────────────────── lookup table ────────────────────────────
+class ColorLUT:
+    """An ``(n × n × n × 3)`` RGB lookup table indexed by ``[r, g, b]``."""
+
+    def __init__(self, table: np.ndarray) -> None:
+        table = np.asarray(table, np.float32)
+        n = table.shape[0]
+        if table.shape != (n, n, n, 3) or n < 2:
+            raise ValueError(f"LUT must have shape (n, n, n, 3), got {table.shape}")
+        self.table = table
+        self.size = n
+        self._flat = table.reshape(-1, 3)
+
+    @classmethod
+    def from_model(cls, model: np.ndarray, size: int = LUT_SIZE) -> "ColorLUT":
+        """Bake a fitted colour model into a ``size``³ table."""
+        axis = np.linspace(0.0, 255.0, size)
+        grid = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1)
+        return cls(apply_color_model(model, grid))
+
+    @classmethod
+    def identity(cls, size: int = LUT_SIZE) -> "ColorLUT":
+        axis = np.linspace(0.0, 255.0, size)
+        return cls(np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1))
+
+    def apply(self, rgb: np.ndarray) -> np.ndarray:
+        """Return ``rgb`` (``… × 3``, 0–255) through the table as float32.
+
+        All colours are looked up at once: the eight table entries around
+        every colour are gathered and blended trilinearly, with no loop over
+        colours.
+        """
+        rgb = np.asarray(rgb, np.float32)
+        n = self.size
+        x = np.clip(rgb.reshape(-1, 3), 0, 255) * np.float32((n - 1) / 255.0)
+        i0 = np.minimum(x.astype(np.intp), n - 2)
+        f = x - i0
+        base = (i0[:, 0] * n + i0[:, 1]) * n + i0[:, 2]
+        out = np.zeros_like(x)
+        for dr in (0, 1):
+            wr = f[:, 0] if dr else 1 - f[:, 0]
+            for dg in (0, 1):
+                wg = wr * (f[:, 1] if dg else 1 - f[:, 1])
+                for db in (0, 1):
+                    w = wg * (f[:, 2] if db else 1 - f[:, 2])
+                    out += w[:, None] * self._flat[base + (dr * n + dg) * n + db]
+        return out.reshape(rgb.shape)
+
+    def save(self, path: str) -> str:
+        np.save(path, self.table)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "ColorLUT":
+        return cls(np.load(path))
+
+
+def lut_path(calib: str) -> str:
+    """Path of the LUT stored next to calibration file ``calib``."""
+    p = Path(calib)
+    return str(p.with_name(f"{p.stem}_lut.npy"))
+
+
+def calibrate_from_sheet(img: np.ndarray, quad: list[tuple[int, int]],
+                         calib: str, size: int = LUT_SIZE) -> ColorLUT:
+    """Fit a LUT from a frame of the sheet and save it next to ``calib``.
+
+    Calibrations loaded through ``calibration_store`` pick the new table up
+    on their next read.
+    """
+    measured = measure_sheet(img, quad)
+    model = fit_color_model(measured)
+    residual = np.abs(apply_color_model(model, measured) - MACBETH_24_RGB).mean()
+    lut = ColorLUT.from_model(model, size)
+    path = lut.save(lut_path(calib))
+    print(f"[Saved] {size}³ colour LUT to {path} (mean patch error {residual:.1f})")
+    return lut
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit a colour LUT from a photo of the calibration sheet.")
+    parser.add_argument("--image", help="Photo of the sheet (default: grab from the camera)")
+    parser.add_argument("--cam-index", default="2", help="Camera index or recording path")
+    parser.add_argument("--calib", default="camera/calibration.json", help="Calibration file to attach the LUT to")
+    parser.add_argument("--corners", help="Sheet corners x1,y1,...,x4,y4 (TL, TR, BR, BL); "
+                                          "select a rectangle interactively if omitted")
+    parser.add_argument("--size", type=int, default=LUT_SIZE, help="LUT points per axis")
+    args = parser.parse_args()
+
+    if args.image:
+        frame = cv2.imread(args.image, cv2.IMREAD_COLOR)
+        if frame is None:
+            raise SystemExit(f"Could not read {args.image}")
+    else:
+        from camera.multi_plate_processor import MultiPlateProcessor
+        cam = int(args.cam_index) if args.cam_index.isdigit() else args.cam_index
+        frame = MultiPlateProcessor.grab_frame(cam, stack=5)
+
+    if args.corners:
+        v = [int(c) for c in args.corners.split(",")]
+        corners = list(zip(v[0::2], v[1::2]))
+    else:
+        x, y, w, h = cv2.selectROI("Select calibration sheet", frame)
+        cv2.destroyAllWindows()
+        corners = [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]
+    if len(corners) != 4:
+        raise SystemExit("Need exactly four sheet corners")
+    calibrate_from_sheet(frame, corners, args.calib, args.size)
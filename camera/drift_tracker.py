@@ -0,0 +1,113 @@
+"""
+drift_tracker.py — Follow the plates when the camera mount moves
+================================================================
+* Keeps a downscaled greyscale reference of the plate area, taken when the
+  plates were calibrated and saved as ``<calibration>_ref.png`` next to the
+  calibration file.
+* On each read, aligns the same area of the new frame to that reference
+  with ECC (``cv2.findTransformECC``), starting from the previous
+  alignment, so a bumped camera is followed without recalibrating.
+* Moves the plate corners only when they would shift by more than
+  ``threshold`` pixels. Small jitter therefore keeps the cached sample
+  patterns, and a real drift rebuilds them once.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+def reference_path(calib: str) -> str:
+    """Path of the drift reference stored next to calibration file ``calib``."""
+    p = Path(calib)
+    return str(p.with_name(f"{p.stem}_ref.png"))
+
+
+class DriftTracker:
+    """Align frames to a reference view of the calibrated plates.
+
+    Parameters
+    ----------
+    reference:
+        BGR frame the calibration corners were set on.
+    corners:
+        ``{plate name: four corners}`` in ``reference``.
+    scale:
+        Downscale factor for alignment.
+    threshold:
+        Corner shift (full-resolution pixels) that moves the plates.
+    margin:
+        Fraction of the plate area's size added around it, so the plates
+        stay inside the aligned region as they drift. Only this region is
+        converted and aligned.
+    """
+
+    def __init__(self, reference: np.ndarray,
+                 corners: dict[str, list[tuple[float, float]]],
+                 scale: float = 0.25, threshold: float = 1.5,
+                 margin: float = 0.1) -> None:
+        self.scale = scale
+        self.threshold = threshold
+        self.frame_shape = reference.shape
+        self.reference_corners = {k: np.asarray(v, np.float32).reshape(4, 2)
+                                  for k, v in corners.items()}
+        self.corners = {k: v.copy() for k, v in self.reference_corners.items()}
+
+        # region of interest around all plates, in full-resolution pixels
+        pts = np.concatenate(list(self.reference_corners.values()))
+        lo, hi = pts.min(axis=0), pts.max(axis=0)
+        pad = (hi - lo) * margin
+        h, w = reference.shape[:2]
+        x0, y0 = np.maximum(lo - pad, 0).astype(int)
+        x1, y1 = np.minimum(hi + pad, (w, h)).astype(int)
+        self.roi = (x0, y0, x1, y1)
+        self.size = (max(int((x1 - x0) * scale), 8), max(int((y1 - y0) * scale), 8))
+        self.template = self._prepare(reference)
+        # warp from template to frame coordinates, reused as the next start
+        self.warp = np.eye(3, dtype=np.float32)
+        self.drift = 0.0
+
+    def _prepare(self, img: np.ndarray) -> np.ndarray:
+        """Crop the plate area and return it downscaled, greyscale, float32."""
+        x0, y0, x1, y1 = self.roi
+        crop = img[y0:y1, x0:x1]
+        small = cv2.resize(crop, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.float32)
+
+    def homography(self) -> np.ndarray:
+        """Full-resolution homography from reference to current frame coordinates."""
+        x0, y0, x1, y1 = self.roi
+        sx, sy = self.size[0] / (x1 - x0), self.size[1] / (y1 - y0)
+        to_roi = np.array([[sx, 0, -sx * x0], [0, sy, -sy * y0], [0, 0, 1]])
+        return np.linalg.inv(to_roi) @ self.warp.astype(np.float64) @ to_roi
+
+    def update(self, img: np.ndarray, iterations: int = 30) -> dict[str, np.ndarray]:
+        """Align ``img`` and return ``{plate name: corners}`` to read it with.
+
+        The corners move only once the tracked position is more than
+        ``threshold`` pixels away from them. When alignment fails the last
+        corners are kept.
+        """
+        if img.shape != self.frame_shape:
+            return self.corners
+        criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, iterations, 1e-4)
+        try:
+            _, warp = cv2.findTransformECC(self.template, self._prepare(img),
+                                           self.warp.copy(), cv2.MOTION_HOMOGRAPHY,
+                                           criteria, None, 5)
+        except cv2.error as exc:
+            print(f"[Drift] Alignment failed, keeping plate corners: {exc.err}")
+            return self.corners
+        self.warp = warp
+        H = self.homography()
+        tracked = {k: cv2.perspectiveTransform(v.reshape(-1, 1, 2), H).reshape(4, 2)
+                   for k, v in self.reference_corners.items()}
+        self.drift = max(float(np.abs(tracked[k] - self.corners[k]).max()) for k in tracked)
+        if self.drift > self.threshold:
+            print(f"[Drift] Plates moved {self.drift:.1f} px; updating sample positions")
+            self.corners = {k: v.round(1) for k, v in tracked.items()}
+        return self.corners
@@ -3,7 +3,8 @@
 """
 dual_camera_color_baseline.py — Dual-Plate Baseline Color Calibration Pipeline
 ================================================================================
-* UI shows 8 draggable dots to define the homography for two separate plates.
+* UI shows 8 draggable dots to define the homography for two separate plates,
+  on a downscaled preview that is only redrawn when something changes.
 * Supports 12 / 24 / 48 / 96 well plates (assumes both plates are the same type).
 * Saves / loads plate corners, plate type, and baseline colors for both plates.
 * Applies a brightness/saturation boost to the final read colors.
@@ -18,22 +19,32 @@ from pathlib import Path
 import sys
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
-from camera.camera_stream import get_stream
+from camera.calibration_store import load_calibration, save_calibration
+from camera.lens import lens_for_calibration
+from camera.multi_plate_processor import MultiPlateProcessor
+from camera.preview_canvas import PreviewCanvas
+from camera.well_sampling import get_plate_reader, quad_well_centers, sample_plate_rgb
 
 
 WIN = "Dual Plate Calibration"      # OpenCV window name
 
 # ═════════════════════════════ DualPlateProcessor ═════════════════════════════
-class DualPlateProcessor:
+class DualPlateProcessor(MultiPlateProcessor):
     """Camera two-plate processor.
 
     Handles camera snapshot, UI calibration for two plates' baseline colors,
     and diagnostic image generation.
     """
 
-    def __init__(self, virtual_mode: bool = False, boost_saturation: bool = False) -> None:
-        self.virtual_mode = virtual_mode
-        self.boost_saturation = boost_saturation
+    RAW_MATRIX_FILE = "camera/dual_raw_matrix.json"
+    OUTPUT_FILE = "camera/dual_output_with_read_colors.jpg"
+
+    def __init__(self, virtual_mode: bool = False, boost_saturation: bool = False,
+                 **options) -> None:
+        # every other option (writer, reader, thresholds, ...) is documented
+        # on MultiPlateProcessor and passed on by keyword
+        super().__init__(virtual_mode=virtual_mode, boost_saturation=boost_saturation,
+                         **options)
         # Store corners for two plates
         self.pts: dict[str, list[tuple[int, int]]] = {'plate_1': [], 'plate_2': []}
 
@@ -42,47 +53,21 @@ class DualPlateProcessor:
         self.drag_idx: int = -1
         
         self.img_copy: np.ndarray | None = None
+        self.canvas: PreviewCanvas | None = None
         self.confirmed = False
         self.btnTL: tuple[int, int] | None = None
         self.BW, self.BH = 140, 30          # confirm-button size
 
-    # ───────────────────────────── camera snapshot ────────────────────────
-    @staticmethod
-    def snapshot(cam: int = 0, path: str = "camera/snapshot.jpg",
-                 warm: int = 10, burst: int = 5,
-                 res: tuple[int, int] | None = (1920, 1080)) -> str:
-        """Return the latest frame captured by a background thread."""
-        stream = get_stream(cam_index=cam, res=res, warm=warm)
-        img = stream.read()
-        if img is None:
-            raise RuntimeError("No frame captured")
-        Path(path).parent.mkdir(parents=True, exist_ok=True)
-        cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 95])
-        return path
+    @property
+    def changed(self) -> dict[str, np.ndarray]:
+        """Per plate, wells re-read by the last read."""
+        return self.changed_by_plate
 
     # ─────────────────────────── misc helper methods ──────────────────────
-    @staticmethod
-    def plate_from_tb(val: int) -> str:
-        """Track-bar value → plate type."""
-        return {0: "12", 1: "24", 2: "48", 3: "96"}.get(val, "96")
-
     @staticmethod
     def well_centers(quad: list[tuple[int, int]] = None, plate_type: str = "96") -> np.ndarray:
         """Return an (rows × cols × 2) array of centre coordinates."""
-        rows, cols = {"12": (8, 12), "24": (4, 6),
-                      "48": (6, 8),  "96": (8, 12)}[plate_type]
-
-        src = np.array([[0, 0], [cols, 0], [cols, rows], [0, rows]], np.float32)
-        dst = np.array(quad, np.float32)
-        H = cv2.getPerspectiveTransform(src, dst)
-
-        xs = np.linspace(0.5, cols - 0.5, cols)
-        ys = np.linspace(0.5, rows - 0.5, rows)
-        grid = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2)
-        homog = np.concatenate([grid, np.ones((grid.shape[0], 1))], axis=1)
-        warped = (H @ homog.T).T
-        warped = warped[:, :2] / warped[:, 2:3]
-        return warped.reshape(rows, cols, 2)
+        return quad_well_centers(quad, plate_type)
 
     @staticmethod
     def gaussian_cluster_rgb(img: np.ndarray, centers: np.ndarray,
@@ -90,52 +75,29 @@ class DualPlateProcessor:
                              cluster_thresh: float = 10.0) -> list:
         """Sample colours using a Gaussian distribution and return the
         centroid of the largest cluster for each well."""
-        h, w = img.shape[:2]
-        out = []
-        
-        def largest_cluster(points: np.ndarray) -> np.ndarray:
-            clusters: list[tuple[list[np.ndarray], np.ndarray]] = []
-            for p in points:
-                assigned = False
-                for cl in clusters:
-                    if np.linalg.norm(p - cl[1]) <= cluster_thresh:
-                        cl[0].append(p)
-                        cl[1][:] = np.mean(cl[0], axis=0)
-                        assigned = True
-                        break
-                if not assigned:
-                    clusters.append(([p], p.astype(float)))
-            if not clusters: return np.array([0.0, 0.0, 0.0])
-            return max(clusters, key=lambda c: len(c[0]))[1]
-
-        for row in centers:
-            rrow = []
-            for cx, cy in row:
-                xs = np.clip(np.random.normal(cx, sigma, n).round().astype(int), 0, w - 1)
-                ys = np.clip(np.random.normal(cy, sigma, n).round().astype(int), 0, h - 1)
-                samples = img[ys, xs, ::-1].astype(np.float32)  # BGR -> RGB
-                rrow.append(largest_cluster(samples).tolist())
-            out.append(rrow)
-        return out
-
-    # ────────────────── Brightness/Saturation Adjustment ──────────────────
-    @staticmethod
-    def adjust_brightness_saturation(rgb_colors: np.ndarray,
-                                     brightness_factor: float = 1.1,
-                                     saturation_factor: float = 1.2) -> np.ndarray:
-        """Adjusts the brightness and saturation of an array of RGB colors."""
-        img_rgb_u8 = np.clip(rgb_colors, 0, 255).astype(np.uint8)
-        img_hsv = cv2.cvtColor(img_rgb_u8, cv2.COLOR_RGB2HSV)
-        h, s, v = cv2.split(img_hsv)
-        s = np.clip(s.astype(np.float32) * saturation_factor, 0, 255).astype(np.uint8)
-        v = np.clip(v.astype(np.float32) * brightness_factor, 0, 255).astype(np.uint8)
-        final_hsv = cv2.merge([h, s, v])
-        final_rgb = cv2.cvtColor(final_hsv, cv2.COLOR_HSV2RGB)
-        return final_rgb.astype(np.float32)
+        return sample_plate_rgb(img, centers, n, sigma, cluster_thresh).tolist()
+
+    # ─────────────────────────────── plate reads ──────────────────────────
+    def read_wells(self, plate: int | str, wells: list[tuple[int, int]],
+                   frame: np.ndarray | None = None,
+                   cam_index: int | str = 2,
+                   calib: str = "camera/dual_calibration.json",
+                   after: float | None = None) -> np.ndarray:
+        """Return the adjusted ``(len(wells) × 3)`` RGB colours of wells on one plate.
+
+        ``plate`` is ``1``/``2`` or ``"plate_1"``/``"plate_2"``. Only the
+        ``(row, col)`` wells asked for are sampled, from ``frame`` or from a
+        freshly grabbed frame, using the stored calibration. Nothing is
+        written to disk and the calibration UI is never opened.
+        """
+        key = plate if isinstance(plate, str) else f"plate_{plate}"
+        if self.virtual_mode:
+            raise RuntimeError("No camera in virtual mode")
+        return self.read_plate_wells(key, wells, frame, cam_index, calib, after)
 
     # ───────────────────────────── UI helpers ─────────────────────────────
-    def draw_ui(self, disp: np.ndarray) -> np.ndarray:
-        """Overlay instructions and calibration points for two plates."""
+    def draw_static(self, disp: np.ndarray) -> None:
+        """Draw the instructions and the confirm button (drawn once per UI)."""
         h, w = disp.shape[:2]
 
         lines = ["Drag corners for 2 plates (1-4 Red, 5-8 Green)",
@@ -144,33 +106,42 @@ class DualPlateProcessor:
         for i, txt in enumerate(lines):
             cv2.putText(disp, txt, (10, 30 + 30 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
 
+        self.btnTL = (w - self.BW - 10, h - self.BH - 10)
+        bx, by = self.btnTL
+        cv2.rectangle(disp, (bx, by), (bx + self.BW, by + self.BH), (50, 205, 50), -1)
+        cv2.putText(disp, "Confirm", (bx + 10, by + self.BH - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+    def draw_ui(self, disp: np.ndarray) -> np.ndarray:
+        """Overlay calibration points for two plates on the preview."""
+        canvas = self.canvas
         plate_colors = {'plate_1': (0, 0, 255), 'plate_2': (0, 255, 0)}  # Red, Green
         plate_type = self.plate_from_tb(cv2.getTrackbarPos("Plate Type", WIN))
 
         for key, corners in self.pts.items():
             color = plate_colors[key]
             start_idx = 1 if key == 'plate_1' else 5
-            for i, pt in enumerate(corners):
+            view = [tuple(p) for p in canvas.to_view(corners)]
+            for i, pt in enumerate(view):
                 cv2.circle(disp, pt, 15, color, -1)
                 cv2.putText(disp, str(start_idx + i), (pt[0] - 5, pt[1] + 5),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 2)
 
-            if len(corners) == 4:
+            if len(view) == 4:
                 for i in range(4):
-                    cv2.line(disp, corners[i], corners[(i + 1) % 4], color, 2)
-                for cx, cy in self.well_centers(corners, plate_type).reshape(-1, 2):
+                    cv2.line(disp, view[i], view[(i + 1) % 4], color, 2)
+                # each plate's wells are re-projected only when that plate changes
+                centers = canvas.cached(key, (tuple(corners), plate_type), lambda: canvas.to_view(
+                    self.projected_centers(corners, plate_type, canvas.full_shape)).reshape(-1, 2))
+                for cx, cy in centers:
                     cv2.circle(disp, (int(cx), int(cy)), 4, color, -1)
-
-        self.btnTL = (w - self.BW - 10, h - self.BH - 10)
-        bx, by = self.btnTL
-        cv2.rectangle(disp, (bx, by), (bx + self.BW, by + self.BH), (50, 205, 50), -1)
-        cv2.putText(disp, "Confirm", (bx + 10, by + self.BH - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         return disp
 
     def update_win(self) -> None:
-        cv2.imshow(WIN, self.draw_ui(self.img_copy.copy()))
+        """Schedule a redraw; the UI loop repaints at most at the display rate."""
+        self.canvas.invalidate()
 
     def on_mouse(self, event, x, y, flags, param) -> None:
+        # x, y are preview coordinates
         if event == cv2.EVENT_LBUTTONDOWN:
             if (self.btnTL and self.btnTL[0] <= x <= self.btnTL[0] + self.BW and
                     self.btnTL[1] <= y <= self.btnTL[1] + self.BH):
@@ -178,16 +149,15 @@ class DualPlateProcessor:
                 return
 
             for key, corners in self.pts.items():
-                for i, pt in enumerate(corners):
-                    if np.hypot(x - pt[0], y - pt[1]) < 15:
+                for i, (px, py) in enumerate(self.canvas.to_view(corners)):
+                    if np.hypot(x - px, y - py) < 15:
                         self.drag_key = key
                         self.drag_idx = i
                         return
 
         elif event == cv2.EVENT_MOUSEMOVE:
             if self.drag_key and self.drag_idx != -1:
-                h, w = self.img_copy.shape[:2]
-                self.pts[self.drag_key][self.drag_idx] = (max(0, min(x, w-1)), max(0, min(y, h-1)))
+                self.pts[self.drag_key][self.drag_idx] = self.canvas.to_full(x, y)
                 self.update_win()
 
         elif event == cv2.EVENT_LBUTTONUP:
@@ -197,7 +167,9 @@ class DualPlateProcessor:
     # ----------------------------- calibration UI -------------------------
     def run_ui(self, img: np.ndarray, prev: dict | None) -> dict | None:
         """Open the calibration UI for two plates."""
-        self.img_copy = img.copy()
+        self.img_copy = img
+        self.canvas = PreviewCanvas(img)
+        self.canvas.render_static(self.draw_static)
         h, w = img.shape[:2]
         
         # Set initial points for two plates if none are loaded
@@ -219,9 +191,10 @@ class DualPlateProcessor:
         plate_idx = {"12": 0, "24": 1, "48": 2, "96": 3}.get((prev or {}).get("plate_type", "96"), 3)
         cv2.createTrackbar("Plate Type", WIN, plate_idx, 3, lambda v: self.update_win())
         
-        self.update_win()
         start = time.time()
-        while not self.confirmed and not (cv2.waitKey(20) & 0xFF == 27 or time.time() - start > 180):
+        while not self.confirmed:
+            self.canvas.show(WIN, self.draw_ui)
+            if cv2.waitKey(5) & 0xFF == 27 or time.time() - start > 180: break
             if cv2.getWindowProperty(WIN, cv2.WND_PROP_VISIBLE) < 1: break # Exit if window closed
         
         if not self.confirmed:
@@ -233,77 +206,55 @@ class DualPlateProcessor:
 
         final_calib = {"plate_type": plate_type}
         for key, corners in self.pts.items():
-            centers = self.well_centers(corners, plate_type)
+            pattern = get_plate_reader(corners, plate_type, img.shape, self.reader, self.lens)
             final_calib[key] = {
                 "corners": corners,
-                "baseline_colors": self.gaussian_cluster_rgb(img, centers),
+                "baseline_colors": pattern.read(img).tolist(),
             }
         return final_calib
 
     # -------------------------- main processing ---------------------------
-    def process_image(self, cam_index: int = 2,
-                      snap: str = "camera/snapshot.jpg",
+    def process_image(self, cam_index: int | str = 2,
+                      snap: str | None = "camera/snapshot.jpg",
                       calib: str = "camera/dual_calibration.json",
                       force_ui: bool = False,
-                      plate_type_override: str | None = None) -> dict[str, np.ndarray]:
-        """Capture and return the adjusted colours for two plates."""
-        
-        self.snapshot(cam_index, snap)
+                      plate_type_override: str | None = None,
+                      after: float | None = None) -> dict[str, np.ndarray]:
+        """Capture and return the adjusted colours for two plates.
 
-        cfg = None
-        if os.path.exists(calib):
-            with open(calib) as f: cfg = json.load(f)
+        The frame is sampled in memory; ``snap=None`` skips the JPEG copy.
+        With ``after`` set, only a frame captured after that time is used.
+        """
+        
+        calibration = load_calibration(calib)
+        cfg = dict(calibration.cfg) if calibration else None
 
         if plate_type_override:
             if cfg is None: cfg = {}
             cfg["plate_type"] = plate_type_override
 
+        frame = self.grab_checked(cam_index, calibration, self.plate_layout(cfg or {}), after)
+        img = frame.image
+        if snap: self.writer.submit(snap, lambda path: self.save_snapshot(img, path))
+
         if force_ui or cfg is None or "plate_1" not in cfg or "plate_2" not in cfg:
-            img_for_ui = cv2.imread(snap)
-            if img_for_ui is None: raise RuntimeError(f"Failed to read snapshot for UI: {snap}")
-            cfg = self.run_ui(img_for_ui, cfg)
+            self.lens = lens_for_calibration(calib)
+            # try the detected plates first; the UI starts from them if unsure
+            proposal, confidence = (None, 0.0) if force_ui else self.detect_calibration(
+                img, ["plate_1", "plate_2"], plate_type_override)
+            if proposal is not None and self.accept_detection(confidence):
+                cfg = proposal
+            else:
+                cfg = self.run_ui(img, proposal or cfg)
             if cfg is None: raise RuntimeError("Calibration cancelled")
-            with open(calib, "w") as f: json.dump(cfg, f, indent=2)
+            calibration = save_calibration(calib, cfg)
+            self.save_reference(img, calib)
 
-        img = cv2.imread(snap)
-        if img is None: raise RuntimeError(f"Failed to read snapshot for processing: {snap}")
+        centers, results = self.read_calibrated(img, calibration, cfg)
 
-        results = {}
-        plate_type = cfg.get("plate_type", "96")
-        
-        for key in ['plate_1', 'plate_2']:
-            plate_cfg = cfg[key]
-            centers = self.well_centers(plate_cfg["corners"], plate_type)
-            raw = self.gaussian_cluster_rgb(img, centers)
-
-            baseline = plate_cfg.get("baseline_colors")
-            baseline_arr = np.array(baseline, np.float32)
-            base_mean = baseline_arr.mean(axis=(0, 1), keepdims=True)
-            diff = baseline_arr - base_mean
-            raw_bs = np.clip(np.array(raw, np.float32) - diff, 0, None)
-            
-            results[key] = self.adjust_brightness_saturation(raw_bs) if self.boost_saturation else raw_bs
-
-        # Save results to a single JSON file
-        results_for_json = {k: v.tolist() for k, v in results.items()}
-        with open("camera/dual_raw_matrix.json", "w") as f:
-            json.dump(results_for_json, f, indent=2)
-        print("[Saved] Adjusted dual raw matrix to camera/dual_raw_matrix.json")
-
-        # Build and save diagnostic image
-        marked = img.copy()
-        RADIUS = 10
-        for key, adjusted_colors in results.items():
-            centers = self.well_centers(cfg[key]["corners"], plate_type)
-            disp_colors = np.clip(adjusted_colors, 0, 255).astype(np.uint8)
-            for ctr_row, color_row in zip(centers, disp_colors):
-                for (cx, cy), rgb_val in zip(ctr_row, color_row):
-                    bgr_val = tuple(int(v) for v in rgb_val[::-1])
-                    cv2.ellipse(marked, (int(cx), int(cy)), (RADIUS, RADIUS), 0, 90, 270, bgr_val, -1)
-        
-        output_file = "camera/dual_output_with_read_colors.jpg"
-        cv2.imwrite(output_file, marked)
-        print(f"[Saved] {output_file}")
+        # Queue the JSON matrix and diagnostic image on the background writer
+        self.save_artifacts(img, centers, {k: v.copy() for k, v in results.items()})
+        self.record(results, frame)
         
         return results
 
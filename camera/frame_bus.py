@@ -0,0 +1,343 @@
+"""
+frame_bus.py — Share one camera between processes
+===================================================
+* A :class:`FrameServer` owns the camera (through the usual
+  :class:`~camera.camera_stream.CameraStream`) and publishes frames into a
+  ``multiprocessing.shared_memory`` ring, each slot tagged with a sequence
+  number, capture time and health score.
+* Other processes attach with :class:`FrameBusReader`, which maps the ring
+  directly and offers the same read API as ``CameraStream``.
+  :func:`camera.camera_stream.get_stream` returns one automatically when a
+  server for that camera is running, so the Streamlit app,
+  ``quick_snapshot.py`` and the calibration CLI can share one webcam without
+  fighting over the device or paying warm-up each time.
+* Each slot is guarded by a sequence lock: the server sets the slot's
+  sequence number to -1 while writing, and a reader keeps a copy only if
+  the number is unchanged once it has finished copying.
+* Readers publish a demand deadline, so an idle server only decodes frames
+  while somebody is waiting for one.
+
+Run a server with::
+
+    python -m camera.frame_bus --cam-index 2 --res 1920x1080
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from camera.camera_stream import CameraStream, Frame, get_stream
+
+MAGIC = 0x50434342  # "PCCB"
+# header fields (int64)
+_MAGIC, _H, _W, _C, _SLOTS, _LATEST, _HEARTBEAT, _DEMAND, _STATUS, _PID = range(10)
+_HEADER_LEN = 16
+STATUSES = ["ok", "restarting", "down", "connecting"]
+#: a server whose heartbeat is older than this is considered gone
+STALE_AFTER = 2.0
+#: how long a reader's request keeps an idle server decoding
+DEMAND_WINDOW = 1.0
+
+
+def bus_name(cam_index: int | str) -> str:
+    """Shared-memory block name used for ``cam_index``."""
+    if isinstance(cam_index, int) or str(cam_index).isdigit():
+        return f"pccb_cam_{cam_index}"
+    digest = hashlib.sha1(os.path.abspath(str(cam_index)).encode()).hexdigest()[:12]
+    return f"pccb_cam_{digest}"
+
+
+def _layout(h: int, w: int, c: int, slots: int) -> tuple[int, int]:
+    """Return (data offset, total size) for the given ring geometry."""
+    meta = 8 * _HEADER_LEN + slots * (8 + 8 + 8)
+    offset = (meta + 63) // 64 * 64
+    return offset, offset + slots * h * w * c
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(name=name)
+    # Attaching must not unlink the server's block when this process exits
+    # (POSIX resource tracker behaviour before Python 3.13).
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+class _Ring:
+    """numpy views onto a frame-bus shared-memory block."""
+
+    def __init__(self, shm: shared_memory.SharedMemory) -> None:
+        self.shm = shm
+        buf = shm.buf
+        self.header = np.ndarray((_HEADER_LEN,), np.int64, buf)
+        if self.header[_MAGIC] != MAGIC:
+            raise RuntimeError(f"{shm.name} is not a frame bus")
+        h, w, c, n = (int(self.header[i]) for i in (_H, _W, _C, _SLOTS))
+        pos = 8 * _HEADER_LEN
+        self.seqs = np.ndarray((n,), np.int64, buf, pos)
+        self.stamps = np.ndarray((n,), np.float64, buf, pos + 8 * n)
+        self.health = np.ndarray((n,), np.float64, buf, pos + 16 * n)
+        offset, _ = _layout(h, w, c, n)
+        self.frames = np.ndarray((n, h, w, c), np.uint8, buf, offset)
+
+    @property
+    def alive(self) -> bool:
+        return time.time_ns() - int(self.header[_HEARTBEAT]) < STALE_AFTER * 1e9
+
+    def close(self) -> None:
+        # views must be dropped before the mapping can close
+        self.header = self.seqs = self.stamps = self.health = self.frames = None
+        self.shm.close()
+
+
+class FrameServer:
+    """Publish a local camera stream into a shared-memory ring.
+
+    Parameters
+    ----------
+    cam_index, res, warm, backend, fps:
+        Passed to :func:`~camera.camera_stream.get_stream`.
+    slots:
+        Number of frames kept in the shared ring.
+    live:
+        Publish every frame instead of only while readers are waiting.
+    """
+
+    def __init__(self, cam_index: int | str = 0,
+                 res: tuple[int, int] | None = (1920, 1080),
+                 warm: int = 10, slots: int = 6, live: bool = False,
+                 backend: str | None = None, fps: float | None = None) -> None:
+        self.cam_index = cam_index
+        self.name = bus_name(cam_index)
+        self.slots = slots
+        self.live = live
+        self.stream = get_stream(cam_index, res=res, warm=warm, backend=backend,
+                                 fps=fps, shared=False)
+        self.ring: _Ring | None = None
+        self.published = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def _create(self, shape: tuple[int, int, int]) -> _Ring:
+        h, w, c = shape
+        _, size = _layout(h, w, c, self.slots)
+        try:
+            shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            old = _Ring(_attach(self.name))
+            alive = old.alive
+            old.close()
+            if alive:
+                raise RuntimeError(f"Camera {self.cam_index} is already served by another process")
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.unlink()
+            stale.close()
+            shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        header = np.ndarray((_HEADER_LEN,), np.int64, shm.buf)
+        header[:] = 0
+        header[[_H, _W, _C, _SLOTS, _PID]] = h, w, c, self.slots, os.getpid()
+        header[_HEARTBEAT] = time.time_ns()
+        header[_MAGIC] = MAGIC
+        del header
+        ring = _Ring(shm)
+        ring.seqs[:] = 0
+        print(f"[FrameBus] Serving camera {self.cam_index} as {self.name} ({w}x{h})")
+        return ring
+
+    def _publish(self, frame: Frame) -> None:
+        if self.ring is None:
+            self.ring = self._create(frame.image.shape)
+        ring = self.ring
+        if frame.image.shape != ring.frames.shape[1:]:
+            print(f"[FrameBus] Skipping frame with shape {frame.image.shape}")
+            return
+        self.published += 1
+        slot = self.published % self.slots
+        ring.seqs[slot] = -1
+        ring.frames[slot] = frame.image
+        ring.stamps[slot] = frame.timestamp
+        ring.health[slot] = frame.health
+        ring.seqs[slot] = self.published
+        ring.header[_LATEST] = self.published
+
+    def _loop(self) -> None:
+        last = 0.0
+        while self.running:
+            ring = self.ring
+            if ring is not None:
+                ring.header[_HEARTBEAT] = time.time_ns()
+                ring.header[_STATUS] = STATUSES.index(self.stream.status)
+            wanted = ring is None or self.live or time.time_ns() < ring.header[_DEMAND]
+            if not wanted:
+                time.sleep(0.005)
+                continue
+            try:
+                frame = self.stream.read_frame(after=last, timeout=0.5)
+            except RuntimeError:
+                time.sleep(0.1)
+                continue
+            last = frame.timestamp
+            self._publish(frame)
+
+    def stop(self) -> None:
+        """Stop publishing and remove the shared-memory block."""
+        self.running = False
+        self.thread.join()
+        if self.ring is not None:
+            shm = self.ring.shm
+            self.ring.close()
+            shm.unlink()
+            self.ring = None
+
+
+class FrameBusReader:
+    """``CameraStream``-compatible reader for a camera served by another process."""
+
+    def __init__(self, cam_index: int | str = 0) -> None:
+        self.cam_index = cam_index
+        self.ring = _Ring(_attach(bus_name(cam_index)))
+        if not self.ring.alive:
+            self.ring.close()
+            raise FileNotFoundError(f"No live frame server for camera {cam_index}")
+        self.live = False
+
+    # stream-like state
+    @property
+    def seq(self) -> int:
+        return int(self.ring.header[_LATEST])
+
+    @property
+    def running(self) -> bool:
+        """False once the server has exited (or this reader was stopped)."""
+        return self.ring is not None and self.ring.alive
+
+    @property
+    def status(self) -> str:
+        if not self.running:
+            return "down"
+        return STATUSES[int(self.ring.header[_STATUS])]
+
+    @property
+    def timestamp(self) -> float:
+        return float(self.ring.stamps.max())
+
+    @property
+    def health(self) -> float:
+        return float(self.ring.health[int(np.argmax(self.ring.seqs))])
+
+    @property
+    def healthy(self) -> bool:
+        return self.status == "ok" and self.health >= CameraStream.MIN_HEALTH
+
+    def set_live(self, live: bool = True) -> None:
+        """Keep the server decoding for as long as this reader is live."""
+        self.live = live
+
+    def lock_exposure(self, timeout: float = 10.0) -> bool:
+        """The serving process owns the camera's settings; nothing is locked here."""
+        return False
+
+    def _demand(self) -> None:
+        self.ring.header[_DEMAND] = max(int(self.ring.header[_DEMAND]),
+                                        time.time_ns() + int(DEMAND_WINDOW * 1e9))
+
+    def _copy(self, slot: int) -> Frame | None:
+        """Copy one slot out of the ring, or None if it was overwritten meanwhile."""
+        ring = self.ring
+        seq = int(ring.seqs[slot])
+        if seq <= 0:
+            return None
+        image = ring.frames[slot].copy()
+        stamp, health = float(ring.stamps[slot]), float(ring.health[slot])
+        if int(ring.seqs[slot]) != seq:
+            return None
+        return Frame(image, seq, stamp, health)
+
+    def _collect(self, n: int, after: float | None, timeout: float) -> list[Frame]:
+        """Wait for and copy the ``n`` newest healthy frames captured after ``after``."""
+        if after is None and not self.live:
+            after = time.time()
+        since = -np.inf if after is None else after
+        deadline = max(time.time(), since) + timeout
+        ring = self.ring
+        while True:
+            self._demand()
+            order = np.argsort(ring.seqs)[::-1]
+            frames = []
+            for slot in order:
+                if ring.seqs[slot] <= 0 or ring.stamps[slot] <= since or ring.health[slot] < CameraStream.MIN_HEALTH:
+                    continue
+                frame = self._copy(int(slot))
+                if frame is not None and frame.timestamp > since:
+                    frames.append(frame)
+                if len(frames) == n:
+                    return frames
+            status = self.status
+            if time.time() >= deadline or status == "down":
+                raise RuntimeError(f"Camera {self.cam_index} ({status}): no healthy frame on the frame bus")
+            time.sleep(0.002)
+
+    def read(self, timeout: float = 10.0) -> np.ndarray:
+        return self._collect(1, None, timeout)[0].image
+
+    def read_frame(self, after: float | None = None, timeout: float = 5.0) -> Frame:
+        return self._collect(1, after, timeout)[0]
+
+    def read_after(self, t: float, timeout: float = 5.0) -> np.ndarray:
+        return self.read_frame(after=t, timeout=timeout).image
+
+    def read_stack(self, n: int = 5, reducer: str = "median",
+                   after: float | None = None, timeout: float = 5.0) -> np.ndarray:
+        if reducer not in ("median", "mean"):
+            raise ValueError(f"Unknown reducer: {reducer}")
+        slots = len(self.ring.seqs)
+        if not 1 <= n < slots:
+            raise ValueError(f"n must be between 1 and {slots - 1}")
+        stack = np.stack([f.image for f in self._collect(n, after, timeout)])
+        reduced = np.median(stack, axis=0) if reducer == "median" else stack.mean(axis=0)
+        return np.rint(reduced).astype(np.uint8)
+
+    def stop(self) -> None:
+        """Detach from the ring (the server keeps running)."""
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+def attach(cam_index: int | str) -> FrameBusReader | None:
+    """Return a reader if a live server publishes ``cam_index``, else None."""
+    try:
+        return FrameBusReader(cam_index)
+    except (FileNotFoundError, RuntimeError, ValueError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a camera to other processes over shared memory.")
+    parser.add_argument("--cam-index", default="0", help="Camera index or recording path")
+    parser.add_argument("--res", default="1920x1080", help="Capture resolution WxH")
+    parser.add_argument("--backend", default=None, help="Capture backend (v4l2, dshow, replay, any)")
+    parser.add_argument("--live", action="store_true", help="Publish every frame, not only on demand")
+    args = parser.parse_args()
+
+    cam = int(args.cam_index) if args.cam_index.isdigit() else args.cam_index
+    w, h = (int(v) for v in args.res.lower().split("x"))
+    server = FrameServer(cam, res=(w, h), backend=args.backend, live=args.live)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        server.stream.stop()
@@ -0,0 +1,128 @@
+"""
+frame_quality.py — Reject frames with the gantry over the plates
+================================================================
+* Scores a candidate frame against the drift reference view of the
+  calibrated plates (``<calibration>_ref.png``, see ``drift_tracker.py``).
+* Sharpness is the variance of the Laplacian over the plate area relative
+  to the reference's, so motion blur from a moving gantry or a shaken
+  camera lowers it.
+* Occlusion is the fraction of plate surface between the wells that no
+  longer looks like the reference. Well interiors are left out because
+  their colours are what the experiment changes; a pipette or gantry
+  passing over the plate covers the surface around them too.
+* Both checks run on a downscaled greyscale crop of the plate area, a few
+  milliseconds per frame.
+* Callers that give up waiting for a good frame raise
+  :class:`FrameQualityError`, a ``RuntimeError`` that callers can tell apart
+  from a failing camera and retry.
+"""
+from __future__ import annotations
+
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from camera.well_sampling import PLATE_SHAPES, quad_well_centers
+
+
+class FrameQualityError(RuntimeError):
+    """No frame passed the quality gate in time; the camera itself works."""
+
+
+class FrameQuality(NamedTuple):
+    """Scores of one frame and whether it may be read."""
+    sharpness: float     # Laplacian variance relative to the reference
+    occluded: float      # fraction of inter-well surface unlike the reference
+    reason: str | None   # why the frame was rejected, or None if it passed
+
+    @property
+    def ok(self) -> bool:
+        return self.reason is None
+
+
+def laplacian_variance(gray: np.ndarray) -> float:
+    """Variance of the Laplacian of a greyscale image, a cheap focus measure."""
+    return float(cv2.Laplacian(gray, cv2.CV_32F).var())
+
+
+class FrameQualityGate:
+    """Check frames against a reference view of the calibrated plates.
+
+    Parameters
+    ----------
+    reference:
+        BGR frame the plates were calibrated on, with nothing over them.
+    layout:
+        ``{plate name: (corners, plate type)}`` in ``reference``.
+    min_sharpness:
+        Lowest accepted sharpness relative to the reference.
+    max_occluded:
+        Highest accepted fraction of occluded inter-well surface.
+    diff_threshold:
+        Grey-level change (after removing the overall brightness shift) at
+        which a surface pixel counts as occluded.
+    scale:
+        Downscale factor for scoring.
+    """
+
+    def __init__(self, reference: np.ndarray,
+                 layout: dict[str, tuple[list[tuple[float, float]], str]],
+                 min_sharpness: float = 0.5, max_occluded: float = 0.03,
+                 diff_threshold: float = 35.0, scale: float = 0.25) -> None:
+        self.min_sharpness = min_sharpness
+        self.max_occluded = max_occluded
+        self.diff_threshold = diff_threshold
+        self.scale = scale
+        self.frame_shape = reference.shape
+
+        pts = np.concatenate([np.asarray(q, np.float32).reshape(4, 2)
+                              for q, _ in layout.values()])
+        h, w = reference.shape[:2]
+        x0, y0 = np.maximum(pts.min(axis=0), 0).astype(int)
+        x1, y1 = np.minimum(np.ceil(pts.max(axis=0)) + 1, (w, h)).astype(int)
+        self.roi = (x0, y0, x1, y1)
+        self.size = (max(int((x1 - x0) * scale), 8), max(int((y1 - y0) * scale), 8))
+
+        # plate surface inside each quad, minus a disk around every well
+        mask = np.zeros(self.size[::-1], np.uint8)
+        to_roi = lambda p: (np.asarray(p, np.float64) - (x0, y0)) * self.size / (x1 - x0, y1 - y0)
+        for quad, plate_type in layout.values():
+            cv2.fillConvexPoly(mask, np.rint(to_roi(np.reshape(quad, (4, 2)))).astype(np.int32), 1)
+        for quad, plate_type in layout.values():
+            centers = to_roi(quad_well_centers(quad, plate_type).reshape(-1, 2))
+            rows, cols = PLATE_SHAPES[plate_type]
+            pitch = np.linalg.norm(centers[-1] - centers[0]) / np.hypot(rows - 1, cols - 1)
+            for cx, cy in np.rint(centers).astype(int):
+                cv2.circle(mask, (int(cx), int(cy)), max(int(pitch * 0.45), 1), 0, -1)
+        self.mask = mask.astype(bool)
+
+        self.template = self._prepare(reference)
+        self.sharpness = max(laplacian_variance(self.template), 1e-6)
+
+    def _prepare(self, img: np.ndarray) -> np.ndarray:
+        """Crop the plate area and return it downscaled and greyscale."""
+        x0, y0, x1, y1 = self.roi
+        small = cv2.resize(img[y0:y1, x0:x1], self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def score(self, img: np.ndarray) -> FrameQuality:
+        """Return the :class:`FrameQuality` of a BGR frame."""
+        if img.shape != self.frame_shape:
+            return FrameQuality(0.0, 1.0, f"frame size {img.shape[1::-1]} differs from the reference")
+        gray = self._prepare(img)
+        sharpness = laplacian_variance(gray) / self.sharpness
+
+        # blur both sides a little so sub-pixel jitter is not mistaken for occlusion
+        diff = (cv2.GaussianBlur(gray, (5, 5), 0).astype(np.int16)
+                - cv2.GaussianBlur(self.template, (5, 5), 0).astype(np.int16))[self.mask]
+        diff = np.abs(diff - np.median(diff)) if diff.size else diff
+        occluded = float(np.count_nonzero(diff > self.diff_threshold)) / max(diff.size, 1)
+
+        # blur smears the wells over the surface too, so it is reported first
+        reason = None
+        if sharpness < self.min_sharpness:
+            reason = f"frame blurred (sharpness {sharpness:.2f} of reference, limit {self.min_sharpness:.2f})"
+        elif occluded > self.max_occluded:
+            reason = f"plates {occluded:.0%} occluded (limit {self.max_occluded:.0%})"
+        return FrameQuality(sharpness, occluded, reason)
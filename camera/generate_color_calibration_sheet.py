@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
 # Define the Macbeth color patches
 MACBETH_24_BGR = [
@@ -20,22 +19,25 @@ dpi = 300
 fig_width = n_cols * patch_size
 fig_height = n_rows * patch_size
 
-# Create figure
-fig = plt.figure(figsize=(fig_width, fig_height), dpi=dpi)
-ax = fig.add_axes([0, 0, 1, 1])
-ax.set_xlim(0, n_cols)
-ax.set_ylim(0, n_rows)
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
 
-# Draw patches
-for i, color in enumerate(MACBETH_24_RGB):
-    col = i % n_cols
-    row = i // n_cols
-    rect = plt.Rectangle((col, n_rows - 1 - row), 1, 1, facecolor=color/255, edgecolor='none')
-    ax.add_patch(rect)
+    # Create figure
+    fig = plt.figure(figsize=(fig_width, fig_height), dpi=dpi)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_xlim(0, n_cols)
+    ax.set_ylim(0, n_rows)
 
-ax.axis('off')
+    # Draw patches
+    for i, color in enumerate(MACBETH_24_RGB):
+        col = i % n_cols
+        row = i // n_cols
+        rect = plt.Rectangle((col, n_rows - 1 - row), 1, 1, facecolor=color/255, edgecolor='none')
+        ax.add_patch(rect)
 
-# Save and show
-output_path = 'camera/macbeth_chart.png'
-fig.savefig(output_path, dpi=dpi)
-plt.show()
+    ax.axis('off')
+
+    # Save and show
+    output_path = 'camera/macbeth_chart.png'
+    fig.savefig(output_path, dpi=dpi)
+    plt.show()
@@ -0,0 +1,189 @@
+"""
+lens.py — Lens intrinsics and distortion for the plate cameras
+==============================================================
+* Calibrates a camera from checkerboard photos (``cv2.calibrateCamera``)
+  and stores the intrinsics as ``lens.json`` in the robot's directory
+  (``secret/OT_<n>/lens.json``), next to its plate calibrations.
+* :class:`Lens` maps points between the distorted camera image and an
+  ideal pinhole image. The plate readers fit their homography in ideal
+  coordinates and distort only the precomputed sample coordinates, so
+  barrel distortion no longer pulls the outer wells off their samples, and
+  reads cost nothing extra because frames are never undistorted.
+
+Calibrate with::
+
+    python -m camera.lens --robot-number 4 --images "checkerboard/*.jpg"
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Lens:
+    """Pinhole intrinsics and distortion coefficients for one image size."""
+    camera_matrix: np.ndarray    # 3 × 3
+    dist_coeffs: np.ndarray      # (k1, k2, p1, p2[, k3 …])
+    image_size: tuple[int, int]  # (width, height) the intrinsics were fitted at
+
+    @property
+    def key(self) -> str:
+        payload = json.dumps([np.round(self.camera_matrix, 6).tolist(),
+                              np.round(self.dist_coeffs, 8).tolist(), list(self.image_size)])
+        return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+    def for_shape(self, frame_shape: tuple[int, ...]) -> "Lens":
+        """Return the intrinsics rescaled to frames of ``frame_shape``."""
+        h, w = frame_shape[:2]
+        if (w, h) == tuple(self.image_size):
+            return self
+        sx, sy = w / self.image_size[0], h / self.image_size[1]
+        K = np.diag([sx, sy, 1.0]) @ self.camera_matrix
+        return Lens(K, self.dist_coeffs, (w, h))
+
+    def undistort_points(self, pts) -> np.ndarray:
+        """Camera-image pixels → ideal (undistorted) pixels, same shape."""
+        pts = np.asarray(pts, np.float64)
+        # more iterations than cv2.undistortPoints' default five, which
+        # leave pixels of error near the corners of a strongly barrelled lens
+        criteria = (cv2.TERM_CRITERIA_COUNT | cv2.TERM_CRITERIA_EPS, 40, 1e-6)
+        src, K = pts.reshape(-1, 1, 2), self.camera_matrix
+        if hasattr(cv2, "undistortPointsIter"):      # OpenCV 4
+            out = cv2.undistortPointsIter(src, K, self.dist_coeffs, None, K, criteria)
+        else:
+            out = cv2.undistortPoints(src, K, self.dist_coeffs, P=K, criteria=criteria)
+        return out.reshape(pts.shape)
+
+    def distort_points(self, pts) -> np.ndarray:
+        """Ideal pixels → camera-image pixels, same shape."""
+        pts = np.asarray(pts, np.float64)
+        K = self.camera_matrix
+        flat = pts.reshape(-1, 2)
+        rays = np.empty((flat.shape[0], 3))
+        rays[:, 0] = (flat[:, 0] - K[0, 2]) / K[0, 0]
+        rays[:, 1] = (flat[:, 1] - K[1, 2]) / K[1, 1]
+        rays[:, 2] = 1.0
+        out, _ = cv2.projectPoints(rays, np.zeros(3), np.zeros(3), K, self.dist_coeffs)
+        return out.reshape(pts.shape)
+
+    # ──────────────────────────────── storage ─────────────────────────────
+    def to_dict(self) -> dict:
+        return {"camera_matrix": self.camera_matrix.tolist(),
+                "dist_coeffs": np.ravel(self.dist_coeffs).tolist(),
+                "image_size": list(self.image_size)}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Lens":
+        return cls(np.array(d["camera_matrix"], np.float64),
+                   np.array(d["dist_coeffs"], np.float64),
+                   tuple(int(v) for v in d["image_size"]))
+
+
+def lens_path(calib: str) -> str:
+    """Path of the lens file shared by the calibrations in ``calib``'s directory."""
+    return str(Path(calib).with_name("lens.json"))
+
+
+def load_lens(path: str) -> Lens | None:
+    """Return the lens stored at ``path``, or ``None`` if there is none."""
+    try:
+        with open(path) as f:
+            return Lens.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+
+
+_cache: dict[str, tuple[tuple[int, int], Lens]] = {}
+
+
+def lens_for_calibration(calib: str) -> Lens | None:
+    """Return the lens of the robot owning calibration file ``calib``.
+
+    The file is reloaded only when its mtime or size changes.
+    """
+    path = os.path.abspath(lens_path(calib))
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        _cache.pop(path, None)
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _cache.get(path)
+    if cached is None or cached[0] != stamp:
+        cached = _cache[path] = (stamp, load_lens(path))
+    return cached[1]
+
+
+def save_lens(path: str, lens: Lens, rms: float | None = None) -> str:
+    data = lens.to_dict()
+    if rms is not None:
+        data["rms_error"] = rms
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+    return path
+
+
+# ───────────────────────────── checkerboard fit ───────────────────────────
+def calibrate_checkerboard(images: list[np.ndarray],
+                           pattern: tuple[int, int] = (9, 6)) -> tuple[Lens, float]:
+    """Fit a :class:`Lens` from BGR photos of a checkerboard.
+
+    Parameters
+    ----------
+    images : list[np.ndarray]
+        Views of the board at different positions and tilts, all the same size.
+    pattern : tuple[int, int]
+        Inner corners per row and column of the board.
+
+    Returns
+    -------
+    tuple[Lens, float]
+        The lens and the RMS reprojection error in pixels.
+    """
+    board = np.zeros((pattern[0] * pattern[1], 3), np.float32)
+    board[:, :2] = np.mgrid[:pattern[0], :pattern[1]].T.reshape(-1, 2)
+    criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_MAX_ITER, 30, 1e-3)
+
+    obj_pts, img_pts = [], []
+    for img in images:
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        found, corners = cv2.findChessboardCorners(gray, pattern)
+        if not found:
+            continue
+        obj_pts.append(board)
+        img_pts.append(cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria))
+    if len(obj_pts) < 3:
+        raise RuntimeError(f"Checkerboard found in {len(obj_pts)} images; need at least 3")
+
+    h, w = images[0].shape[:2]
+    rms, K, dist, _, _ = cv2.calibrateCamera(obj_pts, img_pts, (w, h), None, None)
+    return Lens(K, dist.ravel(), (w, h)), float(rms)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate lens distortion from checkerboard photos.")
+    parser.add_argument("--images", required=True, help="Glob of checkerboard photos")
+    parser.add_argument("--robot-number", type=int, help="Store in secret/OT_<num>/lens.json")
+    parser.add_argument("--out", default="camera/lens.json", help="Output file without --robot-number")
+    parser.add_argument("--pattern", default="9x6", help="Inner corners per row x column")
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(args.images))
+    frames = [img for img in (cv2.imread(f, cv2.IMREAD_COLOR) for f in files) if img is not None]
+    if not frames:
+        raise SystemExit(f"No images match {args.images}")
+    cols, rows = (int(v) for v in args.pattern.lower().split("x"))
+    lens, rms = calibrate_checkerboard(frames, (cols, rows))
+    out = f"secret/OT_{args.robot_number}/lens.json" if args.robot_number is not None else args.out
+    save_lens(out, lens, rms)
+    print(f"[Saved] Lens calibration to {out} (RMS reprojection error {rms:.2f} px)")
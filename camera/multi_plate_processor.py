@@ -0,0 +1,547 @@
+"""
+multi_plate_processor.py — Any number of plates under one camera
+=================================================================
+* Reads every calibrated plate in a frame in one vectorized pass: the
+  plates' sample patterns are combined into one reader over all wells
+  (``well_sampling.combine_patterns``), and with change detection on only
+  the wells whose cheap signature changed are re-estimated.
+* Applies each plate's baseline correction and the colour LUT fitted from
+  the calibration sheet (or, without one, the optional brightness/saturation
+  boost), queues the diagnostics on the background writer and returns
+  ``{plate name: rows × cols × 3}`` colour arrays.
+* Proposes a calibration from plate corners found in the frame
+  (``plate_detection.py``), so the wrappers open their UIs only when the
+  detection is uncertain.
+* Optionally follows small camera movements by aligning each frame to the
+  reference view of the plates saved at calibration (``drift_tracker.py``).
+* Reads only frames that pass a quality gate (``frame_quality.py``):
+  blurred frames, or frames with the gantry over the plates, are skipped
+  for the next one within ``quality_budget`` seconds.
+* Optionally appends every full reading to a memory-mapped history
+  (``well_history.py``), so earlier readings survive the overwritten
+  ``raw_matrix.json``.
+* Corrects lens distortion in the sample coordinates when the robot has a
+  lens calibration (``lens.py``).
+* A calibration lists its plates as sections with ``corners`` and
+  ``baseline_colors`` next to a shared ``plate_type`` — the dual-plate
+  calibration format, with any number of sections.
+
+:class:`PlateProcessor` and :class:`DualPlateProcessor` are thin wrappers
+that add their calibration UIs and file formats.
+"""
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from camera.artifact_writer import ArtifactWriter, get_writer, write_json
+from camera.calibration_store import Calibration, load_calibration
+from camera.camera_stream import Frame, get_stream
+from camera.drift_tracker import DriftTracker, reference_path
+from camera.frame_quality import FrameQualityError, FrameQualityGate
+from camera.lens import Lens
+from camera.well_history import WellHistory
+from camera.plate_detection import detect_plates
+from camera.well_sampling import (PLATE_SHAPES, IncrementalReader, combine_patterns,
+                                   get_plate_reader, get_rectified_pattern,
+                                   lens_well_centers)
+
+#: ``{plate name: (corners, plate type, baseline section or None)}``
+PlateLayout = dict[str, tuple[list[tuple[int, int]], str, "str | None"]]
+
+
+class MultiPlateProcessor:
+    """Camera processor for any number of calibrated plates in one frame.
+
+    Parameters
+    ----------
+    virtual_mode:
+        Skip the camera entirely (handled by the wrappers).
+    boost_saturation:
+        Apply :meth:`adjust_brightness_saturation` to the corrected colours.
+    writer:
+        Background writer for diagnostics; the shared one by default.
+    stack_frames:
+        Median of this many consecutive frames is read to suppress noise.
+        The default of 1 reads a single frame; more frames add that many
+        frame periods to every read.
+    reader:
+        Well colour reader: ``"gaussian"`` samples or ``"rectified"`` block
+        medians.
+    change_threshold:
+        Only wells whose signature moved more than this are re-read;
+        the others keep their cached colour. ``None`` (the default)
+        re-reads every well every time, so no real colour change can be
+        missed.
+    auto_confidence:
+        Detected plate corners at least this confident are used without
+        opening the calibration UI. ``None`` (the default) always asks the
+        user to confirm, starting the UI from the detected corners.
+    drift_threshold:
+        Follow camera drift and move the plates once they are off by more
+        than this many pixels (``None``, the default, keeps the calibrated
+        corners). Needs the reference view saved when the plates were
+        calibrated.
+    quality_budget:
+        Seconds to keep taking new frames until one passes the quality gate
+        before giving up (``None`` reads every frame as it comes).
+    history_dir:
+        Directory of a :class:`~camera.well_history.WellHistory` that every
+        full reading is appended to (``None`` keeps no history).
+    """
+
+    RAW_MATRIX_FILE = "camera/multi_raw_matrix.json"
+    OUTPUT_FILE = "camera/multi_output_with_read_colors.jpg"
+
+    def __init__(self, virtual_mode: bool = False, boost_saturation: bool = False,
+                 writer: ArtifactWriter | None = None,
+                 stack_frames: int = 1, reader: str = "gaussian",
+                 change_threshold: float | None = None,
+                 auto_confidence: float | None = None,
+                 drift_threshold: float | None = None,
+                 quality_budget: float | None = 3.0,
+                 history_dir: str | None = None) -> None:
+        self.virtual_mode = virtual_mode
+        self.boost_saturation = boost_saturation
+        self.stack_frames = stack_frames
+        self.reader = reader
+        self.change_threshold = change_threshold
+        self.auto_confidence = auto_confidence
+        self.drift_threshold = drift_threshold
+        self.quality_budget = quality_budget
+        self.history_dir = history_dir
+        self.history: WellHistory | None = None
+        self._gate: tuple[tuple, FrameQualityGate] | None = None
+        self._tracker: tuple[Calibration, DriftTracker | None] | None = None
+        # reference views saved but possibly not yet written, by calibration path
+        self._references: dict[str, np.ndarray] = {}
+        self._incremental: dict[str, IncrementalReader] = {}
+        # lens of the calibration last used; applied to every pattern built
+        self.lens: Lens | None = None
+        # per plate, wells that differed from their last estimate in the last read
+        self.changed_by_plate: dict[str, np.ndarray] = {}
+        # diagnostic files are written off the read path
+        self.writer = writer or get_writer()
+
+    # ───────────────────────────── camera snapshot ────────────────────────
+    @staticmethod
+    def capture(cam: int | str = 0, warm: int = 10,
+                res: tuple[int, int] | None = (1920, 1080),
+                after: float | None = None, stack: int = 1) -> Frame:
+        """Return the latest frame captured by a background thread, with its sequence number and time.
+
+        With ``after`` set, wait for a frame captured after that time. With
+        ``stack > 1``, the image is the per-pixel median of that frame and
+        the next ones; the sequence number and time stay those of the first.
+        """
+        stream = get_stream(cam_index=cam, res=res, warm=warm)
+        frame = stream.read_frame(after=after, timeout=10.0 if after is None else 5.0)
+        if stack > 1:
+            frame = frame._replace(image=stream.read_stack(stack, after=frame.timestamp - 1e-6))
+        return frame
+
+    @classmethod
+    def grab_frame(cls, cam: int | str = 0, warm: int = 10,
+                   res: tuple[int, int] | None = (1920, 1080),
+                   after: float | None = None, stack: int = 1) -> np.ndarray:
+        """Return the latest BGR frame captured by a background thread (see :meth:`capture`)."""
+        return cls.capture(cam, warm, res, after, stack).image
+
+    @staticmethod
+    def save_snapshot(img: np.ndarray, path: str = "camera/snapshot.jpg") -> str:
+        """Write ``img`` to ``path`` as a JPEG and return the path."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        return path
+
+    @classmethod
+    def snapshot(cls, cam: int | str = 0, path: str = "camera/snapshot.jpg",
+                 warm: int = 10, burst: int = 5,
+                 res: tuple[int, int] | None = (1920, 1080)) -> str:
+        """Save the median of the latest ``burst`` frames to ``path``."""
+        return cls.save_snapshot(cls.grab_frame(cam, warm, res, stack=burst), path)
+
+    @staticmethod
+    def plate_from_tb(val: int) -> str:
+        """Track-bar value → plate type."""
+        return {0: "12", 1: "24", 2: "48", 3: "96"}.get(val, "96")
+
+    # ────────────────── Brightness/Saturation Adjustment ──────────────────
+    @staticmethod
+    def adjust_brightness_saturation(rgb_colors: np.ndarray,
+                                     brightness_factor: float = 1.1,
+                                     saturation_factor: float = 1.2) -> np.ndarray:
+        """
+        Adjusts the brightness and saturation of an array of RGB colors using
+        the HSV color space.
+
+        Parameters
+        ----------
+        rgb_colors : np.ndarray
+            Input array of RGB colors with values in the 0-255 range.
+        brightness_factor : float
+            Factor to multiply the brightness (Value) by. >1 increases, <1 decreases.
+        saturation_factor : float
+            Factor to multiply the saturation by. >1 increases, <1 decreases.
+
+        Returns
+        -------
+        np.ndarray
+            Array of adjusted RGB colors as float32.
+        """
+        # Convert to uint8 for HSV conversion, ensuring values are clipped
+        img_rgb_u8 = np.clip(rgb_colors, 0, 255).astype(np.uint8)
+
+        # Convert RGB to HSV
+        img_hsv = cv2.cvtColor(img_rgb_u8, cv2.COLOR_RGB2HSV)
+
+        h, s, v = cv2.split(img_hsv)
+
+        # Apply factors to S and V channels, casting to float for multiplication
+        # to prevent overflow, then clipping and converting back to uint8.
+        s = np.clip(s.astype(np.float32) * saturation_factor, 0, 255).astype(np.uint8)
+        v = np.clip(v.astype(np.float32) * brightness_factor, 0, 255).astype(np.uint8)
+
+        # Merge the channels and convert back to RGB
+        final_hsv = cv2.merge([h, s, v])
+        final_rgb = cv2.cvtColor(final_hsv, cv2.COLOR_HSV2RGB)
+
+        return final_rgb.astype(np.float32)
+
+    # ──────────────────────────── plate detection ─────────────────────────
+    def detect_calibration(self, img: np.ndarray, names: list[str],
+                           plate_type: str | None = None) -> tuple[dict | None, float]:
+        """Propose a calibration for plates ``names`` from ``img``.
+
+        Returns the calibration (``{"plate_type", name: {"corners",
+        "baseline_colors"}}``) and the confidence of its least certain
+        plate, or ``(None, 0.0)`` when too few plates are found.
+        """
+        found = detect_plates(img, len(names), [plate_type] if plate_type else None)
+        if len(found) < len(names) or len({d.plate_type for d in found}) > 1:
+            return None, 0.0
+        cfg: dict = {"plate_type": found[0].plate_type}
+        for name, d in zip(names, found):
+            reader = get_plate_reader(d.corners, d.plate_type, img.shape, self.reader, self.lens)
+            cfg[name] = {"corners": d.corners, "baseline_colors": reader.read(img).tolist()}
+        return cfg, min(d.confidence for d in found)
+
+    def accept_detection(self, confidence: float) -> bool:
+        """Whether a detection is confident enough to skip the calibration UI."""
+        if self.auto_confidence is None or confidence < self.auto_confidence:
+            return False
+        print(f"[Calibration] Using detected plate corners (confidence {confidence:.2f})")
+        return True
+
+    # ────────────────────────────── camera drift ──────────────────────────
+    def save_reference(self, img: np.ndarray, calib: str) -> None:
+        """Store ``img`` as the drift reference of calibration ``calib``.
+
+        Called when the plates are calibrated. The PNG is written by the
+        background writer; reads use the in-memory copy until it is on disk.
+        """
+        img = img.copy()
+        self._references[calib] = img
+
+        def save(path: str) -> None:
+            cv2.imwrite(path, img)
+            if self._references.get(calib) is img:
+                del self._references[calib]
+            print(f"[Saved] Drift reference to {path}")
+
+        self.writer.submit(reference_path(calib), save)
+
+    def load_reference(self, calib: str) -> np.ndarray | None:
+        """Return the reference view of calibration ``calib``, or ``None`` if it has none."""
+        reference = self._references.get(calib)
+        if reference is None:
+            reference = cv2.imread(reference_path(calib), cv2.IMREAD_COLOR)
+        return reference
+
+    def track_drift(self, img: np.ndarray, calibration: Calibration,
+                    layout: PlateLayout) -> PlateLayout:
+        """Return ``layout`` with its corners moved to follow camera drift.
+
+        Only calibrations with a reference view (saved when the plates were
+        calibrated) are tracked; others keep their calibrated corners.
+        """
+        if self.drift_threshold is None or not layout:
+            return layout
+        cached = self._tracker
+        if (cached is None or cached[0] is not calibration
+                or (cached[1] is not None and set(cached[1].corners) != set(layout))):
+            reference = self.load_reference(calibration.path)
+            tracker = None
+            if reference is None or reference.shape != img.shape:
+                print(f"[Drift] No reference view for {calibration.path}; "
+                      "recalibrate to track camera drift")
+            else:
+                corners = {name: quad for name, (quad, _, _) in layout.items()}
+                tracker = DriftTracker(reference, corners, threshold=self.drift_threshold)
+            cached = self._tracker = (calibration, tracker)
+        if cached[1] is None:
+            return layout
+        corners = cached[1].update(img)
+        return {name: (corners[name].tolist(), plate_type, section)
+                for name, (_, plate_type, section) in layout.items()}
+
+    # ───────────────────────────── frame quality ──────────────────────────
+    def quality_gate(self, calibration: Calibration, layout: PlateLayout,
+                     frame_shape: tuple[int, ...]) -> FrameQualityGate | None:
+        """Return the quality gate for ``calibration``, or ``None`` without a reference view.
+
+        Once the drift tracker has moved the plates, the reference is warped
+        by the tracked homography so it is compared where the plates now are.
+        """
+        tracker = self._tracker[1] if self._tracker and self._tracker[0] is calibration else None
+        moved = tracker is not None and any(
+            not np.array_equal(tracker.corners[k], tracker.reference_corners[k])
+            for k in tracker.corners)
+        key = (id(calibration), tuple(layout),
+               tuple(tracker.corners[k].tobytes() for k in sorted(tracker.corners)) if moved else None)
+        if self._gate is not None and self._gate[0] == key:
+            return self._gate[1]
+        reference = self.load_reference(calibration.path)
+        if reference is None or reference.shape != frame_shape:
+            return None
+        plates = {name: (quad, plate_type) for name, (quad, plate_type, _) in layout.items()}
+        if moved:
+            H = tracker.homography()
+            reference = cv2.warpPerspective(reference, H, frame_shape[1::-1],
+                                            borderMode=cv2.BORDER_REPLICATE)
+            plates = {name: (tracker.corners[name].tolist(), plate_type)
+                      for name, (_, plate_type) in plates.items() if name in tracker.corners}
+        gate = FrameQualityGate(reference, plates)
+        self._gate = (key, gate)
+        return gate
+
+    def grab_checked(self, cam_index: int | str, calibration: Calibration,
+                     layout: PlateLayout, after: float | None = None) -> Frame:
+        """Grab a frame, taking newer ones until one passes the quality gate.
+
+        Raises :class:`~camera.frame_quality.FrameQualityError` with the last
+        rejection reason when no frame passes within ``quality_budget`` seconds.
+        """
+        frame = self.capture(cam_index, after=after, stack=self.stack_frames)
+        if self.quality_budget is None or not layout:
+            return frame
+        gate = self.quality_gate(calibration, layout, frame.image.shape)
+        if gate is None:
+            return frame
+        deadline = time.monotonic() + self.quality_budget
+        while not (quality := gate.score(frame.image)).ok:
+            if time.monotonic() >= deadline:
+                raise FrameQualityError(f"No usable frame within {self.quality_budget:.1f}s: "
+                                        f"{quality.reason}")
+            print(f"[Quality] Skipping frame {frame.seq}: {quality.reason}")
+            frame = self.capture(cam_index, after=time.time(), stack=self.stack_frames)
+        return frame
+
+    # ─────────────────────────────── plate reads ──────────────────────────
+    def plate_layout(self, cfg: dict) -> PlateLayout:
+        """Return ``{name: (corners, plate type, baseline section)}`` for ``cfg``.
+
+        Every section of the calibration with ``corners`` is a plate; all
+        plates share the top-level ``plate_type``.
+        """
+        plate_type = str(cfg.get("plate_type", "96"))
+        return {name: (section["corners"], plate_type, name)
+                for name, section in cfg.items()
+                if isinstance(section, dict) and section.get("corners")}
+
+    def projected_centers(self, quad: list[tuple[int, int]], plate_type: str,
+                          frame_shape: tuple[int, ...]) -> np.ndarray:
+        """Return the well centres of ``quad`` in the frame, as the readers place them."""
+        lens = self.lens.for_shape(frame_shape) if self.lens is not None else None
+        return lens_well_centers(quad, plate_type, lens)
+
+    def read_plates(self, img: np.ndarray, layout: PlateLayout,
+                    wells: dict[str, np.ndarray] | None = None):
+        """Return ``(centers, rgb, changed)`` dicts for every plate in ``layout``.
+
+        All plates are read in one pass over a combined reader. ``wells``
+        optionally restricts sampling to the given flat well indices of
+        some plates. ``changed`` holds each plate's ``(rows × cols)`` mask of
+        wells that differed from their last estimate.
+        """
+        names = list(layout)
+        readers = [get_plate_reader(quad, plate_type, img.shape, self.reader, self.lens)
+                   for quad, plate_type, _ in layout.values()]
+        pattern = combine_patterns(readers)
+        starts = np.cumsum([0] + [r.shape[0] * r.shape[1] for r in readers])
+
+        flat = None
+        if wells is not None:
+            flat = np.concatenate([np.asarray(wells[name], np.intp).ravel() + starts[i]
+                                   for i, name in enumerate(names) if name in wells])
+
+        if not self.change_threshold:
+            if flat is None:
+                rgb, changed = pattern.read(img), np.ones(pattern.shape, bool)
+            else:
+                rgb = np.zeros((*pattern.shape, 3), np.float32)
+                rgb.reshape(-1, 3)[flat] = pattern.read_flat(img, flat)
+                changed = np.zeros(pattern.shape, bool)
+                changed.ravel()[flat] = True
+        else:
+            inc = self._incremental.get(pattern.key)
+            if inc is None:
+                probe = combine_patterns([get_rectified_pattern(quad, plate_type, img.shape, 8,
+                                                                lens=self.lens)
+                                          for quad, plate_type, _ in layout.values()])
+                # a new calibration starts from scratch
+                inc = IncrementalReader(pattern, probe, self.change_threshold)
+                self._incremental = {pattern.key: inc}
+            rgb, changed = inc.read(img, flat)
+
+        centers, colors, masks = {}, {}, {}
+        for i, (name, r) in enumerate(zip(names, readers)):
+            part = slice(starts[i], starts[i + 1])
+            centers[name] = r.centers
+            colors[name] = rgb.reshape(-1, 3)[part].reshape(*r.shape, 3)
+            masks[name] = changed.ravel()[part].reshape(r.shape)
+        return centers, colors, masks
+
+    def correct(self, calibration: Calibration, layout: PlateLayout,
+                raw: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """Apply each plate's baseline correction, then the colour LUT.
+
+        Without a LUT fitted from the calibration sheet, the optional
+        brightness/saturation boost is applied instead.
+        """
+        lut = calibration.color_lut()
+        out = {}
+        for name, (_, _, section) in layout.items():
+            adjusted = calibration.correct(raw[name], section)
+            if lut is not None:
+                adjusted = lut.apply(adjusted)
+            elif self.boost_saturation:
+                adjusted = self.adjust_brightness_saturation(adjusted)
+            out[name] = adjusted
+        return out
+
+    def read_calibrated(self, img: np.ndarray, calibration: Calibration,
+                        cfg: dict | None = None):
+        """Return ``(centers, colors)`` dicts of every calibrated plate in ``img``.
+
+        ``cfg`` replaces the stored calibration settings, e.g. to apply a
+        plate type given on the command line.
+        """
+        self.lens = calibration.lens()
+        layout = self.track_drift(img, calibration, self.plate_layout(cfg or calibration.cfg))
+        centers, raw, changed = self.read_plates(img, layout)
+        self.changed_by_plate.update(changed)
+        return centers, self.correct(calibration, layout, raw)
+
+    def read_plate_wells(self, plate: str, wells: list[tuple[int, int]],
+                         frame: np.ndarray | None = None,
+                         cam_index: int | str = 2,
+                         calib: str = "camera/multi_calibration.json",
+                         after: float | None = None) -> np.ndarray:
+        """Return the adjusted ``(len(wells) × 3)`` RGB colours of wells on one plate.
+
+        Only the ``(row, col)`` wells asked for are sampled, from ``frame`` or
+        from a freshly grabbed frame, using the stored calibration. Nothing
+        is written to disk and no calibration UI is opened.
+        """
+        calibration = load_calibration(calib)
+        layout = self.plate_layout(calibration.cfg) if calibration else {}
+        if plate not in layout:
+            raise RuntimeError(f"No calibration for {plate} in {calib}; run process_image first")
+        idx = np.ravel_multi_index(tuple(np.asarray(wells).T), PLATE_SHAPES[layout[plate][1]])
+
+        img = frame if frame is not None else self.grab_checked(cam_index, calibration,
+                                                                 layout, after).image
+        self.lens = calibration.lens()
+        layout = self.track_drift(img, calibration, layout)
+        _, raw, changed = self.read_plates(img, layout, {plate: idx})
+        self.changed_by_plate[plate] = changed[plate]
+        # correct the whole cached matrix; it is only rows × cols values
+        adjusted = self.correct(calibration, {plate: layout[plate]}, raw)[plate]
+        return adjusted.reshape(-1, 3)[idx]
+
+    # ─────────────────────────── diagnostic output ────────────────────────
+    def record(self, colors: dict[str, np.ndarray], frame: Frame) -> None:
+        """Append a full reading of ``frame`` to the history, if one is kept.
+
+        A history that cannot take the reading (other plates, or a frame
+        older than its last reading) is reported and never fails the read.
+        """
+        if self.history_dir is None:
+            return
+        try:
+            if self.history is None:
+                first = next(iter(colors.values()))
+                self.history = WellHistory(self.history_dir, list(colors), first.shape[:2])
+            self.history.append(colors, frame.timestamp, frame.seq)
+        except RuntimeError as exc:
+            print(f"[History] Recording disabled: {exc}")
+            self.history_dir = None
+        except ValueError as exc:
+            print(f"[History] Frame {frame.seq} not recorded: {exc}")
+
+    @staticmethod
+    def draw_read_colors(img: np.ndarray, centers: np.ndarray,
+                         colors: np.ndarray, radius: int = 10) -> np.ndarray:
+        """Return a copy of ``img`` with a left half-disc of each read colour."""
+        disp_colors = np.clip(colors, 0, 255).astype(np.uint8)
+        marked = img.copy()
+        for (cx, cy), rgb_val in zip(np.reshape(centers, (-1, 2)), disp_colors.reshape(-1, 3)):
+            bgr_val = tuple(int(v) for v in rgb_val[::-1])
+            cv2.ellipse(marked, (int(cx), int(cy)), (radius, radius),
+                        0, 90, 270, bgr_val, -1)
+        return marked
+
+    @staticmethod
+    def matrix_json(colors: dict[str, np.ndarray]) -> dict | list:
+        """JSON content of the raw colour matrix file for ``colors``."""
+        return {k: v.tolist() for k, v in colors.items()}
+
+    def save_artifacts(self, img: np.ndarray, centers: dict[str, np.ndarray],
+                       colors: dict[str, np.ndarray],
+                       raw_matrix_file: str | None = None,
+                       output_file: str | None = None) -> None:
+        """Queue the per-plate colour matrices and diagnostic image for writing."""
+        raw_matrix_file = raw_matrix_file or self.RAW_MATRIX_FILE
+        output_file = output_file or self.OUTPUT_FILE
+
+        def save_matrix(path: str) -> None:
+            write_json(path, self.matrix_json(colors))
+            print(f"[Saved] Adjusted plate matrices to {path}")
+
+        def save_image(path: str) -> None:
+            marked = img
+            for key, plate_colors in colors.items():
+                marked = self.draw_read_colors(marked, centers[key], plate_colors)
+            cv2.imwrite(path, marked)
+            print(f"[Saved] {path}")
+
+        self.writer.submit(raw_matrix_file, save_matrix)
+        self.writer.submit(output_file, save_image)
+
+    # -------------------------- main processing ---------------------------
+    def process_image(self, cam_index: int | str = 2,
+                      snap: str | None = "camera/snapshot.jpg",
+                      calib: str = "camera/multi_calibration.json",
+                      after: float | None = None) -> dict[str, np.ndarray]:
+        """Capture and return the adjusted colours of every calibrated plate.
+
+        ``snap=None`` skips the JPEG copy of the frame. With ``after`` set,
+        only a frame captured after that time is used.
+        """
+        calibration = load_calibration(calib)
+        if calibration is None or not self.plate_layout(calibration.cfg):
+            raise RuntimeError(f"No plates calibrated in {calib}")
+
+        frame = self.grab_checked(cam_index, calibration, self.plate_layout(calibration.cfg), after)
+        img = frame.image
+        if snap:
+            self.writer.submit(snap, lambda path: self.save_snapshot(img, path))
+
+        centers, colors = self.read_calibrated(img, calibration)
+        self.save_artifacts(img, centers, {k: v.copy() for k, v in colors.items()})
+        self.record(colors, frame)
+        return colors
@@ -0,0 +1,226 @@
+"""
+plate_detection.py — Find plates in a frame without the calibration UI
+======================================================================
+* Finds plate outlines, either from four printed ArUco markers per plate
+  (``DICT_4X4_50``; plate *k* uses ids ``4k … 4k+3``, clockwise from A1) or
+  from the frame's quadrilateral contours with an SBS plate's proportions.
+* Fits the well grid inside each outline: every plate type's grid is placed
+  at its nominal SBS position, then nudged edge by edge to maximise the
+  contrast between well centres and the plate body between wells.
+* Scores each detection: the contrast of the best grid, its margin over
+  the next best plate type, and how rectangular the outline is. Callers
+  open the manual UI only when the score is low.
+
+Corners follow the UI convention: A1 corner first, then clockwise. Without
+markers the long edge is taken as the row direction and the corner nearest
+the image origin as A1, so a plate turned by 180° needs markers.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from camera.well_sampling import PLATE_SHAPES, plate_homography
+
+#: well-grid extent inside an SBS plate outline, as fractions (x0, y0, x1, y1)
+SBS_GRID = {
+    "96": (0.077, 0.079, 0.923, 0.921),
+    "48": (0.091, 0.041, 0.910, 0.960),
+    "24": (0.062, 0.047, 0.968, 0.950),
+}
+#: SBS footprint, 127.76 × 85.48 mm
+SBS_ASPECT = 127.76 / 85.48
+ARUCO_DICT = "DICT_4X4_50"
+
+
+@dataclass(frozen=True)
+class PlateDetection:
+    """A plate found in a frame."""
+    corners: list[tuple[int, int]]   # well-grid corners, A1 first, clockwise
+    plate_type: str
+    confidence: float                # 0 (guess) … 1 (certain)
+    source: str                      # "fiducial" or "contour"
+
+
+# ───────────────────────────── plate outlines ─────────────────────────────
+def order_corners(pts: np.ndarray) -> np.ndarray:
+    """Return four points clockwise, starting so the first edge is a long one."""
+    pts = np.asarray(pts, np.float32).reshape(4, 2)
+    c = pts.mean(axis=0)
+    pts = pts[np.argsort(np.arctan2(pts[:, 1] - c[1], pts[:, 0] - c[0]))]
+    pts = np.roll(pts, -int(np.argmin(pts.sum(axis=1))), axis=0)
+    if np.linalg.norm(pts[1] - pts[0]) < np.linalg.norm(pts[2] - pts[1]):
+        pts = np.roll(pts, -1, axis=0)
+    return pts
+
+
+def _rectangularity(quad: np.ndarray) -> float:
+    (_, _), (w, h), _ = cv2.minAreaRect(quad.astype(np.float32))
+    return float(cv2.contourArea(quad.astype(np.float32)) / max(w * h, 1e-6))
+
+
+def contour_outlines(gray: np.ndarray, min_area: float = 0.02) -> list[np.ndarray]:
+    """Return quadrilateral contours with roughly SBS proportions, largest first."""
+    h, w = gray.shape
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 30, 90)
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+    contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    quads = []
+    for cnt in contours:
+        area = cv2.contourArea(cnt)
+        if not min_area * h * w <= area <= 0.95 * h * w:
+            continue
+        approx = cv2.approxPolyDP(cnt, 0.02 * cv2.arcLength(cnt, True), True)
+        if len(approx) != 4 or not cv2.isContourConvex(approx):
+            continue
+        (_, _), (rw, rh), _ = cv2.minAreaRect(approx)
+        if abs(max(rw, rh) / max(min(rw, rh), 1e-6) / SBS_ASPECT - 1) > 0.2:
+            continue
+        quads.append(order_corners(approx))
+    quads.sort(key=lambda q: -cv2.contourArea(q))
+
+    # drop duplicates: the inner and outer edge of one plate rim
+    kept: list[np.ndarray] = []
+    for q in quads:
+        centre = tuple(float(v) for v in q.mean(axis=0))
+        if not any(cv2.pointPolygonTest(k, centre, False) >= 0 for k in kept):
+            kept.append(q)
+    return kept
+
+
+def fiducial_outlines(gray: np.ndarray) -> dict[int, np.ndarray]:
+    """Return ``{plate index: outline}`` for plates with all four markers visible.
+
+    Each outline runs through the marker centres. Returns ``{}`` when the
+    OpenCV build has no ArUco module.
+    """
+    aruco = getattr(cv2, "aruco", None)
+    if aruco is None:
+        return {}
+    dictionary = aruco.getPredefinedDictionary(getattr(aruco, ARUCO_DICT))
+    if hasattr(aruco, "ArucoDetector"):
+        corners, ids, _ = aruco.ArucoDetector(dictionary).detectMarkers(gray)
+    else:
+        corners, ids, _ = aruco.detectMarkers(gray, dictionary)
+    if ids is None:
+        return {}
+    centres = {int(i): c.reshape(4, 2).mean(axis=0) for i, c in zip(ids.ravel(), corners)}
+    outlines = {}
+    for plate in sorted({i // 4 for i in centres}):
+        ids4 = [4 * plate + k for k in range(4)]
+        if all(i in centres for i in ids4):
+            outlines[plate] = np.array([centres[i] for i in ids4], np.float32)
+    return outlines
+
+
+# ─────────────────────────────── grid fitting ─────────────────────────────
+def _grid_quad(outline: np.ndarray, box: tuple[float, float, float, float]) -> np.ndarray:
+    """Map a fractional box inside ``outline`` to image coordinates."""
+    src = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], np.float32)
+    H = cv2.getPerspectiveTransform(src, outline.astype(np.float32))
+    x0, y0, x1, y1 = box
+    pts = np.array([[[x0, y0]], [[x1, y0]], [[x1, y1]], [[x0, y1]]], np.float32)
+    return cv2.perspectiveTransform(pts, H).reshape(4, 2)
+
+
+def grid_contrast(lab: np.ndarray, quad: np.ndarray, plate_type: str,
+                  px: int = 16) -> float:
+    """Score how well ``plate_type``'s well grid fits ``quad`` in a Lab frame.
+
+    The grid is rectified to ``px`` pixels per well. The score is the median
+    colour distance between each cell's central disk and its corners
+    (the plate body between wells), relative to the spread inside those
+    regions. A misplaced grid mixes wells and body in both regions.
+    """
+    rows, cols = PLATE_SHAPES[plate_type]
+    H = plate_homography(quad, plate_type) @ np.diag([1.0 / px, 1.0 / px, 1.0])
+    rect = cv2.warpPerspective(lab, H, (cols * px, rows * px),
+                               flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                               borderMode=cv2.BORDER_REPLICATE)
+    blocks = rect.reshape(rows, px, cols, px, 3).transpose(0, 2, 1, 3, 4)
+    blocks = blocks.reshape(rows, cols, px * px, 3).astype(np.float32)
+    u = (np.arange(px) + 0.5) / px - 0.5
+    r = np.hypot(*np.meshgrid(u, u)).ravel()
+    disk, body = blocks[:, :, r < 0.25], blocks[:, :, r > 0.55]
+    dist = np.linalg.norm(disk.mean(axis=2) - body.mean(axis=2), axis=-1)
+    spread = disk.std(axis=2).mean() + body.std(axis=2).mean()
+    return float(np.median(dist) / (spread + 2.0))
+
+
+def fit_grid(lab: np.ndarray, outline: np.ndarray, plate_type: str,
+             step: float = 0.01, rounds: int = 3) -> tuple[np.ndarray, float]:
+    """Return the best well-grid quad for ``plate_type`` inside ``outline`` and its score.
+
+    Starts from the nominal SBS layout and moves each grid edge by up to
+    ``step`` × 4 of the plate size, keeping moves that raise the contrast.
+    """
+    box = list(SBS_GRID.get(plate_type, SBS_GRID["96"]))
+    best = grid_contrast(lab, _grid_quad(outline, box), plate_type)
+    for _ in range(rounds):
+        improved = False
+        for i in range(4):
+            for delta in (-4, -2, -1, 1, 2, 4):
+                trial = box.copy()
+                trial[i] += delta * step
+                score = grid_contrast(lab, _grid_quad(outline, trial), plate_type)
+                if score > best:
+                    best, box, improved = score, trial, True
+        if not improved:
+            break
+    return _grid_quad(outline, box), best
+
+
+def _detect_in(lab: np.ndarray, outline: np.ndarray,
+               plate_types: list[str], source: str) -> PlateDetection:
+    fits = sorted(((fit_grid(lab, outline, t), t) for t in plate_types),
+                  key=lambda f: -f[0][1])
+    (quad, best), plate_type = fits[0]
+    runner_up = fits[1][0][1] if len(fits) > 1 else 0.0
+    contrast = min(best / 3.0, 1.0)
+    margin = 1.0 - runner_up / best if best > 0 else 0.0
+    shape = 1.0 if source == "fiducial" else _rectangularity(outline)
+    confidence = float(np.clip(contrast * margin * shape, 0.0, 1.0))
+    corners = [(int(round(x)), int(round(y))) for x, y in quad]
+    return PlateDetection(corners, plate_type, confidence, source)
+
+
+def detect_plates(img: np.ndarray, n_plates: int = 1,
+                  plate_types: list[str] | None = None,
+                  min_area: float = 0.02) -> list[PlateDetection]:
+    """Find up to ``n_plates`` plates in a BGR frame.
+
+    Plates with markers come in marker order, others left to right.
+
+    Parameters
+    ----------
+    img : np.ndarray
+        BGR frame.
+    n_plates : int
+        Number of plates expected.
+    plate_types : list[str] | None
+        Plate types to consider (default: every type with its own grid).
+    min_area : float
+        Smallest plate outline considered, as a fraction of the frame.
+
+    Returns
+    -------
+    list[PlateDetection]
+        Fewer than ``n_plates`` entries when not enough outlines are found.
+    """
+    plate_types = [str(t) for t in (plate_types or SBS_GRID)]
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
+
+    fiducials = fiducial_outlines(gray)
+    if len(fiducials) >= n_plates:
+        return [_detect_in(lab, fiducials[k], plate_types, "fiducial")
+                for k in sorted(fiducials)[:n_plates]]
+
+    found = [_detect_in(lab, q, plate_types, "contour")
+             for q in contour_outlines(gray, min_area)]
+    found.sort(key=lambda d: -d.confidence)
+    found = found[:n_plates]
+    found.sort(key=lambda d: np.mean([x for x, _ in d.corners]))
+    return found
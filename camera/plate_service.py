@@ -0,0 +1,195 @@
+"""
+plate_service.py — Read the plates continuously in the background
+=================================================================
+* A :class:`PlateReadingService` thread turns new camera frames into
+  calibrated well colours at a fixed rate, through the same
+  :class:`~camera.multi_plate_processor.MultiPlateProcessor` pipeline as an
+  on-demand read: quality gate, drift tracking, incremental well reads,
+  baseline and LUT correction.
+* Each result is published as a :class:`PlateReading` tagged with the
+  camera frame's sequence number and capture time.
+* Consumers call :meth:`PlateReadingService.latest`, which returns at once
+  when a recent enough reading exists. ``after_seq`` or ``after`` (a
+  ``time.time()`` value, e.g. the end of a robot action plus the reaction
+  time) make it wait for the first reading of a newer frame instead.
+* Every reading is appended to the processor's well history, if it keeps
+  one.
+* Wells flagged as changed are accumulated until
+  :meth:`PlateReadingService.pop_changes`, so no change is lost between
+  two consumer calls.
+
+While the service runs it owns its processor; consumers should not call
+the processor directly.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from camera.calibration_store import load_calibration
+from camera.camera_stream import get_stream
+from camera.frame_quality import FrameQualityError
+from camera.multi_plate_processor import MultiPlateProcessor
+
+
+class PlateReading(NamedTuple):
+    """Calibrated colours of every plate in one camera frame."""
+    seq: int                          # sequence number of the frame read
+    timestamp: float                  # capture time of that frame
+    colors: dict[str, np.ndarray]     # {plate name: rows × cols × 3 RGB}
+    changed: dict[str, np.ndarray]    # {plate name: wells changed by this reading}
+
+
+class PlateReadingService:
+    """Background thread publishing the latest calibrated plate colours.
+
+    Parameters
+    ----------
+    processor:
+        Processor whose pipeline and settings (reader, thresholds, stacked
+        frames) are used for every reading.
+    cam_index:
+        Camera to read.
+    calib:
+        Calibration file; edits to it are picked up on the next reading.
+    rate:
+        Readings per second at most.
+    res:
+        Camera resolution, as for :meth:`MultiPlateProcessor.grab_frame`.
+    """
+
+    def __init__(self, processor: MultiPlateProcessor, cam_index: int | str = 2,
+                 calib: str = "camera/calibration.json", rate: float = 2.0,
+                 res: tuple[int, int] | None = (1920, 1080)) -> None:
+        self.processor = processor
+        self.cam_index = cam_index
+        self.calib = calib
+        self.interval = 1.0 / rate
+        self.res = res
+        self.reading: PlateReading | None = None
+        self.error: str | None = None
+        self.rejected: str | None = None      # why the last frame read was skipped
+        self._changes: dict[str, np.ndarray] = {}
+        self._cond = threading.Condition()
+        self.running = False
+        self.thread: threading.Thread | None = None
+
+    # ───────────────────────────── service thread ─────────────────────────
+    def start(self) -> "PlateReadingService":
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._loop, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self) -> "PlateReadingService":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _loop(self) -> None:
+        while self.running:
+            started = time.monotonic()
+            try:
+                self.read_once()
+            except RuntimeError as exc:
+                with self._cond:
+                    if self.error != str(exc):
+                        print(f"[Service] Plate read failed: {exc}")
+                    self.error = str(exc)
+                    self._cond.notify_all()
+            time.sleep(max(self.interval - (time.monotonic() - started), 0.0))
+
+    def read_once(self) -> PlateReading | None:
+        """Read the plates in the next new frame and publish the result.
+
+        Frames that fail the processor's quality gate are skipped and
+        ``None`` is returned.
+        """
+        proc = self.processor
+        calibration = load_calibration(self.calib)
+        layout = proc.plate_layout(calibration.cfg) if calibration else {}
+        if not layout:
+            raise RuntimeError(f"No plates calibrated in {self.calib}")
+
+        stream = get_stream(cam_index=self.cam_index, res=self.res)
+        last = self.reading.timestamp if self.reading else None
+        frame = stream.read_frame(after=last)
+        img = frame.image
+        if proc.stack_frames > 1:
+            # the median of this frame and the next ones, all captured after it started
+            img = stream.read_stack(proc.stack_frames, after=frame.timestamp - 1e-6)
+
+        if proc.quality_budget is not None:
+            gate = proc.quality_gate(calibration, layout, img.shape)
+            quality = gate.score(img) if gate is not None else None
+            if quality is not None and not quality.ok:
+                print(f"[Quality] Skipping frame {frame.seq}: {quality.reason}")
+                with self._cond:
+                    self.error, self.rejected = None, quality.reason
+                return None
+
+        _, colors = proc.read_calibrated(img, calibration)
+        changed = {k: v.copy() for k, v in proc.changed_by_plate.items() if k in colors}
+        reading = PlateReading(frame.seq, frame.timestamp, colors, changed)
+        proc.record(colors, frame)
+        with self._cond:
+            self.reading = reading
+            self.error = self.rejected = None
+            for name, mask in changed.items():
+                pending = self._changes.get(name)
+                self._changes[name] = mask if pending is None else pending | mask
+            self._cond.notify_all()
+        return reading
+
+    # ──────────────────────────────── consumers ───────────────────────────
+    def latest(self, after_seq: int | None = None, after: float | None = None,
+               timeout: float = 10.0) -> PlateReading:
+        """Return the newest reading, waiting for one of a newer frame if asked.
+
+        Parameters
+        ----------
+        after_seq:
+            Only accept a reading of a frame with a higher sequence number.
+        after:
+            Only accept a reading of a frame captured after this
+            ``time.time()`` value.
+        timeout:
+            Seconds to wait beyond ``after`` (or now, whichever is later)
+            before raising ``RuntimeError`` with the last read error, or
+            :class:`~camera.frame_quality.FrameQualityError` when frames
+            were read but none passed the quality gate.
+        """
+        deadline = max(time.time(), after or 0.0) + timeout
+        with self._cond:
+            while True:
+                r = self.reading
+                if (r is not None and (after_seq is None or r.seq > after_seq)
+                        and (after is None or r.timestamp > after)):
+                    return r
+                remaining = deadline - time.time()
+                if remaining <= 0 and self.running and self.error is None and self.rejected:
+                    raise FrameQualityError(f"No usable frame from camera {self.cam_index}: "
+                                            f"{self.rejected}")
+                if remaining <= 0 or not self.running:
+                    reason = self.error or ("service stopped" if not self.running
+                                            else "no new reading")
+                    raise RuntimeError(f"No plate reading for camera {self.cam_index}: {reason}")
+                self._cond.wait(remaining)
+
+    def pop_changes(self, plate: str) -> np.ndarray | None:
+        """Return and reset the wells of ``plate`` that changed since the last call."""
+        with self._cond:
+            return self._changes.pop(plate, None)
@@ -0,0 +1,97 @@
+"""
+preview_canvas.py — Responsive drawing surface for the calibration windows
+==========================================================================
+* Shows a downscaled copy of the frame (at most ``max_size``), so a redraw
+  copies a preview-sized image rather than the full 1080p frame.
+* Renders the static layer (frame, instructions, buttons) once.
+* Caches derived overlay geometry, such as homography-projected well
+  centres, until its inputs change.
+* Redraws only when something was marked dirty, and at most ``fps`` times a
+  second however fast mouse events arrive.
+
+Points are kept at full resolution by the caller; :meth:`PreviewCanvas.to_view`
+and :meth:`PreviewCanvas.to_full` convert between the two.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Hashable
+
+import cv2
+import numpy as np
+
+
+class PreviewCanvas:
+    """Downscaled, dirty-tracked view of a frame in an OpenCV window.
+
+    Parameters
+    ----------
+    img:
+        Full-resolution BGR frame.
+    max_size:
+        Largest preview ``(width, height)``; smaller frames are shown as is.
+    fps:
+        Upper bound on redraws per second.
+    """
+
+    def __init__(self, img: np.ndarray, max_size: tuple[int, int] = (1280, 800),
+                 fps: float = 60.0) -> None:
+        h, w = img.shape[:2]
+        self.full_shape = img.shape
+        self.scale = min(1.0, max_size[0] / w, max_size[1] / h)
+        if self.scale < 1.0:
+            self.base = cv2.resize(img, (round(w * self.scale), round(h * self.scale)),
+                                   interpolation=cv2.INTER_AREA)
+        else:
+            self.base = img.copy()
+        self.static = self.base
+        self.interval = 1.0 / fps
+        self.dirty = True
+        self._last = 0.0
+        self._cache: dict[str, tuple[Hashable, Any]] = {}
+
+    # ───────────────────────────── coordinates ────────────────────────────
+    def to_view(self, pts) -> np.ndarray:
+        """Full-resolution point(s) → integer preview coordinates."""
+        return np.rint(np.asarray(pts, np.float64) * self.scale).astype(int)
+
+    def to_full(self, x: int, y: int) -> tuple[int, int]:
+        """Preview coordinates → full-resolution point inside the frame."""
+        h, w = self.full_shape[:2]
+        return (int(min(max(round(x / self.scale), 0), w - 1)),
+                int(min(max(round(y / self.scale), 0), h - 1)))
+
+    # ─────────────────────────────── layers ───────────────────────────────
+    def render_static(self, draw: Callable[[np.ndarray], Any]) -> None:
+        """Draw the static layer once onto a copy of the preview."""
+        self.static = self.base.copy()
+        draw(self.static)
+        self.dirty = True
+
+    def cached(self, name: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return ``compute()``, recomputed only when ``key`` changes."""
+        hit = self._cache.get(name)
+        if hit is None or hit[0] != key:
+            hit = (key, compute())
+            self._cache[name] = hit
+        return hit[1]
+
+    def invalidate(self) -> None:
+        """Mark the dynamic layer as changed."""
+        self.dirty = True
+
+    def show(self, win: str, draw: Callable[[np.ndarray], Any], force: bool = False) -> bool:
+        """Redraw ``win`` if dirty and the frame interval has passed.
+
+        ``draw`` paints the dynamic layer onto a copy of the static one.
+        Returns whether the window was redrawn.
+        """
+        now = time.monotonic()
+        if not force and (not self.dirty or now - self._last < self.interval):
+            return False
+        disp = self.static.copy()
+        draw(disp)
+        cv2.imshow(win, disp)
+        self.dirty = False
+        self._last = now
+        return True
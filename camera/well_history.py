@@ -0,0 +1,189 @@
+"""
+well_history.py — Append-only, memory-mapped log of every plate reading
+=======================================================================
+* Stores each reading's ``(plates × rows × cols × 3)`` colours in a raw
+  float32 file mapped with ``np.memmap``, with parallel capture-time and
+  frame-sequence files, so no reading is lost when ``raw_matrix.json`` is
+  overwritten.
+* The files grow in fixed chunks of ``chunk`` readings. An append writes
+  one reading into the mapping and costs no more than a few array copies.
+* Readings are appended in capture order, so a time window is found by
+  binary search over the timestamps. A query such as "well B7 over the
+  last 60 s" then touches only the pages holding those readings, never the
+  whole history.
+
+Layout of a history directory::
+
+    meta.json     plate names, plate shape, chunk size
+    colors.f32    (capacity × plates × rows × cols × 3) float32
+    times.f64     (capacity,) capture times, 0 for unused slots
+    seqs.i64      (capacity,) camera frame sequence numbers
+"""
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from string import ascii_uppercase
+
+import numpy as np
+
+
+def parse_well(well: str | tuple[int, int]) -> tuple[int, int]:
+    """``"B7"`` → ``(1, 6)``; ``(row, col)`` tuples are returned unchanged."""
+    if isinstance(well, str):
+        return ascii_uppercase.index(well[0].upper()), int(well[1:]) - 1
+    return int(well[0]), int(well[1])
+
+
+class WellHistory:
+    """Memory-mapped time series of plate colours stored in directory ``path``.
+
+    Parameters
+    ----------
+    path:
+        Directory of the history; created if missing.
+    plates:
+        Plate names, in the order they are stored.
+    shape:
+        ``(rows, cols)`` of every plate.
+    chunk:
+        Readings added to the capacity each time the files grow.
+
+    An existing history is reopened and appended to; it must have been
+    created for the same plates and shape. The number of stored readings is
+    counted once on opening, so keep a single writer per directory.
+    """
+
+    def __init__(self, path: str, plates: list[str], shape: tuple[int, int],
+                 chunk: int = 4096) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta_file = self.path / "meta.json"
+        meta = {"plates": list(plates), "shape": [int(s) for s in shape], "chunk": int(chunk)}
+        if meta_file.exists():
+            stored = json.loads(meta_file.read_text())
+            if stored["plates"] != meta["plates"] or stored["shape"] != meta["shape"]:
+                raise RuntimeError(f"History in {path} holds plates {stored['plates']} of shape "
+                                   f"{tuple(stored['shape'])}, not {list(plates)} of {tuple(shape)}")
+            meta["chunk"] = stored["chunk"]
+        else:
+            meta_file.write_text(json.dumps(meta, indent=2))
+        self.plates = meta["plates"]
+        self.shape = tuple(meta["shape"])
+        self.chunk = meta["chunk"]
+        self._frame = (len(self.plates), *self.shape, 3)
+
+        for name in ("colors.f32", "times.f64", "seqs.i64"):
+            (self.path / name).touch()
+        capacity = (self.path / "times.f64").stat().st_size // 8
+        self._map(capacity)
+        unused = np.flatnonzero(self._times == 0)
+        self.count = int(unused[0]) if unused.size else capacity
+
+    def _map(self, capacity: int) -> None:
+        """Size the files for ``capacity`` readings and map them."""
+        self.capacity = capacity
+        self._colors = self._times = self._seqs = None
+        for name, dtype, shape in (("colors.f32", np.float32, self._frame),
+                                   ("times.f64", np.float64, ()),
+                                   ("seqs.i64", np.int64, ())):
+            size = capacity * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+            with open(self.path / name, "r+b") as f:
+                if f.seek(0, 2) < size:
+                    f.truncate(size)
+        if capacity:
+            self._colors = np.memmap(self.path / "colors.f32", np.float32, "r+",
+                                     shape=(capacity, *self._frame))
+            self._times = np.memmap(self.path / "times.f64", np.float64, "r+", shape=(capacity,))
+            self._seqs = np.memmap(self.path / "seqs.i64", np.int64, "r+", shape=(capacity,))
+        else:
+            self._colors = np.empty((0, *self._frame), np.float32)
+            self._times = np.empty(0, np.float64)
+            self._seqs = np.empty(0, np.int64)
+
+    def __len__(self) -> int:
+        return self.count
+
+    # ──────────────────────────────── writing ─────────────────────────────
+    def append(self, colors: dict[str, np.ndarray] | np.ndarray,
+               timestamp: float | None = None, seq: int = 0) -> int:
+        """Store one reading and return its index.
+
+        ``colors`` is ``{plate name: rows × cols × 3}`` or one array of shape
+        ``(plates × rows × cols × 3)``. ``timestamp`` defaults to now and
+        must not be earlier than the previous reading's.
+        """
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        if self.count and timestamp < self._times[self.count - 1]:
+            raise ValueError("Readings must be appended in capture order")
+        if self.count == self.capacity:
+            self.flush()
+            self._map(self.capacity + self.chunk)
+        i = self.count
+        if isinstance(colors, dict):
+            for p, name in enumerate(self.plates):
+                self._colors[i, p] = colors[name]
+        else:
+            self._colors[i] = colors
+        self._seqs[i] = seq
+        # written last: a non-zero time marks the slot as complete
+        self._times[i] = timestamp
+        self.count += 1
+        return i
+
+    def flush(self) -> None:
+        """Write the mapped pages to disk."""
+        for arr in (self._colors, self._times, self._seqs):
+            if isinstance(arr, np.memmap):
+                arr.flush()
+
+    # ──────────────────────────────── reading ─────────────────────────────
+    @property
+    def times(self) -> np.ndarray:
+        """Capture times of all readings (a view into the mapping)."""
+        return self._times[:self.count]
+
+    @property
+    def seqs(self) -> np.ndarray:
+        """Camera frame sequence numbers of all readings."""
+        return self._seqs[:self.count]
+
+    @property
+    def colors(self) -> np.ndarray:
+        """``(readings × plates × rows × cols × 3)`` view of all colours."""
+        return self._colors[:self.count]
+
+    def span(self, since: float | None = None, until: float | None = None,
+             last: float | None = None) -> slice:
+        """Index range of the readings captured in a time window.
+
+        ``last`` selects the final ``last`` seconds before the newest reading.
+        """
+        times = self.times
+        if last is not None and self.count:
+            since = times[-1] - last
+        start = 0 if since is None else int(np.searchsorted(times, since, "left"))
+        stop = self.count if until is None else int(np.searchsorted(times, until, "right"))
+        return slice(start, stop)
+
+    def well(self, well: str | tuple[int, int], plate: str | None = None,
+             since: float | None = None, until: float | None = None,
+             last: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(times, colors)`` of one well over a time window.
+
+        ``colors`` is ``(readings × 3)``. ``plate`` may be omitted when the
+        history holds one plate.
+        """
+        row, col = parse_well(well)
+        p = self.plates.index(plate) if plate is not None else 0
+        window = self.span(since, until, last)
+        return np.array(self.times[window]), np.array(self._colors[window, p, row, col])
+
+    def plate(self, plate: str | None = None, since: float | None = None,
+              until: float | None = None, last: float | None = None
+              ) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(times, colors)`` of a whole plate over a time window."""
+        p = self.plates.index(plate) if plate is not None else 0
+        window = self.span(since, until, last)
+        return np.array(self.times[window]), np.array(self._colors[window, p])
@@ -9,7 +9,9 @@ import json
 import streamlit as st
 import numpy as np
 from color_matching.robot.ot2_utils import OT2Manager, WellFullError, TiprackEmptyError
+from camera.camera_stream import get_stream
 from camera.camera_w_calibration import PlateProcessor
+from camera.plate_service import PlateReadingService
 import matplotlib.pyplot as plt
 import time
 from color_matching.active_learning.color_learning import ColorLearningOptimizer
@@ -50,6 +52,9 @@ OT_NUMBER = 5
 
 STERILE = True
 WHITE_THRESHOLD = 120  # RGB threshold for white detection
+LIGHTS_SETTLE_TIME = 2  # seconds after the lights turn on before frames are trusted
+PLATE_SERVICE_RATE = None  # plate reads per second in the background; None reads on demand
+WELL_HISTORY_DIR = f"secret/OT_{OT_NUMBER}/well_history"  # every plate reading is kept here; None keeps none
 
 
 # Example available color wells
@@ -116,9 +121,35 @@ if "robot" not in st.session_state:
 
 
     print("Lights turned on.")
-    time.sleep(2)  # wait for lights to stabilize
-
-st.session_state.processor = PlateProcessor(virtual_mode=VIRTUAL_MODE)
+    # the first plate read waits for a frame captured once the lights settle
+    st.session_state.lights_on_at = time.time()
+    if not VIRTUAL_MODE:
+        # fix exposure and white balance on the lit deck, not the dark one; the
+        # capture thread waits for the level to settle and reads queue behind it
+        if not get_stream(cam_index=CAM_INDEX, res=(1920, 1080)).lock_exposure(timeout=LIGHTS_SETTLE_TIME):
+            print("Camera exposure is not locked yet; readings may drift until it is.")
+
+# one processor per session, shared with the service: a well history must
+# have a single writer, or appends overwrite each other's slots
+if "processor" not in st.session_state:
+    st.session_state.processor = PlateProcessor(virtual_mode=VIRTUAL_MODE, history_dir=WELL_HISTORY_DIR)
+if PLATE_SERVICE_RATE and not VIRTUAL_MODE and "plate_service" not in st.session_state:
+    st.session_state.plate_service = PlateReadingService(
+        st.session_state.processor, CAM_INDEX, f"secret/OT_{OT_NUMBER}/calibration.json",
+        rate=PLATE_SERVICE_RATE,
+    ).start()
+
+
+def read_plate(after: float | None = None) -> np.ndarray:
+    """Return the calibrated plate colours, from the background service if it runs."""
+    service = st.session_state.get("plate_service")
+    if service is not None:
+        return service.latest(after=after).colors["plate"]
+    return st.session_state.processor.process_image(
+        cam_index=CAM_INDEX,
+        calib=f"secret/OT_{OT_NUMBER}/calibration.json",
+        after=after,
+    )
 st.session_state.setdefault("well_data", load_table())
 st.session_state.setdefault("global_well_data", load_global_table())
 
@@ -176,10 +207,7 @@ st.session_state[f"guesses_{row}"] = 0
 st.session_state[f"history_{row}"] = []
 
 # snap the whole plate
-full_plate = st.session_state.processor.process_image(
-    cam_index=CAM_INDEX,
-    calib=f"secret/OT_{OT_NUMBER}/calibration.json",
-)
+full_plate = read_plate(after=st.session_state.get("lights_on_at", 0.0) + LIGHTS_SETTLE_TIME)
 record_measurements(
     st.session_state.well_data,
     st.session_state.global_well_data,
@@ -311,11 +339,8 @@ if make_btn:
             st.stop()
             
 
-    # photo & measure
-    full_plate = st.session_state.processor.process_image(
-        cam_index=CAM_INDEX,
-        calib=f"secret/OT_{OT_NUMBER}/calibration.json",
-    )
+    # photo & measure, using only a frame captured after the robot finished
+    full_plate = read_plate(after=time.time())
     record_measurements(
         st.session_state.well_data,
         st.session_state.global_well_data,
@@ -358,10 +383,7 @@ if reset_btn:
     )
     st.rerun()
 if restore_btn:
-    color_data = st.session_state.processor.process_image(
-        cam_index=CAM_INDEX,
-        calib=f"secret/OT_{OT_NUMBER}/calibration.json",
-    )
+    color_data = read_plate()
     record_measurements(
         st.session_state.well_data,
         st.session_state.global_well_data,
@@ -471,7 +493,6 @@ def _ai_step() -> None:
     row_letter: str = st.session_state.ai_row
     optimizer: ColorLearningOptimizer = st.session_state.ai_optimizer
     robot = st.session_state.robot
-    processor = st.session_state.processor
     st.session_state.well_data = load_table()
     st.session_state.global_well_data = load_global_table()
     target_color: Iterable[int] = st.session_state.well_data[
@@ -537,10 +558,7 @@ def _ai_step() -> None:
             else:
                 raise
 
-    color_data = processor.process_image(
-        cam_index=CAM_INDEX,
-        calib=f"secret/OT_{OT_NUMBER}/calibration.json",
-    )
+    color_data = read_plate(after=time.time())
     record_measurements(
         st.session_state.well_data,
         st.session_state.global_well_data,
@@ -106,8 +106,8 @@ def active_learn_row(
                 else:
                     raise
 
-        # measure
-        color_data = processor.process_image(cam_index=cam_index)
+        # measure, using only a frame captured after the robot finished
+        color_data = processor.process_image(cam_index=cam_index, after=time.time())
         measured_color = color_data[row_idx][column - 1]
         if log_cb:
             log_cb(f"Measured: {measured_color}")
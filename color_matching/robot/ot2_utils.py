@@ -6,6 +6,8 @@ from scp import SCPClient
 from typing import Any, Dict, List, Optional
 import threading
 
+from camera.calibration_store import load_calibration
+
 
 def get_plate_type(calibration_file: str = "camera/calibration.json") -> str:
     """Return the labware name from the calibration file.
@@ -13,7 +15,8 @@ def get_plate_type(calibration_file: str = "camera/calibration.json") -> str:
     The camera calibration workflow writes the plate type to ``camera/calibration.json``
     as a numeric string (e.g. ``"96"``).  This helper converts that value into
     the corresponding Opentrons labware name.  If the file does not exist or is
-    invalid, a 96-well plate is assumed.
+    invalid, a 96-well plate is assumed. The parsed file is shared with the
+    plate processors through :mod:`camera.calibration_store`.
 
     Parameters
     ----------
@@ -35,10 +38,10 @@ def get_plate_type(calibration_file: str = "camera/calibration.json") -> str:
     }
 
     try:
-        with open(calibration_file, "r") as f:
-            cfg = json.load(f)
-            plate_key = str(cfg.get("plate_type", "96"))
-    except (FileNotFoundError, json.JSONDecodeError):
+        calibration = load_calibration(calibration_file)
+        plate_key = calibration.plate_type if calibration else "96"
+    except (ValueError, KeyError, TypeError, AttributeError):
+        # malformed JSON (a ValueError) or content that is not a calibration
         plate_key = "96"
 
     return mapping.get(plate_key, mapping["96"])
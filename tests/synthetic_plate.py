@@ -0,0 +1,27 @@
+"""Synthetic 96-well plate shared by the camera tests."""
+import json
+
+import cv2
+import numpy as np
+
+from camera.well_sampling import quad_well_centers
+
+QUAD = [(200, 120), (760, 130), (750, 500), (210, 490)]
+
+
+def plate_frame(seed=0):
+    """A grey 960x600 frame with a light plate at ``QUAD`` and randomly coloured wells."""
+    rng = np.random.default_rng(seed)
+    img = np.full((600, 960, 3), 90, np.uint8)
+    cv2.fillConvexPoly(img, np.int32(QUAD), (225, 225, 225))
+    for cx, cy in quad_well_centers(QUAD, "96").reshape(-1, 2):
+        color = tuple(int(v) for v in rng.integers(0, 256, 3))
+        cv2.circle(img, (int(cx), int(cy)), 16, color, -1)
+    return img
+
+
+def write_calibration(path):
+    """Write a calibration for the plate at ``QUAD`` with a black baseline."""
+    with open(path, "w") as f:
+        json.dump({"plate_type": "96", "corners": QUAD,
+                   "baseline_colors": [[[0, 0, 0]] * 12] * 8}, f)
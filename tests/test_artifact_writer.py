@@ -0,0 +1,60 @@
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from camera.artifact_writer import ArtifactWriter, write_json
+
+
+class ArtifactWriterTests(unittest.TestCase):
+    def setUp(self):
+        self.writer = ArtifactWriter(max_pending=2)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(self.writer.stop)
+
+    def _block_writer(self) -> threading.Event:
+        """Occupy the writer thread until the returned event is set."""
+        release = threading.Event()
+        started = threading.Event()
+
+        def wait(path):
+            started.set()
+            release.wait(5)
+
+        self.writer.submit(str(Path(self.tmp.name) / "block"), wait)
+        started.wait(5)
+        return release
+
+    def test_flush_writes_queued_files(self):
+        path = str(Path(self.tmp.name) / "sub" / "matrix.json")
+        self.writer.submit(path, lambda p: write_json(p, [[1, 2, 3]]))
+        self.assertTrue(self.writer.flush(timeout=5))
+        with open(path) as f:
+            self.assertEqual(json.load(f), [[1, 2, 3]])
+
+    def test_pending_write_to_same_path_is_coalesced(self):
+        path = str(Path(self.tmp.name) / "matrix.json")
+        release = self._block_writer()
+        self.writer.submit(path, lambda p: write_json(p, "old"))
+        self.writer.submit(path, lambda p: write_json(p, "new"))
+        release.set()
+        self.assertTrue(self.writer.flush(timeout=5))
+        with open(path) as f:
+            self.assertEqual(json.load(f), "new")
+        self.assertEqual(self.writer.dropped, 0)
+
+    def test_oldest_write_dropped_when_full(self):
+        written = []
+        release = self._block_writer()
+        for name in ["a", "b", "c"]:
+            self.writer.submit(str(Path(self.tmp.name) / name), written.append)
+        release.set()
+        self.assertTrue(self.writer.flush(timeout=5))
+        self.assertEqual([Path(p).name for p in written], ["b", "c"])
+        self.assertEqual(self.writer.dropped, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
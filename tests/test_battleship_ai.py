@@ -0,0 +1,54 @@
+import importlib.util
+import unittest
+
+SKIP = importlib.util.find_spec("numpy") is None or importlib.util.find_spec("cv2") is None
+
+if not SKIP:
+    import numpy as np
+    from battleship.ai.base_ai import BattleshipAI
+    from battleship.plate_state_processor import WellState
+
+    class FirstUnknownAI(BattleshipAI):
+        def select_next_move(self):
+            return tuple(np.argwhere(self.board_state == WellState.UNKNOWN)[0])
+
+SCHEMA = {"destroyer": {"length": 2, "count": 1}, "submarine": {"length": 3, "count": 1}}
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class BoardStateTests(unittest.TestCase):
+    def setUp(self):
+        self.ai = FirstUnknownAI("player_1", (8, 12), SCHEMA)
+
+    def test_board_is_int8_with_enum_view(self):
+        ai = self.ai
+        ai.record_shot_result((0, 0), WellState.HIT)
+        ai.record_shot_result((2, 5), WellState.MISS)
+        self.assertEqual(ai.board.dtype, np.int8)
+        self.assertEqual(ai.board[0, 0], WellState.HIT.value)
+        self.assertIs(ai.board_state[0, 0], WellState.HIT)
+        self.assertIs(ai.board_state[2][5], WellState.MISS)
+        self.assertIs(ai.board_state[:, 5][2], WellState.MISS)
+        self.assertEqual([cell for cell in ai.board_state[0]][:2], [WellState.HIT, WellState.UNKNOWN])
+        self.assertEqual(np.argwhere(ai.board_state == WellState.HIT).tolist(), [[0, 0]])
+        self.assertEqual(np.count_nonzero(ai.board_state != WellState.UNKNOWN), 2)
+        self.assertEqual(ai.select_next_move(), (0, 1))
+
+    def test_view_is_read_only(self):
+        with self.assertRaises(ValueError):
+            self.ai.board_state[1, 1] = WellState.HIT
+        self.ai.record_shot_result((1, 1), WellState.HIT)
+        self.ai.record_shot_result((1, 1), WellState.MISS)      # already targeted: ignored
+        self.assertIs(self.ai.board_state[1, 1], WellState.HIT)
+
+    def test_has_won_counts_hits_against_segment_total(self):
+        self.assertEqual(self.ai.total_ship_segments, 5)
+        for col in range(4):
+            self.ai.record_shot_result((0, col), WellState.HIT)
+        self.assertFalse(self.ai.has_won())
+        self.ai.record_shot_result((0, 4), WellState.HIT)
+        self.assertTrue(self.ai.has_won())
+
+
+if __name__ == "__main__":
+    unittest.main()
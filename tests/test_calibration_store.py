@@ -0,0 +1,54 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from camera.calibration_store import load_calibration, save_calibration
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+class CalibrationStoreTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = str(Path(tmp.name) / "calibration.json")
+
+    def test_missing_file_returns_none(self):
+        self.assertIsNone(load_calibration(self.path))
+
+    def test_cached_until_file_changes(self):
+        Path(self.path).write_text(json.dumps({"plate_type": "24"}))
+        first = load_calibration(self.path)
+        self.assertIs(load_calibration(self.path), first)
+
+        Path(self.path).write_text(json.dumps({"plate_type": "48", "x": 1}))
+        st = os.stat(self.path)
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        second = load_calibration(self.path)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.plate_type, "48")
+
+    @unittest.skipUnless(HAS_NUMPY, "numpy is required")
+    def test_baseline_offsets_and_correction(self):
+        import numpy as np
+        baseline = [[[1, 1, 1] for _ in range(12)] for _ in range(8)]
+        baseline[0][0] = [2, 2, 2]
+        baseline[0][1] = [0, 0, 0]
+        cal = save_calibration(self.path, {"plate_type": "96",
+                                           "plate_1": {"baseline_colors": baseline}})
+        self.assertIsNone(cal.baseline_offsets())
+        offsets = cal.baseline_offsets("plate_1")
+        self.assertIs(cal.baseline_offsets("plate_1"), offsets)
+        self.assertEqual(offsets.dtype, np.float32)
+
+        corrected = cal.correct(np.full((8, 12, 3), 11, np.float32), "plate_1")
+        self.assertTrue(np.allclose(corrected[0][0], [10, 10, 10]))
+        self.assertTrue(np.allclose(corrected[0][1], [12, 12, 12]))
+        self.assertTrue(np.allclose(corrected[1][1], [11, 11, 11]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,334 @@
+import importlib.util
+import threading
+import time
+import unittest
+
+SKIP = importlib.util.find_spec("numpy") is None or importlib.util.find_spec("cv2") is None
+
+if not SKIP:
+    import cv2
+    import numpy as np
+    from unittest.mock import patch
+    from camera.camera_stream import CameraStream
+
+
+class FakeCapture:
+    """Stand-in for ``cv2.VideoCapture`` producing numbered grey frames."""
+
+    def __init__(self, *args, **kwargs):
+        self.count = 0
+        self.decoded = 0
+
+    def isOpened(self):
+        return True
+
+    def set(self, *args):
+        return True
+
+    def grab(self):
+        self.count += 1
+        time.sleep(0.005)
+        return True
+
+    def retrieve(self, image=None):
+        self.decoded += 1
+        if image is None:
+            image = np.empty((12, 16, 3), np.uint8)
+        image[...] = self.count % 200 + 20
+        return True, image
+
+    def read(self, image=None):
+        self.grab()
+        return self.retrieve(image)
+
+    def release(self):
+        pass
+
+
+class BlackCapture(FakeCapture):
+    """A camera that has failed into returning all-black frames."""
+
+    def retrieve(self, image=None):
+        ok, image = super().retrieve(image)
+        image[...] = 0
+        return ok, image
+
+
+class SwitchableCapture(FakeCapture):
+    """A camera that fails into all-black frames once ``black`` is set."""
+
+    black = False
+
+    def retrieve(self, image=None):
+        ok, image = super().retrieve(image)
+        if self.black:
+            image[...] = 0
+        return ok, image
+
+
+class UnpluggedCapture(FakeCapture):
+    """A camera that stops delivering frames and cannot be reopened."""
+
+    opened = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        UnpluggedCapture.opened += 1
+        self.first = UnpluggedCapture.opened == 1
+
+    def isOpened(self):
+        return self.first
+
+    def grab(self):
+        time.sleep(0.005)
+        return False
+
+    def read(self, image=None):
+        return self.grab(), None
+
+
+class FlakyCapture(FakeCapture):
+    """A working camera whose every tenth grab fails."""
+
+    def grab(self):
+        super().grab()
+        return self.count % 10 != 0
+
+
+class SlowOpenCapture(FakeCapture):
+    """A camera that only opens on the third attempt."""
+
+    attempts = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        SlowOpenCapture.attempts += 1
+
+    def isOpened(self):
+        return SlowOpenCapture.attempts >= 3
+
+
+class SettlingCapture(FakeCapture):
+    """A camera whose auto-exposure brightens the first frames, then settles."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.props = {}
+
+    def get(self, prop):
+        return 150.0
+
+    def set(self, prop, value):
+        self.props[prop] = value
+        return True
+
+    def retrieve(self, image=None):
+        ok, image = super().retrieve(image)
+        image[...] = min(self.count * 20, 120)
+        return ok, image
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class CameraStreamTests(unittest.TestCase):
+    def setUp(self):
+        self.stream = self._start(FakeCapture)
+
+    def _start(self, capture, **kwargs):
+        for name, fake in [("VideoCapture", capture),
+                           ("imshow", lambda *a: None),
+                           ("waitKey", lambda *a: -1)]:
+            patcher = patch(f"camera.camera_stream.cv2.{name}", fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        stream = CameraStream(0, res=None, backend="any", **{"warm": 0, **kwargs})
+        self.addCleanup(stream.stop)
+        return stream
+
+    def test_frames_carry_increasing_sequence_numbers(self):
+        first = self.stream.read_frame(after=time.time())
+        second = self.stream.read_frame(after=first.timestamp)
+        self.assertGreater(second.seq, first.seq)
+        self.assertGreater(second.timestamp, first.timestamp)
+
+    def test_read_after_waits_for_newer_frame(self):
+        t = time.time() + 0.05
+        frame = self.stream.read_frame(after=t, timeout=2)
+        self.assertGreater(frame.timestamp, t)
+        self.assertEqual(frame.image.shape, (12, 16, 3))
+
+    def test_read_after_fails_once_stopped(self):
+        self.stream.stop()
+        with self.assertRaises(RuntimeError):
+            self.stream.read_after(time.time(), timeout=0.05)
+
+    def test_capture_reuses_ring_buffers(self):
+        self.stream.read_frame(after=time.time())
+        ring = self.stream._ring
+        self.stream.read_frame(after=time.time())
+        self.assertIs(self.stream._ring, ring)
+        self.assertEqual(ring.shape, (self.stream.buffers, 12, 16, 3))
+
+    def test_read_stack_reduces_latest_frames(self):
+        for reducer in ("median", "mean"):
+            stacked = self.stream.read_stack(3, reducer=reducer, after=time.time())
+            self.assertEqual(stacked.shape, (12, 16, 3))
+            self.assertEqual(stacked.dtype, np.uint8)
+            self.assertTrue(20 <= int(stacked[0, 0, 0]) < 220)
+
+    def test_concurrent_stacks_never_starve_the_capture_thread(self):
+        self.stream.set_live()
+        results, errors = [], []
+
+        def reader():
+            try:
+                for _ in range(5):
+                    results.append(self.stream.read_stack(5, after=time.time(), timeout=2))
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=reader) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 15)
+        self.assertTrue(self.stream.thread.is_alive())
+        self.assertTrue(all(np.all(r == r[0, 0, 0]) for r in results))
+        self.assertEqual(int(self.stream._held.sum()), 0)
+
+    def test_capture_survives_every_slot_being_held(self):
+        self.stream.set_live()
+        self.stream.read_frame(after=time.time(), timeout=2)
+        with self.stream._cond:
+            self.stream._held += 1
+        time.sleep(0.1)
+        self.stream._release(np.arange(self.stream.buffers))
+        self.assertTrue(self.stream.thread.is_alive())
+        self.stream.read_frame(after=time.time(), timeout=2)
+
+    def test_read_stack_rejects_more_frames_than_ring(self):
+        with self.assertRaises(ValueError):
+            self.stream.read_stack(self.stream.buffers)
+
+    def test_idle_stream_only_decodes_on_demand(self):
+        time.sleep(0.1)
+        cap = self.stream.cap
+        self.assertGreater(cap.count, 0)
+        self.assertEqual(cap.decoded, 0)
+        requested = time.time()
+        frame = self.stream.read_frame()
+        self.assertGreater(frame.timestamp, requested)
+        decoded = cap.decoded
+        time.sleep(0.1)
+        self.assertLessEqual(cap.decoded, decoded + 1)
+
+    def test_scattered_grab_failures_do_not_restart_idle_stream(self):
+        stream = self._start(FlakyCapture, max_bad_frames=3)
+        time.sleep(0.6)
+        self.assertGreater(stream.cap.count, 30)
+        self.assertEqual((stream.restarts, stream.status), (0, "ok"))
+
+    def test_idle_stream_notices_a_black_camera(self):
+        stream = self._start(SwitchableCapture)
+        stream.IDLE_HEALTH_INTERVAL = 0.05
+        stream.read_frame(timeout=2)
+        self.assertTrue(stream.healthy)
+        stream.cap.black = True
+        time.sleep(0.2)
+        self.assertFalse(stream.healthy)
+        decoded = stream.cap.decoded
+        time.sleep(0.2)
+        self.assertLess(stream.cap.decoded - decoded, 10)
+
+    def test_live_stream_decodes_continuously(self):
+        self.stream.set_live()
+        time.sleep(0.1)
+        decoded = self.stream.cap.decoded
+        time.sleep(0.1)
+        self.assertGreater(self.stream.cap.decoded, decoded)
+
+    def test_health_is_reported_with_frames(self):
+        frame = self.stream.read_frame(after=time.time())
+        self.assertEqual(frame.health, 1.0)
+        self.assertTrue(self.stream.healthy)
+
+    def test_black_frames_trigger_restart_not_hang(self):
+        stream = self._start(BlackCapture, max_bad_frames=3)
+        start = time.time()
+        with self.assertRaises(RuntimeError):
+            stream.read(timeout=0.8)
+        self.assertLess(time.time() - start, 2)
+        self.assertGreaterEqual(stream.restarts, 1)
+        self.assertFalse(stream.healthy)
+
+    def test_reconnect_starts_a_new_session(self):
+        stream = self._start(SwitchableCapture, max_bad_frames=3, live=True)
+        stream.read_frame(timeout=2)
+        first = stream.connected_at
+        stream.cap.black = True
+        deadline = time.time() + 3
+        while stream.restarts == 0 and time.time() < deadline:
+            time.sleep(0.02)
+        frame = stream.read_frame(timeout=3)
+        self.assertGreater(stream.connected_at, first)
+        self.assertGreater(frame.timestamp, stream.connected_at)
+
+    def test_readers_fail_fast_once_camera_is_down(self):
+        UnpluggedCapture.opened = 0
+        stream = self._start(UnpluggedCapture, max_bad_frames=2, restart_timeout=0,
+                             max_backoff=0.5)
+        deadline = time.time() + 3
+        while stream.status != "down" and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(stream.status, "down")
+        start = time.time()
+        with self.assertRaises(RuntimeError):
+            stream.read(timeout=10)
+        self.assertLess(time.time() - start, 1)
+
+
+    def test_open_returns_immediately_and_readers_wait(self):
+        SlowOpenCapture.attempts = 0
+        start = time.time()
+        stream = self._start(SlowOpenCapture, max_backoff=0.4)
+        self.assertLess(time.time() - start, 0.1)
+        self.assertEqual(stream.status, "connecting")
+        # connecting takes ~0.6 s; only the time after it counts
+        frame = stream.read_frame(timeout=0.3)
+        self.assertEqual(stream.status, "ok")
+        self.assertGreater(frame.seq, 0)
+
+    def test_missing_camera_goes_down_without_blocking(self):
+        UnpluggedCapture.opened = 1          # every attempt fails to open
+        stream = self._start(UnpluggedCapture, restart_timeout=0.2, max_backoff=0.1)
+        deadline = time.time() + 3
+        while stream.status != "down" and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(stream.status, "down")
+        with self.assertRaises(RuntimeError):
+            stream.read(timeout=10)
+
+    def test_warm_up_stops_once_frames_settle_and_locks_exposure(self):
+        stream = self._start(SettlingCapture, warm=50, stable_frames=3, lock_settings=True)
+        stream.read_frame(timeout=2)
+        cap = stream.cap
+        self.assertLess(cap.decoded, 15)
+        self.assertEqual(cap.props[cv2.CAP_PROP_AUTO_EXPOSURE], 0.25)
+        self.assertEqual(cap.props[cv2.CAP_PROP_EXPOSURE], 150.0)
+        self.assertEqual(cap.props[cv2.CAP_PROP_AUTO_WB], 0)
+
+    def test_exposure_is_locked_only_on_request(self):
+        stream = self._start(SettlingCapture, warm=50, stable_frames=3)
+        stream.read_frame(timeout=2)
+        cap = stream.cap
+        self.assertNotIn(cv2.CAP_PROP_AUTO_EXPOSURE, cap.props)
+        self.assertTrue(stream.lock_exposure(timeout=2))
+        self.assertEqual(cap.props[cv2.CAP_PROP_AUTO_EXPOSURE], 0.25)
+        self.assertEqual(cap.props[cv2.CAP_PROP_EXPOSURE], 150.0)
+        self.assertTrue(stream.lock_settings)
+        stream.read_frame(timeout=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
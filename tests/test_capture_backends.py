@@ -0,0 +1,65 @@
+import importlib.util
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+SKIP = importlib.util.find_spec("numpy") is None or importlib.util.find_spec("cv2") is None
+
+if not SKIP:
+    import cv2
+    import numpy as np
+    from unittest.mock import patch
+    from camera.camera_stream import CameraStream
+    from camera.capture_backends import ReplayCapture, default_backend, open_capture
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class ReplayBackendTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        for i in range(3):
+            cv2.imwrite(str(self.dir / f"frame_{i:03d}.png"),
+                        np.full((12, 16, 3), 50 * (i + 1), np.uint8))
+
+    def test_paths_default_to_replay(self):
+        self.assertEqual(default_backend(str(self.dir)), "replay")
+        self.assertIsInstance(open_capture(str(self.dir)), ReplayCapture)
+        with self.assertRaises(ValueError):
+            open_capture(0, backend="nope")
+
+    def test_directory_replays_in_order_and_loops(self):
+        cap = open_capture(str(self.dir), fps=0)
+        values = [int(cap.read()[1][0, 0, 0]) for _ in range(4)]
+        self.assertEqual(values, [50, 100, 150, 50])
+
+    def test_read_fills_given_buffer(self):
+        cap = open_capture(str(self.dir), fps=0)
+        buf = np.zeros((12, 16, 3), np.uint8)
+        ok, frame = cap.read(buf)
+        self.assertTrue(ok)
+        self.assertIs(frame, buf)
+        self.assertEqual(int(buf[0, 0, 0]), 50)
+
+    def test_playback_rate_is_honoured(self):
+        cap = open_capture(str(self.dir), fps=50)
+        start = time.time()
+        for _ in range(6):
+            cap.read()
+        self.assertGreaterEqual(time.time() - start, 0.09)
+
+    def test_camera_stream_runs_from_recording(self):
+        for name, fake in [("imshow", lambda *a: None), ("waitKey", lambda *a: -1)]:
+            patcher = patch(f"camera.camera_stream.cv2.{name}", fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        stream = CameraStream(str(self.dir), res=None, warm=0, fps=200)
+        self.addCleanup(stream.stop)
+        frame = stream.read_frame(after=time.time(), timeout=2)
+        self.assertEqual(frame.image.shape, (12, 16, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+SKIP = importlib.util.find_spec("numpy") is None or importlib.util.find_spec("cv2") is None
+
+if not SKIP:
+    import cv2
+    import numpy as np
+    from camera.calibration_store import load_calibration
+    from camera.color_lut import (MACBETH_24_RGB, ColorLUT, apply_color_model,
+                                  calibrate_from_sheet, fit_color_model, lut_path,
+                                  measure_sheet)
+
+SHEET = [(20, 30), (260, 30), (260, 190), (20, 190)]
+
+
+def photograph(rgb):
+    """Camera response used by the tests: a colour cast and a gamma curve."""
+    cast = np.asarray(rgb, np.float64) * [0.8, 1.0, 1.15] / 255.0
+    return np.clip(255.0 * np.clip(cast, 0, 1) ** 1.2 + 8, 0, 255)
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class ColorLUTTests(unittest.TestCase):
+    def setUp(self):
+        self.img = np.full((220, 280, 3), 30, np.uint8)
+        for i, rgb in enumerate(photograph(MACBETH_24_RGB)):
+            r, c = divmod(i, 6)
+            x, y = 20 + 40 * c, 30 + 40 * r
+            bgr = tuple(int(round(v)) for v in rgb[::-1])
+            cv2.rectangle(self.img, (x, y), (x + 39, y + 39), bgr, -1)
+
+    def test_measures_patches_in_chart_order(self):
+        measured = measure_sheet(self.img, SHEET)
+        self.assertEqual(measured.shape, (24, 3))
+        self.assertTrue(np.allclose(measured, np.rint(photograph(MACBETH_24_RGB)), atol=1))
+
+    def test_identity_lut_is_identity(self):
+        rgb = np.random.default_rng(0).uniform(0, 255, (8, 12, 3))
+        self.assertTrue(np.allclose(ColorLUT.identity().apply(rgb), rgb, atol=1e-3))
+
+    def test_lut_matches_fitted_model(self):
+        model = fit_color_model(measure_sheet(self.img, SHEET))
+        lut = ColorLUT.from_model(model)
+        rgb = np.random.default_rng(1).uniform(0, 255, (200, 3))
+        self.assertLess(np.abs(lut.apply(rgb) - apply_color_model(model, rgb)).max(), 3)
+        corrected = lut.apply(photograph(MACBETH_24_RGB))
+        self.assertLess(np.abs(corrected - MACBETH_24_RGB).mean(), 6)
+
+    def test_calibration_picks_up_saved_lut(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            calib = str(Path(tmp) / "calibration.json")
+            Path(calib).write_text(json.dumps({"plate_type": "96"}))
+            self.assertIsNone(load_calibration(calib).color_lut())
+            calibrate_from_sheet(self.img, SHEET, calib, size=9)
+            self.assertTrue(Path(lut_path(calib)).exists())
+            self.assertEqual(load_calibration(calib).color_lut().size, 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
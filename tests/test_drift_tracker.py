@@ -0,0 +1,62 @@
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+
+SKIP = importlib.util.find_spec("numpy") is None or importlib.util.find_spec("cv2") is None
+
+if not SKIP:
+    import cv2
+    import numpy as np
+    from camera.camera_w_calibration import PlateProcessor
+    from camera.drift_tracker import DriftTracker, reference_path
+    from tests.synthetic_plate import QUAD, plate_frame, write_calibration
+
+
+def shifted(img, dx, dy):
+    M = np.float32([[1, 0, dx], [0, 1, dy]])
+    return cv2.warpAffine(img, M, img.shape[1::-1], borderMode=cv2.BORDER_REPLICATE)
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class DriftTrackerTests(unittest.TestCase):
+    def setUp(self):
+        self.ref = plate_frame()
+
+    def test_follows_a_shifted_camera(self):
+        tracker = DriftTracker(self.ref, {"plate": QUAD})
+        corners = tracker.update(shifted(self.ref, 7, -4))["plate"]
+        self.assertTrue(np.allclose(corners, np.add(QUAD, [7, -4]), atol=0.5))
+
+    def test_small_jitter_keeps_corners(self):
+        tracker = DriftTracker(self.ref, {"plate": QUAD}, threshold=1.5)
+        corners = tracker.update(shifted(self.ref, 0.6, 0.4))["plate"]
+        self.assertTrue(np.array_equal(corners, np.float32(QUAD)))
+        self.assertLess(tracker.drift, 1.5)
+
+    def test_reads_follow_drift(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            calib = str(Path(tmp) / "calibration.json")
+            write_calibration(calib)
+            proc = PlateProcessor(change_threshold=None, drift_threshold=1.5)
+            proc.save_reference(self.ref, calib)
+            before = proc.read_wells([(3, 5)], frame=self.ref, calib=calib)
+            after = proc.read_wells([(3, 5)], frame=shifted(self.ref, 12, 9), calib=calib)
+            proc.writer.flush()
+            self.assertTrue(Path(reference_path(calib)).exists())
+        self.assertTrue(np.allclose(before, after, atol=3))
+
+    def test_frames_are_never_adopted_as_reference(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            calib = str(Path(tmp) / "calibration.json")
+            write_calibration(calib)
+            proc = PlateProcessor(change_threshold=None, drift_threshold=1.5)
+            proc.read_wells([(3, 5)], frame=shifted(self.ref, 12, 9), calib=calib)
+            proc.writer.flush()
+            self.assertFalse(Path(reference_path(calib)).exists())
+            self.assertIsNone(proc._tracker[1])
+            self.assertIsNone(PlateProcessor().drift_threshold)
+
+
+if __name__ == "__main__":
+    unittest.main()
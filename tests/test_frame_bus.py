@@ -0,0 +1,75 @@
+import importlib.util
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+SKIP = importlib.util.find_spec("numpy") is None or importlib.util.find_spec("cv2") is None
+
+if not SKIP:
+    import cv2
+    import numpy as np
+    from unittest.mock import patch
+    from camera import camera_stream
+    from camera.frame_bus import FrameBusReader, FrameServer, attach
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class FrameBusTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.source = str(Path(tmp.name))
+        for i in range(4):
+            cv2.imwrite(str(Path(tmp.name) / f"frame_{i}.png"),
+                        np.full((12, 16, 3), 40 * (i + 1), np.uint8))
+        self.server = FrameServer(self.source, res=None, warm=0, slots=4, fps=200)
+        self.addCleanup(self._stop_server)
+        deadline = time.time() + 3
+        while self.server.ring is None and time.time() < deadline:
+            time.sleep(0.01)
+
+    def _stop_server(self):
+        self.server.stop()
+        self.server.stream.stop()
+        camera_stream._streams.pop(self.source, None)
+
+    def test_reader_sees_published_frames(self):
+        reader = FrameBusReader(self.source)
+        self.addCleanup(reader.stop)
+        first = reader.read_frame(after=time.time(), timeout=2)
+        second = reader.read_frame(after=first.timestamp, timeout=2)
+        self.assertEqual(first.image.shape, (12, 16, 3))
+        self.assertGreater(second.seq, first.seq)
+        self.assertEqual(reader.status, "ok")
+
+    def test_read_stack_over_bus(self):
+        reader = FrameBusReader(self.source)
+        self.addCleanup(reader.stop)
+        stacked = reader.read_stack(3, timeout=2)
+        self.assertEqual(stacked.shape, (12, 16, 3))
+        with self.assertRaises(ValueError):
+            reader.read_stack(4)
+
+    def test_get_stream_reconnects_once_server_exits(self):
+        # as seen from another process: only the reader is cached
+        local = camera_stream._streams.pop(self.source)
+        reader = camera_stream.get_stream(self.source, res=None, warm=0)
+        self.assertIsInstance(reader, FrameBusReader)
+        self.server.stop()
+        local.stop()
+        with patch("camera.frame_bus.STALE_AFTER", 0.1):
+            time.sleep(0.2)
+            self.assertEqual(reader.status, "down")
+            stream = camera_stream.get_stream(self.source, res=None, warm=0)
+        self.addCleanup(stream.stop)
+        self.assertIsNone(reader.ring)
+        self.assertIsInstance(stream, camera_stream.CameraStream)
+        self.assertEqual(stream.read_frame(timeout=2).image.shape, (12, 16, 3))
+
+    def test_attach_without_server_returns_none(self):
+        self.assertIsNone(attach("no/such/camera"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+
+SKIP = importlib.util.find_spec("numpy") is None or importlib.util.find_spec("cv2") is None
+
+if not SKIP:
+    import cv2
+    import numpy as np
+    from unittest.mock import patch
+    from camera.camera_stream import Frame
+    from camera.camera_w_calibration import PlateProcessor
+    from camera.drift_tracker import reference_path
+    from camera.frame_quality import FrameQualityGate
+    from tests.synthetic_plate import QUAD, plate_frame, write_calibration
+
+
+def with_gantry(img):
+    out = img.copy()
+    cv2.rectangle(out, (380, 0), (520, 360), (40, 40, 40), -1)
+    return out
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class FrameQualityTests(unittest.TestCase):
+    def setUp(self):
+        self.ref = plate_frame()
+        self.gate = FrameQualityGate(self.ref, {"plate": (QUAD, "96")})
+
+    def test_changed_wells_pass(self):
+        quality = self.gate.score(plate_frame(seed=5))
+        self.assertTrue(quality.ok, quality.reason)
+
+    def test_rejects_gantry_over_plate(self):
+        quality = self.gate.score(with_gantry(self.ref))
+        self.assertFalse(quality.ok)
+        self.assertIn("occluded", quality.reason)
+
+    def test_rejects_motion_blur(self):
+        quality = self.gate.score(cv2.blur(self.ref, (1, 25)))
+        self.assertFalse(quality.ok)
+        self.assertIn("blurred", quality.reason)
+
+    def test_processor_waits_for_a_clear_frame(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            calib = str(Path(tmp) / "calibration.json")
+            write_calibration(calib)
+            cv2.imwrite(reference_path(calib), self.ref)
+            proc = PlateProcessor(change_threshold=None)
+            frames = iter([with_gantry(self.ref), with_gantry(self.ref), self.ref])
+            with patch.object(proc, "capture", lambda *a, **k: Frame(next(frames), 1, 1.0)):
+                proc.read_wells([(0, 0)], calib=calib)
+            self.assertIsNone(next(frames, None))
+
+            proc.quality_budget = 0.0
+            with patch.object(proc, "capture", lambda *a, **k: Frame(with_gantry(self.ref), 1, 1.0)):
+                with self.assertRaisesRegex(RuntimeError, "occluded"):
+                    proc.read_wells([(0, 0)], calib=calib)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import importlib.util
+import unittest
+
+SKIP = any(importlib.util.find_spec(m) is None for m in ("numpy", "cv2", "paramiko", "scp"))
+
+if not SKIP:
+    from battleship.ai.base_ai import BattleshipAI
+    from battleship.game_manager import BattleshipGame
+    from battleship.plate_state_processor import WellState
+    from camera.frame_quality import FrameQualityError
+
+    class FixedAI(BattleshipAI):
+        def select_next_move(self):
+            return (0, 0)
+
+SCHEMA = {"patrol": {"length": 1, "count": 1}}
+
+
+class FakeRobot:
+    def add_fire_missile_action(self, plate_idx, plate_well):
+        pass
+
+    def add_end_game_action(self):
+        pass
+
+    def execute_actions_on_remote(self):
+        pass
+
+
+class FakeProcessor:
+    """Fails the first ``failures`` reads with ``error``, then reads a hit."""
+
+    def __init__(self, failures=0, error=None, virtual_mode=False):
+        self.failures = failures
+        self.error = error
+        self.virtual_mode = virtual_mode
+        self.reads = []
+
+    def determine_well_state(self, plate_id, well, after=None):
+        self.reads.append(after)
+        if len(self.reads) <= self.failures:
+            raise self.error
+        return WellState.HIT
+
+    def pop_changed_wells(self, plate_id):
+        return set()
+
+
+@unittest.skipIf(SKIP, "numpy, cv2, paramiko and scp are required")
+class GameReadTests(unittest.TestCase):
+    def game(self, processor):
+        players = [FixedAI(f"player_{i}", (8, 11), SCHEMA) for i in (1, 2)]
+        return BattleshipGame(*players, processor, FakeRobot(), reaction_time=0.0)
+
+    def test_retries_when_no_frame_passes_the_quality_gate(self):
+        proc = FakeProcessor(failures=2, error=FrameQualityError("plates 40% occluded"))
+        state = next(self.game(proc).run_game_live())
+        self.assertEqual(state["result"], "HIT")
+        self.assertEqual(len(proc.reads), 3)
+
+    def test_quality_failure_is_raised_once_retries_run_out(self):
+        proc = FakeProcessor(failures=10, error=FrameQualityError("frame blurred"))
+        with self.assertRaises(FrameQualityError):
+            next(self.game(proc).run_game_live())
+        self.assertEqual(len(proc.reads), 4)
+
+    def test_camera_errors_stop_the_game(self):
+        proc = FakeProcessor(failures=1, error=RuntimeError("Camera 2 (down): no healthy frame"))
+        with self.assertRaisesRegex(RuntimeError, "down"):
+            next(self.game(proc).run_game_live())
+        self.assertEqual(len(proc.reads), 1)
+
+    def test_random_results_only_in_virtual_mode(self):
+        proc = FakeProcessor(virtual_mode=True)
+        state = next(self.game(proc).run_game_live())
+        self.assertIn(state["result"], ("HIT", "MISS"))
+        self.assertEqual(proc.reads, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
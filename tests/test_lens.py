@@ -0,0 +1,91 @@
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+SKIP = importlib.util.find_spec("numpy") is None or importlib.util.find_spec("cv2") is None
+
+if not SKIP:
+    import cv2
+    import numpy as np
+    from camera.camera_w_calibration import PlateProcessor
+    from camera.lens import Lens, calibrate_checkerboard, lens_path, save_lens
+    from camera.well_sampling import get_rectified_pattern, get_sample_pattern, quad_well_centers
+
+QUAD = [(60, 40), (900, 40), (900, 560), (60, 560)]
+
+
+def barrel_lens():
+    K = np.array([[700.0, 0, 480], [0, 700.0, 300], [0, 0, 1]])
+    return Lens(K, np.array([-0.35, 0.12, 0, 0, 0]), (960, 600))
+
+
+def distorted_plate(lens, colors):
+    """Render an ideal plate and warp it through ``lens`` like the camera would."""
+    pad = 100   # the ideal image reaches past the frame at its corners
+    ideal = np.full((600 + 2 * pad, 960 + 2 * pad, 3), 40, np.uint8)
+    centers = quad_well_centers(lens.undistort_points(QUAD), "96").reshape(-1, 2) + pad
+    for (cx, cy), color in zip(centers, colors.reshape(-1, 3)):
+        cv2.circle(ideal, (int(round(cx)), int(round(cy))), 22, tuple(int(v) for v in color), -1)
+    yy, xx = np.mgrid[:600, :960].astype(np.float32)
+    src = (lens.undistort_points(np.dstack([xx, yy])) + pad).astype(np.float32)
+    return cv2.remap(ideal, src[..., 0], src[..., 1], cv2.INTER_LINEAR)
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class LensTests(unittest.TestCase):
+    def setUp(self):
+        self.lens = barrel_lens()
+        self.colors = np.random.default_rng(2).integers(0, 256, (8, 12, 3))
+
+    def test_distort_inverts_undistort(self):
+        pts = np.array([[10.0, 10.0], [480, 300], [950, 590], [700, 120]])
+        self.assertTrue(np.allclose(self.lens.distort_points(self.lens.undistort_points(pts)),
+                                    pts, atol=0.05))
+
+    def test_rescales_to_frame_size(self):
+        half = self.lens.for_shape((300, 480, 3))
+        self.assertEqual(half.image_size, (480, 300))
+        self.assertTrue(np.allclose(half.distort_points([[100.0, 50.0]]),
+                                    self.lens.distort_points([[200.0, 100.0]]) / 2, atol=0.01))
+
+    def test_patterns_land_on_distorted_wells(self):
+        img = distorted_plate(self.lens, self.colors)
+        expected = self.colors      # circles are drawn as BGR, reads return RGB
+        for build in (get_sample_pattern, get_rectified_pattern):
+            with self.subTest(reader=build.__name__):
+                read = build(QUAD, "96", img.shape, lens=self.lens).read(img)
+                self.assertLess(np.abs(read[..., ::-1] - expected).max(), 6)
+                plain = build(QUAD, "96", img.shape).read(img)
+                self.assertGreater(np.abs(plain[..., ::-1] - expected).max(), 40)
+
+    def test_processor_uses_the_robots_lens(self):
+        img = distorted_plate(self.lens, self.colors)
+        with tempfile.TemporaryDirectory() as tmp:
+            calib = str(Path(tmp) / "calibration.json")
+            Path(calib).write_text(json.dumps({"plate_type": "96", "corners": QUAD,
+                                               "baseline_colors": [[[0, 0, 0]] * 12] * 8}))
+            save_lens(lens_path(calib), self.lens)
+            proc = PlateProcessor(change_threshold=None, drift_threshold=None)
+            read = proc.read_wells([(0, 0), (7, 11)], frame=img, calib=calib)
+        self.assertIsNotNone(proc.lens)
+        self.assertLess(np.abs(read[:, ::-1] - self.colors[[0, 7], [0, 11]]).max(), 6)
+
+    def test_checkerboard_calibration(self):
+        board = np.full((480, 640), 255, np.uint8)
+        for r in range(7):
+            for c in range(10):
+                if (r + c) % 2 == 0:
+                    board[60 + r * 50:110 + r * 50, 70 + c * 50:120 + c * 50] = 0
+        views = []
+        for dx, dy, tilt in [(0, 0, 0.0), (30, -20, 1e-4), (-25, 15, -1e-4), (10, 25, 2e-4)]:
+            H = np.array([[0.9, 0.05, dx + 30], [-0.04, 0.9, dy + 20], [tilt, -tilt, 1]])
+            views.append(cv2.warpPerspective(board, H, (640, 480), borderValue=255))
+        lens, rms = calibrate_checkerboard(views, (9, 6))
+        self.assertEqual(lens.image_size, (640, 480))
+        self.assertLess(rms, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
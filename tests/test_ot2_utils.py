@@ -40,6 +40,17 @@ class OT2UtilsTests(unittest.TestCase):
             plate = ot2_utils.get_plate_type(str(missing_path))
             self.assertEqual(plate, "corning_96_wellplate_360ul_flat")
 
+    def test_get_plate_type_invalid_calibration(self):
+        modules = [importlib.import_module(f"{app}.robot.ot2_utils")
+                   for app in ("battleship", "color_matching")]
+        with tempfile.TemporaryDirectory() as tmp:
+            cases = [("{not json", "96"), ("[24]", "96"), ('"24"', "96"), ('{"plate_type": 24}', "24")]
+            for i, (content, wells) in enumerate(cases):
+                cfg_path = Path(tmp) / f"calibration_{i}.json"
+                cfg_path.write_text(content)
+                for module in modules:
+                    self.assertIn(f"_{wells}_wellplate", module.get_plate_type(str(cfg_path)))
+
 
 if __name__ == "__main__":
     unittest.main()
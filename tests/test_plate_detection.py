@@ -0,0 +1,101 @@
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+SKIP = importlib.util.find_spec("numpy") is None or importlib.util.find_spec("cv2") is None
+
+if not SKIP:
+    import cv2
+    import numpy as np
+    from unittest.mock import Mock, patch
+    from camera.camera_stream import Frame
+    from camera.camera_w_calibration import PlateProcessor
+    from camera.plate_detection import SBS_GRID, detect_plates
+    from camera.well_sampling import PLATE_SHAPES
+
+OUTLINE = [(300, 150), (980, 170), (960, 620), (320, 600)]
+
+
+def render_plate(plate_type, outline=OUTLINE, shape=(720, 1280), seed=0):
+    """Return a frame with an SBS plate at ``outline`` and its true grid corners."""
+    rng = np.random.default_rng(seed)
+    W, H = 1278, 855      # plate in 0.1 mm
+    flat = np.full((H, W, 3), 225, np.uint8)
+    x0, y0, x1, y1 = SBS_GRID[plate_type]
+    rows, cols = PLATE_SHAPES[plate_type]
+    pw, ph = (x1 - x0) * W / cols, (y1 - y0) * H / rows
+    for r in range(rows):
+        for c in range(cols):
+            centre = (int(x0 * W + (c + .5) * pw), int(y0 * H + (r + .5) * ph))
+            color = tuple(int(v) for v in rng.integers(0, 256, 3))
+            cv2.circle(flat, centre, int(0.36 * pw), color, -1)
+    M = cv2.getPerspectiveTransform(np.float32([[0, 0], [W, 0], [W, H], [0, H]]),
+                                    np.float32(outline))
+    img = np.full((*shape, 3), 40, np.uint8)
+    cv2.warpPerspective(flat, M, shape[::-1], img, borderMode=cv2.BORDER_TRANSPARENT)
+    grid = np.float32([[[x0 * W, y0 * H]], [[x1 * W, y0 * H]],
+                       [[x1 * W, y1 * H]], [[x0 * W, y1 * H]]])
+    noise = rng.normal(0, 3, img.shape)
+    return (np.clip(img + noise, 0, 255).astype(np.uint8),
+            cv2.perspectiveTransform(grid, M).reshape(4, 2))
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class PlateDetectionTests(unittest.TestCase):
+    def test_finds_corners_and_plate_type(self):
+        for plate_type in ("96", "24"):
+            img, truth = render_plate(plate_type)
+            found, = detect_plates(img)
+            self.assertEqual(found.plate_type, plate_type)
+            self.assertEqual(found.source, "contour")
+            self.assertGreater(found.confidence, 0.6)
+            self.assertLess(np.abs(np.array(found.corners) - truth).max(), 10)
+
+    def test_nothing_found_in_empty_frame(self):
+        self.assertEqual(detect_plates(np.full((720, 1280, 3), 90, np.uint8)), [])
+
+    def test_fiducials_fix_the_outline(self):
+        img, truth = render_plate("24")
+        dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50)
+        for marker_id, (x, y) in enumerate(OUTLINE):
+            marker = cv2.aruco.generateImageMarker(dictionary, marker_id, 40)
+            img[y - 20:y + 20, x - 20:x + 20] = marker[..., None]
+        found, = detect_plates(img)
+        self.assertEqual(found.source, "fiducial")
+        self.assertEqual(found.plate_type, "24")
+        self.assertLess(np.abs(np.array(found.corners) - truth).max(), 12)
+
+    def test_first_read_calibrates_without_ui(self):
+        img, truth = render_plate("96")
+        with tempfile.TemporaryDirectory() as tmp:
+            calib = str(Path(tmp) / "calibration.json")
+            proc = PlateProcessor(writer=Mock(), auto_confidence=0.6)
+            with patch.object(PlateProcessor, "capture", return_value=Frame(img, 1, 1.0)), \
+                    patch.object(PlateProcessor, "run_ui", side_effect=AssertionError("UI opened")):
+                colors = proc.process_image(snap=None, calib=calib)
+            cfg = json.loads(Path(calib).read_text())
+        self.assertEqual(colors.shape, (8, 12, 3))
+        self.assertEqual(cfg["plate_type"], "96")
+        self.assertLess(np.abs(np.array(cfg["corners"]) - truth).max(), 10)
+
+    def test_detected_corners_are_confirmed_by_default(self):
+        img, truth = render_plate("96")
+        shown = []
+
+        def run_ui(img, proposal, **kwargs):
+            shown.append(proposal)
+            return proposal
+
+        with tempfile.TemporaryDirectory() as tmp:
+            calib = str(Path(tmp) / "calibration.json")
+            with patch.object(PlateProcessor, "capture", return_value=Frame(img, 1, 1.0)), \
+                    patch.object(PlateProcessor, "run_ui", side_effect=run_ui):
+                PlateProcessor(writer=Mock()).process_image(snap=None, calib=calib)
+        self.assertEqual(len(shown), 1)
+        self.assertLess(np.abs(np.array(shown[0]["corners"]) - truth).max(), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
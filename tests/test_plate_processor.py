@@ -0,0 +1,104 @@
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+SKIP = importlib.util.find_spec("numpy") is None or importlib.util.find_spec("cv2") is None
+
+if not SKIP:
+    import numpy as np
+    from camera.artifact_writer import ArtifactWriter
+    from camera.camera_w_calibration import PlateProcessor
+    from camera.dual_camera_w_calibration import DualPlateProcessor
+    from camera.multi_plate_processor import MultiPlateProcessor
+    from camera.well_sampling import get_plate_reader, quad_well_centers
+
+QUAD = [(10, 10), (130, 10), (130, 90), (10, 90)]
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class ReadWellsTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.calib = str(Path(tmp.name) / "calibration.json")
+        baseline = [[[100, 100, 100]] * 6] * 4
+        Path(self.calib).write_text(json.dumps(
+            {"plate_type": "24", "corners": QUAD, "baseline_colors": baseline}))
+        self.img = np.full((100, 140, 3), 60, np.uint8)
+        x, y = quad_well_centers(QUAD, "24")[2, 3].astype(int)
+        self.img[y - 6:y + 7, x - 6:x + 7] = [0, 0, 240]
+
+    def test_reads_only_requested_wells(self):
+        proc = PlateProcessor(change_threshold=8.0)
+        colors = proc.read_wells([(2, 3), (0, 0)], frame=self.img, calib=self.calib)
+        self.assertEqual(colors.shape, (2, 3))
+        self.assertTrue(np.allclose(colors[0], [240, 0, 0]))
+        self.assertTrue(np.allclose(colors[1], [60, 60, 60]))
+        # wells that were not asked for are never sampled
+        inc, = proc._incremental.values()
+        self.assertFalse(inc.estimated.ravel()[7])
+
+    def test_requires_calibration(self):
+        with self.assertRaises(RuntimeError):
+            PlateProcessor().read_wells([(0, 0)], frame=self.img, calib=self.calib + ".missing")
+
+    def test_defaults_keep_the_original_single_full_read(self):
+        proc = PlateProcessor()
+        self.assertEqual(proc.stack_frames, 1)
+        self.assertIsNone(proc.change_threshold)
+        centers, colors, changed = proc.read_plates(self.img, {"plate": (QUAD, "24", "plate")})
+        self.assertTrue(changed["plate"].all())
+
+    def test_subclasses_forward_options_by_keyword(self):
+        for cls in (PlateProcessor, DualPlateProcessor):
+            proc = cls(True, quality_budget=None, reader="rectified", history_dir="h")
+            self.assertEqual((proc.virtual_mode, proc.quality_budget, proc.reader, proc.history_dir),
+                             (True, None, "rectified", "h"))
+
+    def test_single_plate_matrix_keeps_its_file_format(self):
+        out = Path(self.calib).parent
+        writer = ArtifactWriter()
+        self.addCleanup(writer.stop)
+        colors = np.arange(72, dtype=np.float32).reshape(4, 6, 3)
+        PlateProcessor(writer=writer).save_artifacts(
+            self.img, {"plate": quad_well_centers(QUAD, "24")}, {"plate": colors},
+            str(out / "raw.json"), str(out / "out.jpg"))
+        writer.flush()
+        self.assertEqual(json.loads((out / "raw.json").read_text()), colors.tolist())
+        self.assertTrue((out / "out.jpg").exists())
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class MultiPlateTests(unittest.TestCase):
+    def setUp(self):
+        self.layout = {"plate_1": (QUAD, "24", "plate_1"),
+                       "plate_2": ([(x + 140, y) for x, y in QUAD], "24", "plate_2")}
+        rng = np.random.default_rng(0)
+        self.img = rng.integers(0, 256, (100, 280, 3), dtype=np.uint8)
+
+    def test_one_pass_matches_separate_reads(self):
+        for reader in ("gaussian", "rectified"):
+            proc = MultiPlateProcessor(reader=reader, change_threshold=None)
+            centers, colors, changed = proc.read_plates(self.img, self.layout)
+            for name, (quad, plate_type, _) in self.layout.items():
+                single = get_plate_reader(quad, plate_type, self.img.shape, reader)
+                self.assertTrue(np.allclose(colors[name], single.read(self.img)))
+                self.assertTrue(np.allclose(centers[name], single.centers))
+                self.assertTrue(changed[name].all())
+
+    def test_only_changed_plate_is_reread(self):
+        proc = MultiPlateProcessor(change_threshold=8.0)
+        proc.read_plates(self.img, self.layout)
+        img = self.img.copy()
+        x, y = quad_well_centers(self.layout["plate_2"][0], "24")[1, 4].astype(int)
+        img[y - 8:y + 9, x - 8:x + 9] = [0, 0, 240]
+        _, colors, changed = proc.read_plates(img, self.layout)
+        self.assertFalse(changed["plate_1"].any())
+        self.assertEqual(np.argwhere(changed["plate_2"]).tolist(), [[1, 4]])
+        self.assertTrue(np.allclose(colors["plate_2"][1, 4], [240, 0, 0], atol=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import importlib.util
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+SKIP = importlib.util.find_spec("numpy") is None or importlib.util.find_spec("cv2") is None
+
+if not SKIP:
+    import cv2
+    import numpy as np
+    from unittest.mock import patch
+    from camera.camera_stream import Frame
+    from camera.camera_w_calibration import PlateProcessor
+    from camera.frame_quality import FrameQuality, FrameQualityError
+    from camera.plate_service import PlateReadingService
+    from camera.well_sampling import quad_well_centers
+    from tests.synthetic_plate import QUAD, write_calibration
+
+
+class FakeStream:
+    """Numbered frames of a plate whose well (2, 3) turns red from frame 3 on."""
+
+    def __init__(self):
+        self.seq = 0
+        self.lock = threading.Lock()
+
+    def image(self, seq):
+        img = np.full((600, 960, 3), 200, np.uint8)
+        for i, (cx, cy) in enumerate(quad_well_centers(QUAD, "96").reshape(-1, 2)):
+            color = (0, 0, 255) if i == 2 * 12 + 3 and seq >= 3 else (255, 0, 0)
+            cv2.circle(img, (int(cx), int(cy)), 18, color, -1)
+        return img
+
+    def read_frame(self, after=None, timeout=5.0):
+        with self.lock:
+            self.seq += 1
+            return Frame(self.image(self.seq), self.seq, time.time())
+
+    def read_stack(self, n=5, reducer="median", after=None, timeout=5.0):
+        return self.read_frame().image
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class PlateServiceTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.calib = str(Path(tmp.name) / "calibration.json")
+        write_calibration(self.calib)
+        self.stream = FakeStream()
+        patcher = patch("camera.plate_service.get_stream", lambda **k: self.stream)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def service(self, **kwargs):
+        proc = PlateProcessor(change_threshold=8.0, quality_budget=None)
+        return PlateReadingService(proc, 0, self.calib, **kwargs)
+
+    def test_publishes_numbered_readings(self):
+        with self.service(rate=200) as service:
+            first = service.latest(timeout=5)
+            later = service.latest(after_seq=first.seq + 2, timeout=5)
+        self.assertGreater(later.seq, first.seq + 2)
+        self.assertGreaterEqual(later.timestamp, first.timestamp)
+        self.assertEqual(later.colors["plate"].shape, (8, 12, 3))
+
+    def test_latest_is_instant_once_published(self):
+        service = self.service()
+        reading = service.read_once()
+        service.running = True      # as if started, without the thread
+        t = time.perf_counter()
+        self.assertIs(service.latest(), reading)
+        self.assertLess(time.perf_counter() - t, 0.01)
+        service.running = False
+        with self.assertRaisesRegex(RuntimeError, "stopped"):
+            service.latest(after_seq=reading.seq)
+
+    def test_changes_accumulate_until_popped(self):
+        service = self.service()
+        service.read_once()
+        self.assertTrue(service.pop_changes("plate").all())   # first reading estimates every well
+        for _ in range(3):                                     # well C4 turns red in the second
+            service.read_once()
+        changed = service.pop_changes("plate")
+        self.assertEqual([(int(r), int(c)) for r, c in zip(*np.nonzero(changed))], [(2, 3)])
+        self.assertIsNone(service.pop_changes("plate"))
+
+    def test_rejected_frames_raise_a_quality_error(self):
+        service = self.service()
+        service.processor.quality_budget = 1.0
+        gate = type("Gate", (), {"score": lambda self, img: FrameQuality(0.1, 0.0, "frame blurred")})()
+        service.processor.quality_gate = lambda *args: gate
+        self.assertIsNone(service.read_once())
+        service.running = True
+        with self.assertRaisesRegex(FrameQualityError, "frame blurred"):
+            service.latest(timeout=0.05)
+        service.running = False
+
+
+if __name__ == "__main__":
+    unittest.main()
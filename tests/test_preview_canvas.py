@@ -0,0 +1,74 @@
+import importlib.util
+import unittest
+
+SKIP = importlib.util.find_spec("numpy") is None or importlib.util.find_spec("cv2") is None
+
+if not SKIP:
+    import cv2
+    import numpy as np
+    from unittest.mock import patch
+    from camera.camera_w_calibration import PlateProcessor
+    from camera.preview_canvas import PreviewCanvas
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class PreviewCanvasTests(unittest.TestCase):
+    def setUp(self):
+        self.img = np.zeros((1080, 1920, 3), np.uint8)
+
+    def test_preview_is_downscaled_and_maps_back(self):
+        canvas = PreviewCanvas(self.img)
+        self.assertLessEqual(canvas.base.shape[1], 1280)
+        self.assertEqual(canvas.to_full(*canvas.to_view((960, 540))), (960, 540))
+        self.assertEqual(canvas.to_full(-5, 10_000), (0, 1079))
+
+    def test_redraws_only_when_dirty_and_throttled(self):
+        canvas = PreviewCanvas(self.img, fps=1000)
+        with patch("camera.preview_canvas.cv2.imshow") as imshow:
+            self.assertTrue(canvas.show("w", lambda d: None))
+            self.assertFalse(canvas.show("w", lambda d: None))
+            canvas.interval = 60.0
+            canvas.invalidate()
+            self.assertFalse(canvas.show("w", lambda d: None))
+        self.assertEqual(imshow.call_count, 1)
+
+    def test_cached_geometry_follows_its_key(self):
+        canvas = PreviewCanvas(self.img)
+        calls = []
+        compute = lambda: calls.append(1) or len(calls)
+        self.assertEqual(canvas.cached("wells", (1, "96"), compute), 1)
+        self.assertEqual(canvas.cached("wells", (1, "96"), compute), 1)
+        self.assertEqual(canvas.cached("wells", (2, "96"), compute), 2)
+
+    def test_dragging_a_corner_in_the_preview(self):
+        proc = PlateProcessor()
+        frames = []
+        script = iter([
+            lambda: proc.on_mouse(cv2.EVENT_LBUTTONDOWN, *proc.canvas.to_view(proc.pts[0]), 0, None),
+            lambda: [proc.on_mouse(cv2.EVENT_MOUSEMOVE, 100 + i, 80, 0, None) for i in range(50)],
+            lambda: proc.on_mouse(cv2.EVENT_LBUTTONUP, 149, 80, 0, None),
+        ])
+
+        def wait_key(_):
+            step = next(script, None)
+            if step is None:
+                return ord("c")
+            step()
+            return -1
+
+        fakes = {"namedWindow": lambda *a: None, "setMouseCallback": lambda *a: None,
+                 "createTrackbar": lambda *a: None, "getTrackbarPos": lambda *a: 3,
+                 "destroyWindow": lambda *a: None, "waitKey": wait_key,
+                 "imshow": lambda win, disp: frames.append(disp.shape)}
+        with patch.multiple("camera.camera_w_calibration.cv2", **fakes), \
+                patch("camera.preview_canvas.cv2.imshow", fakes["imshow"]):
+            cfg = proc.run_ui(self.img, None)
+        scale = proc.canvas.scale
+        self.assertEqual(cfg["corners"][0], (round(149 / scale), round(80 / scale)))
+        self.assertEqual(frames[0][:2], proc.canvas.base.shape[:2])
+        # fifty mouse moves between two key polls cause at most one repaint
+        self.assertLessEqual(len(frames), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+SKIP = importlib.util.find_spec("numpy") is None or importlib.util.find_spec("cv2") is None
+
+if not SKIP:
+    import numpy as np
+    from unittest.mock import Mock, patch
+    from camera.camera_stream import Frame
+    from camera.camera_w_calibration import PlateProcessor
+    from camera.dual_camera_w_calibration import DualPlateProcessor
+    from camera.well_history import WellHistory, parse_well
+
+QUAD = [(50, 40), (350, 40), (350, 260), (50, 260)]
+
+
+def reading(i):
+    return {"plate_1": np.full((8, 12, 3), i, np.float32),
+            "plate_2": np.full((8, 12, 3), -i, np.float32)}
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class WellHistoryTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = str(Path(tmp.name) / "history")
+
+    def test_grows_in_chunks_and_reopens(self):
+        history = WellHistory(self.dir, ["plate_1", "plate_2"], (8, 12), chunk=4)
+        for i in range(10):
+            history.append(reading(i), timestamp=100.0 + i, seq=i + 1)
+        self.assertEqual((len(history), history.capacity), (10, 12))
+        history.flush()
+
+        reopened = WellHistory(self.dir, ["plate_1", "plate_2"], (8, 12))
+        self.assertEqual(len(reopened), 10)
+        self.assertEqual(reopened.chunk, 4)
+        self.assertTrue(np.array_equal(reopened.seqs, np.arange(1, 11)))
+        self.assertEqual(reopened.colors.shape, (10, 2, 8, 12, 3))
+        reopened.append(reading(10), timestamp=110.0)
+        self.assertEqual(len(reopened), 11)
+
+    def test_well_over_a_time_window(self):
+        history = WellHistory(self.dir, ["plate_1", "plate_2"], (8, 12), chunk=8)
+        for i in range(20):
+            history.append(reading(i), timestamp=100.0 + i)
+        times, colors = history.well("B7", "plate_2", last=5)
+        self.assertTrue(np.array_equal(times, 100.0 + np.arange(14, 20)))
+        self.assertTrue(np.array_equal(colors[:, 0], -np.arange(14, 20)))
+        times, _ = history.plate("plate_1", since=103.5, until=106)
+        self.assertEqual(times.tolist(), [104.0, 105.0, 106.0])
+        self.assertEqual(parse_well("B7"), (1, 6))
+
+    def test_rejects_other_plates_and_out_of_order_readings(self):
+        history = WellHistory(self.dir, ["plate_1", "plate_2"], (8, 12))
+        history.append(reading(0), timestamp=5.0)
+        with self.assertRaises(ValueError):
+            history.append(reading(1), timestamp=4.0)
+        with self.assertRaisesRegex(RuntimeError, "holds plates"):
+            WellHistory(self.dir, ["plate"], (8, 12))
+
+    def test_processor_records_readings(self):
+        proc = DualPlateProcessor(history_dir=self.dir)
+        proc.record(reading(3), Frame(None, 7, 50.0))
+        proc.record(reading(4), Frame(None, 8, 51.0))
+        proc.record(reading(5), Frame(None, 6, 49.0))      # older frame: reported, not raised
+        self.assertEqual(proc.history.seqs.tolist(), [7, 8])
+        self.assertEqual(proc.history.colors[1, 0, 0, 0, 0], 4)
+        self.assertIsNone(DualPlateProcessor().record(reading(0), Frame(None, 1, 1.0)))
+
+    def test_reading_is_stamped_with_the_frame_it_came_from(self):
+        with open(Path(self.dir).parent / "calibration.json", "w") as f:
+            json.dump({"plate_type": "96", "corners": QUAD,
+                       "baseline_colors": [[[0, 0, 0]] * 12] * 8}, f)
+        proc = PlateProcessor(history_dir=self.dir, writer=Mock())
+        img = np.full((300, 400, 3), 120, np.uint8)
+        with patch.object(PlateProcessor, "capture", return_value=Frame(img, 42, 1234.5)):
+            proc.process_image(snap=None, calib=str(Path(self.dir).parent / "calibration.json"))
+        self.assertEqual((proc.history.seqs.tolist(), proc.history.times.tolist()), ([42], [1234.5]))
+
+    def test_other_plates_disable_recording(self):
+        WellHistory(self.dir, ["plate"], (8, 12))
+        proc = DualPlateProcessor(history_dir=self.dir)
+        proc.record(reading(1), Frame(None, 1, 1.0))
+        self.assertIsNone(proc.history_dir)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import importlib.util
+import unittest
+
+SKIP = importlib.util.find_spec("numpy") is None or importlib.util.find_spec("cv2") is None
+
+if not SKIP:
+    import numpy as np
+    from unittest.mock import patch
+    from camera import well_sampling
+    from camera.well_sampling import (IncrementalReader, dominant_colors, get_plate_reader,
+                                       get_rectified_pattern, get_sample_pattern,
+                                       quad_well_centers, sample_plate_rgb)
+
+
+@unittest.skipIf(SKIP, "numpy and cv2 are required")
+class WellSamplingTests(unittest.TestCase):
+    def test_dominant_colors_ignores_outliers(self):
+        rng = np.random.default_rng(0)
+        main = rng.normal([200, 40, 40], 2, (60, 3))
+        outliers = rng.normal([20, 20, 220], 2, (20, 3))
+        samples = np.concatenate([main, outliers])[None].astype(np.float32)
+        centroid = dominant_colors(samples, cluster_thresh=10.0)
+        self.assertTrue(np.allclose(centroid[0], [200, 40, 40], atol=2))
+
+    def test_sample_plate_rgb_shape_and_color(self):
+        img = np.zeros((40, 60, 3), dtype=np.uint8)
+        img[:, :30] = [255, 0, 0]     # BGR blue on the left
+        img[:, 30:] = [0, 0, 255]     # BGR red on the right
+        centers = np.array([[[10, 20], [50, 20]]], dtype=float)
+        rgb = sample_plate_rgb(img, centers, n=40, sigma=1.0)
+        self.assertEqual(rgb.shape, (1, 2, 3))
+        self.assertTrue(np.allclose(rgb[0, 0], [0, 0, 255]))
+        self.assertTrue(np.allclose(rgb[0, 1], [255, 0, 0]))
+
+    def test_sample_pattern_cached_per_calibration(self):
+        quad = [(10, 10), (130, 12), (128, 90), (12, 88)]
+        a = get_sample_pattern(quad, "96", (100, 140, 3))
+        b = get_sample_pattern([tuple(p) for p in quad], "96", (100, 140, 3))
+        c = get_sample_pattern(quad, "96", (200, 280, 3))
+        self.assertIs(a, b)
+        self.assertIsNot(a, c)
+        self.assertEqual(a.flat_idx.shape, (96, 80))
+        self.assertTrue(np.allclose(a.centers, quad_well_centers(quad, "96")))
+
+    def test_pattern_cache_keeps_recently_used_readers(self):
+        quads = [[(10 + i, 10), (130, 12), (128, 90), (12, 88)] for i in range(4)]
+        with patch.object(well_sampling, "MAX_PATTERNS", 2):
+            first = get_sample_pattern(quads[0], "96", (100, 140, 3))
+            get_sample_pattern(quads[1], "96", (100, 140, 3))
+            self.assertIs(get_sample_pattern(quads[0], "96", (100, 140, 3)), first)
+            get_sample_pattern(quads[2], "96", (100, 140, 3))
+            get_sample_pattern(quads[3], "96", (100, 140, 3))
+            self.assertLessEqual(len(well_sampling._patterns), 2)
+            self.assertIsNot(get_sample_pattern(quads[0], "96", (100, 140, 3)), first)
+
+    def test_sample_pattern_read_matches_frame(self):
+        img = np.zeros((100, 140, 3), dtype=np.uint8)
+        img[:] = [10, 20, 30]
+        quad = [(10, 10), (130, 10), (130, 90), (10, 90)]
+        rgb = get_sample_pattern(quad, "24", img.shape).read(img)
+        self.assertEqual(rgb.shape, (4, 6, 3))
+        self.assertTrue(np.allclose(rgb, [30, 20, 10]))
+
+    def test_rectified_reader_reads_each_well_block(self):
+        img = np.zeros((100, 140, 3), dtype=np.uint8)
+        quad = [(10, 10), (130, 10), (130, 90), (10, 90)]
+        centers = quad_well_centers(quad, "24")
+        for r in range(4):
+            for c in range(6):
+                x, y = centers[r, c].astype(int)
+                img[y - 5:y + 6, x - 5:x + 6] = [10 * c, 20 * r, 200]
+        pattern = get_rectified_pattern(quad, "24", img.shape)
+        self.assertIs(get_plate_reader(quad, "24", img.shape, "rectified"), pattern)
+        rgb = pattern.read(img)
+        self.assertEqual(rgb.shape, (4, 6, 3))
+        self.assertTrue(np.allclose(rgb[2, 3], [200, 40, 30], atol=1))
+        self.assertTrue(np.array_equal(rgb, pattern.read(img)))
+        with self.assertRaises(ValueError):
+            get_plate_reader(quad, "24", img.shape, "nope")
+
+    def test_incremental_reader_rereads_only_changed_wells(self):
+        img = np.full((100, 140, 3), 60, dtype=np.uint8)
+        quad = [(10, 10), (130, 10), (130, 90), (10, 90)]
+        pattern = get_sample_pattern(quad, "24", img.shape)
+        probe = get_rectified_pattern(quad, "24", img.shape, 8)
+        reader = IncrementalReader(pattern, probe, threshold=8.0)
+        first, changed = reader.read(img)
+        self.assertTrue(changed.all())
+
+        x, y = quad_well_centers(quad, "24")[1, 4].astype(int)
+        img[y - 8:y + 9, x - 8:x + 9] = [0, 0, 250]
+        img[img == 60] = 63                           # small global drift
+        second, changed = reader.read(img)
+        self.assertEqual(list(zip(*np.nonzero(changed))), [(1, 4)])
+        self.assertTrue(np.allclose(second[1, 4], [250, 0, 0]))
+        self.assertTrue(np.array_equal(np.delete(second.reshape(-1, 3), 10, 0),
+                                       np.delete(first.reshape(-1, 3), 10, 0)))
+
+
+if __name__ == "__main__":
+    unittest.main()